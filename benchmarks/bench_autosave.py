@@ -0,0 +1,64 @@
+import os
+import sys
+import time
+import shutil
+import random
+import tempfile
+
+os.environ["SMARTSTUDY_DIR"] = tempfile.mkdtemp(prefix="bench_autosave_")  # before core caches the path
+os.environ.setdefault("SMARTSTUDY_AUTOSAVE_DELAY", "0.02")
+os.environ.setdefault("SMARTSTUDY_LLM_PROVIDER", "local")  # the flushes queue flashcard refreshes
+from core.storage import get_store
+from core.autosave import DELAY, get_autosaver
+
+# --- Autosave write amplification over long editing sessions ---
+# Usage: python -m benchmarks.bench_autosave [BURSTS ...]
+# Types BURSTS bursts of a few words, one keystroke per change(), into a
+# ~50 KB note, pausing past the debounce delay (SMARTSTUDY_AUTOSAVE_DELAY,
+# shortened here) between bursts. Reports store writes, bytes written to
+# the journal, note and history per character edited, and the latency of
+# change(). For scale: rewriting the note on every keystroke would cost
+# about the note's size per character, and saving once per burst about
+# the note's size per burst.
+
+PHRASES = ["photosynthesis needs light ", "the membrane is selective ", "enzymes lower activation energy "]
+
+
+def main(sizes):
+    store = get_store()
+    store.add_course({"id": "c0", "name": "Course", "created_at": "2024-01-01"})
+    store.add_content("c0", "Notes")
+    base = "".join(f"<p>Paragraph {n}: " + "cells divide and grow " * 45 + "</p>" for n in range(50))
+    print(
+        f"{'bursts':>6} {'edits':>6} {'writes':>6} {'chars':>6} {'written KB':>10} {'B/char':>7}"
+        f" {'per-key B/char':>14} {'per-burst B/char':>16} {'change p50 ms':>13}"
+    )
+    for count in sizes:
+        topic = f"Topic {count}"
+        store.add_topic("c0", "Notes", topic)
+        store.write_note("c0", "Notes", topic, base)
+        saver = get_autosaver({}, store, "c0", "Notes", topic)
+        rng, text, latencies = random.Random(0), base, []
+        for _ in range(count):
+            pos = rng.randrange(len(text))
+            for ch in rng.choice(PHRASES):
+                text = text[:pos] + ch + text[pos:]
+                pos += 1
+                start = time.perf_counter()
+                saver.change(text)
+                latencies.append(time.perf_counter() - start)
+            time.sleep(DELAY * 4)  # quiet: the timer flushes
+        saver.flush()
+        latencies.sort()
+        stats, size = saver.stats, len(text.encode("utf-8"))
+        print(
+            f"{count:>6} {stats['edits']:>6} {stats['writes']:>6} {stats['changed_chars']:>6}"
+            f" {stats['written_bytes'] / 1024:>10.1f} {saver.amplification():>7.0f}"
+            f" {size:>14} {size * count / stats['changed_chars']:>16.0f}"
+            f" {latencies[len(latencies) // 2] * 1000:>13.2f}"
+        )
+    shutil.rmtree(os.environ["SMARTSTUDY_DIR"], ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [10, 100, 300])
@@ -0,0 +1,52 @@
+import sys
+import time
+import random
+import tempfile
+import numpy as np
+from core.embeddings import EmbeddingIndex, HashingEmbedder, find_duplicates
+
+# --- Embedding index and duplicate detection ---
+# Usage: python -m benchmarks.bench_embeddings [VECTORS ...]
+# For each size: embedding every item with the hashing vectorizer and
+# appending it to a fresh index, reopening the index and gathering every
+# vector from the memmap (a later deck assembly), and find_duplicates() over
+# the whole matrix. One item in ten is a reworded copy of an earlier one.
+
+WORDS = "cell energy membrane protein enzyme gene acid light water carbon signal pressure".split()
+
+
+def _items(count):
+    rng = random.Random(0)
+    items = {}
+    for n in range(count):
+        if n % 10 == 9:
+            text = items[f"i{rng.randrange(n - 1)}"] + " too"
+        else:
+            text = f"Concept {n}: " + " ".join(rng.choice(WORDS) for _ in range(12))
+        items[f"i{n}"] = text
+    return items
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main(sizes):
+    embedder = HashingEmbedder()
+    print(f"{'vectors':>8} {'embed+append s':>14} {'reload s':>8} {'matrix MB':>9} {'duplicates s':>12} {'flagged':>8}")
+    for count in sizes:
+        items = _items(count)
+        with tempfile.TemporaryDirectory() as folder:
+            cold, _ = _timed(lambda: EmbeddingIndex(folder, embedder).vectors(items))
+            warm, vectors = _timed(lambda: EmbeddingIndex(folder, embedder).vectors(items))
+            dup, duplicate_of = _timed(lambda: find_duplicates(vectors))
+            print(
+                f"{count:>8} {cold:>14.2f} {warm:>8.3f} {vectors.nbytes / 1e6:>9.1f}"
+                f" {dup:>12.2f} {int(np.count_nonzero(duplicate_of >= 0)):>8}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,65 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+os.environ["SMARTSTUDY_DIR"] = tempfile.mkdtemp(prefix="bench_grids_")  # before core caches the path
+from streamlit.testing.v1 import AppTest
+from core.storage import get_store
+
+# --- Grid rerun time against collection size ---
+# Usage: python -m benchmarks.bench_grids [ITEMS ...]
+# Runs the home page (ITEMS courses), the course page (ITEMS contents) and
+# the topic page (ITEMS topics) headless with streamlit's AppTest, in a
+# throwaway SMARTSTUDY_DIR that grows from one size to the next, and
+# reports the time of a warm rerun and the number of buttons and Markdown
+# blocks it produced. All three should stay flat as ITEMS grows, since only
+# one page of each grid is rendered.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+PAGES = {
+    "home (courses)": "streamlit_app.py",
+    "course (contents)": "pages/course_page.py",
+    "topic (topics)": "pages/topic_page.py",
+}
+
+
+# Grows the store from start to count items of each kind
+def _populate(store, start, count):
+    for n in range(start, count):
+        store.add_course({"id": f"c{n}", "name": f"Course {n}", "created_at": "2024-01-01"})
+    for n in range(start, count):
+        store.add_content("c0", f"Content {n}")
+        store.add_topic("c0", "Content 0", f"Topic {n}")
+
+
+def _rerun(script, runs=3):
+    at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=120)
+    at.session_state["selected_course_id"] = "c0"
+    at.session_state["selected_course_name"] = "Course 0"
+    at.session_state["selected_content"] = "Content 0"
+    at.run()  # first run imports and warms the caches
+    start = time.perf_counter()
+    for _ in range(runs):
+        at.run()
+    elapsed = (time.perf_counter() - start) / runs
+    if at.exception:
+        raise RuntimeError(f"{script}: {at.exception[0].value}")
+    return elapsed, len(at.button), len(at.markdown)
+
+
+def main(sizes):
+    print(f"{'items':>6}  {'page':<18} {'ms/rerun':>9} {'buttons':>8} {'markdown':>8}")
+    store, populated = get_store(), 0
+    for count in sorted(sizes):
+        _populate(store, populated, count)
+        populated = count
+        for name, script in PAGES.items():
+            seconds, buttons, markdown = _rerun(script)
+            print(f"{count:>6}  {name:<18} {seconds * 1000:>9.0f} {buttons:>8} {markdown:>8}")
+    shutil.rmtree(os.environ["SMARTSTUDY_DIR"], ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [10, 100, 1000])
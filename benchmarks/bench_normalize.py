@@ -0,0 +1,65 @@
+import sys
+import time
+import random
+from core.normalize import note_markdown
+from core.chunking import estimate_tokens
+
+# --- Tokens saved by normalizing Quill HTML to Markdown ---
+# Usage: python -m benchmarks.bench_normalize [NOTES ...]
+# Builds a corpus of notes shaped like the topic editor's output: headings,
+# styled paragraphs, bold/italic runs, nested ql-indent lists, code blocks,
+# entities and empty <p><br></p> spacers. Reports the prompt tokens of the
+# raw HTML against the Markdown note_markdown() produces
+# (core.chunking.estimate_tokens: tiktoken when available, else len/4), and
+# the conversion time per note with the lru_cache cleared.
+
+WORDS = (
+    "cell membrane protein enzyme energy glucose oxygen carbon water light "
+    "mitochondria ribosome nucleus transport diffusion gradient"
+).split()
+
+
+def _sentence(rng, words=12):
+    parts = [rng.choice(WORDS) for _ in range(words)]
+    i = rng.randrange(words)
+    parts[i] = f"<strong>{parts[i]}</strong>"
+    if rng.random() < 0.5:
+        j = rng.randrange(words)
+        parts[j] = f"<em>{parts[j]}</em>"
+    return " ".join(parts).capitalize() + "."
+
+
+def _note(rng):
+    html = []
+    for section in range(rng.randint(2, 5)):
+        html.append(f"<h2>Section {section}: {rng.choice(WORDS)} &amp; {rng.choice(WORDS)}</h2>")
+        for _ in range(rng.randint(1, 3)):
+            style = ' style="color: rgb(34, 34, 34); background-color: transparent;"'
+            html.append(f"<p><span{style}>{_sentence(rng)} {_sentence(rng)}</span></p>")
+        html.append("<p><br></p>")
+        items = []
+        for _ in range(rng.randint(2, 6)):
+            indent = rng.choice(["", "", ' class="ql-indent-1"'])
+            items.append(f'<li data-list="bullet"{indent}>{_sentence(rng, 6)}</li>')
+        html.append("<ol>" + "".join(items) + "</ol>")
+        if rng.random() < 0.3:
+            html.append('<pre class="ql-syntax" spellcheck="false">rate = k * [S] / (Km + [S])\n</pre>')
+    return "".join(html)
+
+
+def main(sizes):
+    print(f"{'notes':>6} {'raw tokens':>10} {'md tokens':>10} {'saved':>6} {'ms/note':>8}")
+    for count in sizes:
+        rng = random.Random(0)
+        corpus = [_note(rng) for _ in range(count)]
+        note_markdown.cache_clear()
+        start = time.perf_counter()
+        converted = [note_markdown(note) for note in corpus]
+        seconds = time.perf_counter() - start
+        raw = sum(estimate_tokens(note) for note in corpus)
+        markdown = sum(estimate_tokens(text) for text in converted)
+        print(f"{count:>6} {raw:>10,} {markdown:>10,} {1 - markdown / raw:>6.0%} {seconds / count * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [10, 100, 1000])
@@ -0,0 +1,52 @@
+import sys
+import json
+import time
+from core.quiz_parser import parse_questions
+
+# --- Quiz reply parsing throughput ---
+# Usage: python -m benchmarks.bench_quiz_parser [QUESTIONS ...]
+# Parses replies of each size in the shapes models produce: a clean JSON
+# array (json.loads fast path), a fenced array with commentary around it
+# and a reply cut off mid-question (both through the object scanner).
+
+
+def _question(n):
+    return {
+        "question": f"Question {n}: which statement about concept {n} is correct?",
+        "options": [f"Option {n}{letter} with some explanatory text" for letter in "ABCD"],
+        "answer": f"Option {n}B with some explanatory text",
+    }
+
+
+def _replies(count):
+    array = json.dumps([_question(n) for n in range(count)], indent=2)
+    return {
+        "clean": array,
+        "fenced+commentary": f"Here you go:\n```json\n{array}\n```\nNote: {{topic}} placeholders were filled in.",
+        "truncated": array[: int(len(array) * 0.9)],
+    }
+
+
+def _bench(reply, min_seconds=0.5):
+    runs, start = 0, time.perf_counter()
+    while True:
+        questions, complete = parse_questions(reply)
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / runs, len(questions), complete
+
+
+def main(sizes):
+    print(f"{'questions':>9}  {'shape':<18} {'kept':>5} {'complete':>8} {'ms/reply':>9} {'MB/s':>7} {'questions/s':>12}")
+    for count in sizes:
+        for shape, reply in _replies(count).items():
+            seconds, kept, complete = _bench(reply)
+            print(
+                f"{count:>9}  {shape:<18} {kept:>5} {str(complete):>8} {seconds * 1000:>9.3f}"
+                f" {len(reply) / seconds / 1e6:>7.1f} {kept / seconds:>12,.0f}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [10, 100, 1000])
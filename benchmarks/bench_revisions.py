@@ -0,0 +1,76 @@
+import os
+import sys
+import time
+import shutil
+import random
+import tempfile
+
+os.environ["SMARTSTUDY_DIR"] = tempfile.mkdtemp(prefix="bench_rev_")  # before core caches the path
+from core.storage import get_store
+from core import revisions
+
+# --- Note revision storage and save latency ---
+# Usage: python -m benchmarks.bench_revisions [SAVES ...]
+# Saves a ~25 KB Quill note SAVES times through the store, each save
+# appending a word to one paragraph (and every tenth inserting a new one),
+# like a long editing session. Reports the history file against keeping a
+# full copy of every retained revision, save latency, a cold checkout of
+# the newest and the oldest retained revision, and note_hash().
+
+WORDS = "cell membrane protein enzyme light energy glucose oxygen carbon water".split()
+
+
+def _edits(count):
+    rng = random.Random(1)
+    paragraphs = ["<p>" + " ".join(rng.choice(WORDS) for _ in range(60)) + "</p>" for _ in range(60)]
+    for n in range(count):
+        j = rng.randrange(len(paragraphs))
+        paragraphs[j] = paragraphs[j][:-4] + " " + rng.choice(WORDS) + "</p>"
+        if n % 10 == 0:
+            paragraphs.insert(rng.randrange(len(paragraphs)), f"<p>new paragraph {n}</p>")
+        yield "".join(paragraphs)
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main(sizes):
+    store = get_store()
+    store.add_course({"id": "c0", "name": "Course", "created_at": "2024-01-01"})
+    store.add_content("c0", "Notes")
+    print(
+        f"{'saves':>6} {'note KB':>7} {'revs':>5} {'history KB':>10} {'copies KB':>9}"
+        f" {'save p50 ms':>11} {'save p95 ms':>11} {'newest ms':>9} {'oldest ms':>9} {'hash us':>7}"
+    )
+    for count in sizes:
+        topic = f"Topic {count}"
+        store.add_topic("c0", "Notes", topic)
+        texts, latencies = [], []
+        for text in _edits(count):
+            seconds, _ = _timed(lambda: store.write_note("c0", "Notes", topic, text))
+            texts.append(text)
+            latencies.append(seconds)
+        latencies.sort()
+
+        revs = store.note_revisions("c0", "Notes", topic)
+        history = revisions.history_path(store.course_path("c0"), "Notes", topic)
+        copies = sum(len(text.encode("utf-8")) for text in texts[-len(revs):])
+        revisions._histories.clear()
+        newest, _ = _timed(lambda: store.read_note_revision("c0", "Notes", topic, revs[-1][0]))
+        revisions._histories.clear()
+        oldest, _ = _timed(lambda: store.read_note_revision("c0", "Notes", topic, revs[0][0]))
+        digest, _ = _timed(lambda: store.note_hash("c0", "Notes", topic))
+        print(
+            f"{count:>6} {len(texts[-1]) / 1024:>7.1f} {len(revs):>5} {os.path.getsize(history) / 1024:>10.1f}"
+            f" {copies / 1024:>9.0f} {latencies[len(latencies) // 2] * 1000:>11.2f}"
+            f" {latencies[int(len(latencies) * 0.95)] * 1000:>11.2f} {newest * 1000:>9.2f}"
+            f" {oldest * 1000:>9.2f} {digest * 1e6:>7.1f}"
+        )
+    shutil.rmtree(os.environ["SMARTSTUDY_DIR"], ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [100, 500, 1000])
@@ -0,0 +1,109 @@
+import os
+import sys
+import time
+import shutil
+import tempfile
+
+os.environ["SMARTSTUDY_DIR"] = tempfile.mkdtemp(prefix="bench_deck_")  # before core caches the path
+os.environ.setdefault("SMARTSTUDY_LLM_PROVIDER", "local")
+from streamlit.testing.v1 import AppTest
+from core.storage import get_store, text_hash
+from core.decks import content_deck
+from core.llm import split_cards
+from core.pipeline import stale_quiz_topics
+from core.identity import question_id, question_text
+from core.quiz_history import get_quiz_history
+from core.embeddings import dedupe
+from core.session_deck import Deck, current_deck
+
+# --- Per-interaction cost of the quiz and revision pages ---
+# Usage: python -m benchmarks.bench_session_deck [TOPICS ...]
+# One content with TOPICS topics of 10 cards and 10 questions each.
+# "rebuild" is the deck work a rerun did before decks were kept in the
+# session (flashcard hashes, staleness check, reading every quiz, question
+# IDs, history sync and dedupe; or reading and splitting the content deck),
+# "cached" is what a rerun does now (store.stamp() and current_deck()).
+# The last column is a whole "Next question" rerun of pages/quiz_page.py
+# under streamlit's AppTest.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COURSE, CONTENT = "c0", "Biology"
+
+
+def _populate(store, start, count):
+    for n in range(start, count):
+        topic = f"Topic {n:04d}"
+        store.add_topic(COURSE, CONTENT, topic)
+        cards = "\n\n".join(
+            f"### Term {n}-{k}\n- Definition of term {n}-{k} in topic {n}\n- Example {k * n}" for k in range(10)
+        )
+        store.write_flashcards(COURSE, CONTENT, topic, cards)
+        questions = [
+            {
+                "question": f"In topic {n}, what defines term {n}-{k} (variant {k * 31 + n})?",
+                "options": [f"Answer {n}-{k}-{letter}" for letter in "ABCD"],
+                "answer": f"Answer {n}-{k}-A",
+            }
+            for k in range(10)
+        ]
+        store.write_quiz(COURSE, CONTENT, topic, questions, text_hash(cards))
+
+
+def _rebuild_quiz(store):
+    hashes = store.topic_flashcard_hashes(COURSE, CONTENT)
+    stale_quiz_topics(store, COURSE, CONTENT)
+    quiz = []
+    for topic in hashes:
+        quiz.extend(store.read_quiz(COURSE, CONTENT, topic) or [])
+    by_id = {question_id(q): q for q in quiz}
+    get_quiz_history(COURSE).sync(by_id)
+    return dedupe(COURSE, {qid: question_text(q) for qid, q in by_id.items()})
+
+
+def _rebuild_cards(store):
+    return [card for card in split_cards(content_deck(store, COURSE, CONTENT) or "") if card.strip()]
+
+
+def _per_call(fn, min_seconds=0.3):
+    fn()  # warm
+    runs, start = 0, time.perf_counter()
+    while True:
+        fn()
+        runs += 1
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_seconds:
+            return elapsed / runs
+
+
+def _page_rerun(clicks=10):
+    at = AppTest.from_file(os.path.join(ROOT, "pages", "quiz_page.py"), default_timeout=120)
+    at.session_state["selected_course_id"] = COURSE
+    at.session_state["selected_content_for_quiz"] = CONTENT
+    at.run()
+    start = time.perf_counter()
+    for _ in range(clicks):
+        next(b for b in at.button if "Next" in b.label).click().run()
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return (time.perf_counter() - start) / clicks
+
+
+def main(sizes):
+    store = get_store()
+    store.add_course({"id": COURSE, "name": "Course", "created_at": "2024-01-01"})
+    store.add_content(COURSE, CONTENT)
+    print(f"{'topics':>6} {'quiz rebuild ms':>15} {'cards rebuild ms':>16} {'cached us':>9} {'page rerun ms':>13}")
+    populated = 0
+    for count in sorted(sizes):
+        _populate(store, populated, count)
+        populated = count
+        session = {"deck": Deck((COURSE, CONTENT), store.stamp(COURSE), _rebuild_cards(store))}
+        quiz = _per_call(lambda: _rebuild_quiz(store))
+        cards = _per_call(lambda: _rebuild_cards(store))
+        cached = _per_call(lambda: current_deck(session, "deck", (COURSE, CONTENT), store.stamp(COURSE)))
+        print(f"{count:>6} {quiz * 1000:>15.1f} {cards * 1000:>16.1f} {cached * 1e6:>9.1f} {_page_rerun() * 1000:>13.0f}")
+    shutil.rmtree(os.environ["SMARTSTUDY_DIR"], ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [10, 100, 500])
@@ -0,0 +1,68 @@
+import os
+import sys
+import time
+import random
+import tempfile
+from core.srs import CourseSchedule, DAY
+from core.identity import card_id
+
+# --- Spaced repetition queue and state loading ---
+# Usage: python -m benchmarks.bench_srs [CARDS ...]
+# For each course size: the first sync of a deck nobody has reviewed (every
+# card signed into the identity catalog), a cold start (log replay, heap
+# build and sync of a course whose cards all have state), then next_card /
+# review pairs on the warm queue and counts(). The review log is written
+# up front with one line per card, half of them due.
+
+
+def _cards(count):
+    cards = {}
+    for n in range(count):
+        text = f"### Concept {n}\nWhat does concept {n} describe?\n---\nConcept {n} describes behaviour {n * 7 % 101}."
+        cards[card_id(text)] = text
+    return cards
+
+
+def _write_log(path, cards, now):
+    rng = random.Random(0)
+    with open(path, "w", encoding="utf-8") as f:
+        for cid in cards:
+            due = now + rng.uniform(-3, 3) * DAY
+            f.write(f"{cid} 2.5 6 2 0 {due:.1f}\n")
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main(sizes):
+    print(f"{'cards':>8} {'first sync s':>12} {'cold load s':>11} {'log MB':>7} {'next+review us':>14} {'counts ms':>9}")
+    now = time.time()
+    for count in sizes:
+        cards = _cards(count)
+        with tempfile.TemporaryDirectory() as folder:
+            first, _ = _timed(lambda: CourseSchedule(os.path.join(folder, "fresh.log")).sync(cards))
+
+            path = os.path.join(folder, "course.log")
+            _write_log(path, cards, now)
+            CourseSchedule(path).sync(cards)  # signs the catalog, as the first sync did
+            schedule = CourseSchedule(path)
+            cold, _ = _timed(lambda: schedule.sync(cards))
+
+            reviews = min(count, 5000)
+            def step():
+                for _ in range(reviews):
+                    cid = schedule.next_card(now)
+                    schedule.review(cid, 4, now)
+            loop, _ = _timed(step)
+            counts, _ = _timed(lambda: schedule.counts(now))
+            print(
+                f"{count:>8} {first:>12.2f} {cold:>11.3f} {os.path.getsize(path) / 1e6:>7.1f}"
+                f" {loop / reviews * 1e6:>14.0f} {counts * 1000:>9.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main([int(n) for n in sys.argv[1:]] or [1000, 10000, 100000])
@@ -0,0 +1,207 @@
+import os
+import time
+import datetime
+import threading
+from types import SimpleNamespace
+from core.paths import find_smartstudy_path
+from core.fileio import update_json
+from core.cache import json_cache
+from core.chunking import estimate_tokens
+from core.metrics import metrics
+
+# --- Token accounting and per-course budgets ---
+# Every LLM request made on behalf of a course goes through metered(), which
+# records its tokens, estimated cost, latency and errors in core.metrics and
+# adds the tokens to the course's monthly total in <SMARTSTUDY_DIR>/usage.json:
+#   {"2026-10": {"<course_id>": {"prompt": 1234, "completion": 567}}}
+# A course's monthly budget is SMARTSTUDY_TOKEN_BUDGET (0 = unlimited),
+# overridden per course in <SMARTSTUDY_DIR>/budgets.json ({"<course_id>": n}).
+# Once it is used up, requests raise BudgetExceededError; pages queue the
+# work instead and the background worker holds it until the next month.
+# Each request reserves its estimated prompt tokens (plus max_tokens) while
+# it runs, so concurrent requests can't all pass the check on the same
+# remaining budget.
+
+DEFAULT_BUDGET = int(os.getenv("SMARTSTUDY_TOKEN_BUDGET", "0"))
+KEEP_PERIODS = 12
+
+# US dollars per million (prompt, completion) tokens
+PRICES = {
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+
+class BudgetExceededError(RuntimeError):
+    pass
+
+
+def _usage_path():
+    return os.path.join(find_smartstudy_path(), "usage.json")
+
+
+def _budgets_path():
+    return os.path.join(find_smartstudy_path(), "budgets.json")
+
+
+def current_period():
+    return datetime.date.today().strftime("%Y-%m")
+
+
+def next_period_start():
+    today = datetime.date.today()
+    first = datetime.date(today.year + today.month // 12, today.month % 12 + 1, 1)
+    return time.mktime(first.timetuple())
+
+
+# --- Usage ---
+def tokens_used(course_id, period=None):
+    usage = json_cache.get(_usage_path(), {}).get(period or current_period(), {}).get(str(course_id), {})
+    return usage.get("prompt", 0) + usage.get("completion", 0)
+
+
+def record_usage(course_id, prompt_tokens, completion_tokens):
+    period = current_period()
+
+    def add(usage):
+        course = usage.setdefault(period, {}).setdefault(str(course_id), {"prompt": 0, "completion": 0})
+        course["prompt"] += prompt_tokens
+        course["completion"] += completion_tokens
+        for old in sorted(usage)[:-KEEP_PERIODS]:
+            del usage[old]
+        return usage
+
+    update_json(_usage_path(), add, {})
+    json_cache.invalidate(_usage_path())
+
+
+# --- Budgets ---
+def course_budget(course_id):
+    return json_cache.get(_budgets_path(), {}).get(str(course_id), DEFAULT_BUDGET)
+
+
+def set_course_budget(course_id, tokens):
+    def change(budgets):
+        if tokens is None:
+            budgets.pop(str(course_id), None)
+        else:
+            budgets[str(course_id)] = int(tokens)
+        return budgets
+
+    update_json(_budgets_path(), change, {})
+    json_cache.invalidate(_budgets_path())
+
+
+# Tokens held by requests of this process that are still running
+_reserved = {}
+_reserved_lock = threading.Lock()
+
+
+def budget_exceeded(course_id):
+    budget = course_budget(course_id)
+    return bool(budget) and tokens_used(course_id) + _reserved.get(course_id, 0) >= budget
+
+
+# Checks the budget and holds tokens for a request, in one step
+def reserve_budget(course_id, tokens):
+    with _reserved_lock:
+        if budget_exceeded(course_id):
+            metrics.inc("smartstudy_llm_budget_refusals_total", course=course_id)
+            raise BudgetExceededError(
+                f"Course {course_id} used {tokens_used(course_id)} of its {course_budget(course_id)} tokens this month"
+            )
+        _reserved[course_id] = _reserved.get(course_id, 0) + tokens
+
+
+def release_budget(course_id, tokens):
+    with _reserved_lock:
+        left = _reserved.get(course_id, 0) - tokens
+        if left > 0:
+            _reserved[course_id] = left
+        else:
+            _reserved.pop(course_id, None)
+
+
+# --- Metered client ---
+# Wraps a client from core.providers for one course; only
+# chat.completions.create() is used by core.llm, so that is all it exposes.
+def metered(client, course_id):
+    return MeteredClient(client, course_id)
+
+
+class MeteredClient:
+    def __init__(self, client, course_id):
+        self.client = client
+        self.course_id = course_id
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, **kwargs):
+        reserved = _prompt_tokens(kwargs) + (kwargs.get("max_tokens") or 0)
+        reserve_budget(self.course_id, reserved)
+        model = kwargs.get("model", "")
+        metrics.inc("smartstudy_llm_requests_total", model=model, course=self.course_id)
+        start = time.perf_counter()
+        try:
+            response = self.client.chat.completions.create(**kwargs)
+        except Exception as exc:
+            self._failed(model, exc)
+            release_budget(self.course_id, reserved)
+            raise
+        if kwargs.get("stream"):
+            return self._stream(response, kwargs, start, reserved)
+        try:
+            content = response.choices[0].message.content if response.choices else ""
+            self._finished(kwargs, getattr(response, "usage", None), content or "", start)
+        finally:
+            release_budget(self.course_id, reserved)
+        return response
+
+    def _stream(self, stream, kwargs, start, reserved):
+        usage = None
+        text = []
+        try:
+            for chunk in stream:
+                if getattr(chunk, "usage", None) is not None:
+                    usage = chunk.usage
+                if chunk.choices:
+                    text.append(chunk.choices[0].delta.content or "")
+                yield chunk
+        except Exception as exc:
+            self._failed(kwargs.get("model", ""), exc)
+            raise
+        finally:
+            # Also when the caller stops reading early (GeneratorExit): the
+            # tokens generated so far are billed all the same
+            try:
+                if hasattr(stream, "close"):
+                    stream.close()
+                self._finished(kwargs, usage, "".join(text), start)
+            finally:
+                release_budget(self.course_id, reserved)
+
+    def _failed(self, model, exc):
+        error = getattr(exc, "status_code", None) or type(exc).__name__
+        metrics.inc("smartstudy_llm_errors_total", model=model, error=error)
+
+    def _finished(self, kwargs, usage, text, start):
+        model = kwargs.get("model", "")
+        metrics.observe("smartstudy_llm_request_seconds", time.perf_counter() - start, model=model)
+        if usage is not None:
+            prompt_tokens, completion_tokens = usage.prompt_tokens, usage.completion_tokens
+        else:  # server did not report usage (or the stream was cut short); estimate it
+            prompt_tokens = _prompt_tokens(kwargs)
+            completion_tokens = estimate_tokens(text)
+        metrics.inc("smartstudy_llm_tokens_total", prompt_tokens, model=model, course=self.course_id, type="prompt")
+        metrics.inc("smartstudy_llm_tokens_total", completion_tokens, model=model, course=self.course_id, type="completion")
+        if model in PRICES:
+            prompt_price, completion_price = PRICES[model]
+            cost = (prompt_tokens * prompt_price + completion_tokens * completion_price) / 1_000_000
+            metrics.inc("smartstudy_llm_cost_usd_total", cost, model=model, course=self.course_id)
+        record_usage(self.course_id, prompt_tokens, completion_tokens)
+
+
+def _prompt_tokens(kwargs):
+    return sum(estimate_tokens(m["content"]) for m in kwargs.get("messages", []))
@@ -0,0 +1,298 @@
+import io
+import os
+import sys
+import json
+import time
+import hashlib
+import tarfile
+import contextlib
+from core.storage import get_store, text_hash
+
+# --- Course export / import as one .tar.gz ---
+# Usage: python -m core.archive export OUT.tar.gz [COURSE_ID ...]
+#        python -m core.archive import ARCHIVE.tar.gz
+#
+# The archive is a gzip'd PAX tar written and read in stream mode ("w|gz",
+# "r|gz"), one member per course record, content, topic, note, flashcard deck
+# and quiz, in store order. Each member carries what it is in its PAX headers
+# (SMARTSTUDY.kind / course / content / topic / source / sha256), so members
+# are handled one at a time and memory stays bounded by the largest single
+# artifact, however many notes a course has. The last member, manifest.json,
+# holds the format version, the member count and a sha256 over every
+# member's name and checksum.
+#
+# Import reads the archive twice: first to verify every checksum and the
+# manifest (nothing is written if anything is off), then to apply it. It is
+# incremental: courses, contents and topics that exist are kept, and notes,
+# decks and quizzes whose content hash (and source) match what is stored are
+# skipped. Content-level decks are not exported; they are rebuilt from the
+# topic decks on demand. Note revision history, quiz scores and review
+# schedules stay on the machine.
+
+FORMAT = 1
+PREFIX = "SMARTSTUDY."
+MAX_MEMBER_BYTES = 64 * 1024 * 1024
+EXPORT_TTL = 3600  # seconds a prepared export is kept for download
+KINDS = ("courses", "contents", "topics", "notes", "flashcards", "quizzes")
+# Where-headers each member kind must carry
+REQUIRED = {
+    "course": ("course",),
+    "content": ("course", "content"),
+    "topic": ("course", "content", "topic"),
+    "note": ("course", "content", "topic"),
+    "flashcards": ("course", "content", "topic"),
+    "quiz": ("course", "content", "topic"),
+}
+
+
+class ArchiveError(ValueError):
+    pass
+
+
+# --- Export ---
+class _Writer:
+    def __init__(self, fileobj):
+        self.tar = tarfile.open(fileobj=fileobj, mode="w|gz", format=tarfile.PAX_FORMAT)
+        self.count = 0
+        self.digest = hashlib.sha256()
+        self.now = time.time()
+
+    def add(self, kind, data, **meta):
+        checksum = hashlib.sha256(data).hexdigest()
+        info = tarfile.TarInfo(f"smartstudy/{self.count:07d}.{kind}")
+        info.size = len(data)
+        info.mtime = self.now
+        info.pax_headers = {f"{PREFIX}{key}": str(value) for key, value in meta.items() if value is not None}
+        info.pax_headers[f"{PREFIX}kind"] = kind
+        info.pax_headers[f"{PREFIX}sha256"] = checksum
+        self.tar.addfile(info, io.BytesIO(data))
+        self.tar.members.clear()  # tarfile keeps every member's header otherwise
+        self.digest.update(f"{info.name} {checksum}\n".encode("utf-8"))
+        self.count += 1
+
+    def close(self, courses):
+        manifest = {
+            "format": FORMAT,
+            "created_at": self.now,
+            "courses": courses,
+            "members": self.count,
+            "sha256": self.digest.hexdigest(),
+        }
+        data = json.dumps(manifest, indent=2).encode("utf-8")
+        info = tarfile.TarInfo("smartstudy/manifest.json")
+        info.size = len(data)
+        info.mtime = self.now
+        self.tar.addfile(info, io.BytesIO(data))
+        self.tar.close()
+
+
+# Writes the given courses (all by default) to fileobj; returns per-kind counts
+def export_courses(store, fileobj, course_ids=None):
+    wanted = set(course_ids) if course_ids is not None else None
+    writer = _Writer(fileobj)
+    counts = dict.fromkeys(KINDS, 0)
+    exported = []
+    for course in store.list_courses():
+        course_id = course["id"]
+        if wanted is not None and course_id not in wanted:
+            continue
+        writer.add("course", json.dumps(course).encode("utf-8"), course=course_id)
+        exported.append(course_id)
+        counts["courses"] += 1
+        for content in store.list_contents(course_id):
+            writer.add("content", b"", course=course_id, content=content)
+            counts["contents"] += 1
+            for topic in store.list_topics(course_id, content):
+                where = {"course": course_id, "content": content, "topic": topic}
+                writer.add("topic", b"", **where)
+                counts["topics"] += 1
+
+                note = store.read_note(course_id, content, topic)
+                if note is not None:
+                    writer.add("note", note.encode("utf-8"), **where)
+                    counts["notes"] += 1
+                cards = store.read_flashcards(course_id, content, topic)
+                if cards is not None:
+                    source = store.flashcard_source_hash(course_id, content, topic)
+                    writer.add("flashcards", cards.encode("utf-8"), source=source, **where)
+                    counts["flashcards"] += 1
+                questions = store.read_quiz(course_id, content, topic)
+                if questions is not None:
+                    source = store.quiz_source_hash(course_id, content, topic)
+                    writer.add("quiz", json.dumps(questions).encode("utf-8"), source=source, **where)
+                    counts["quizzes"] += 1
+    writer.close(exported)
+    return counts
+
+
+# Removes exports in folder older than max_age seconds, and the given paths
+def prune_exports(folder, max_age=EXPORT_TTL, also=()):
+    cutoff = time.time() - max_age
+    for path in [os.path.join(folder, name) for name in os.listdir(folder)] + list(also):
+        try:
+            if path in also or os.path.getmtime(path) < cutoff:
+                os.remove(path)
+        except FileNotFoundError:
+            pass
+
+
+# --- Import ---
+def _members(fileobj):
+    # (tar member, its bytes) in archive order, one at a time
+    with tarfile.open(fileobj=fileobj, mode="r|gz") as tar:
+        for member in tar:
+            if not member.isfile():
+                raise ArchiveError(f"Unexpected archive entry: {member.name}")
+            if member.size > MAX_MEMBER_BYTES:
+                raise ArchiveError(f"{member.name} is larger than {MAX_MEMBER_BYTES} bytes")
+            data = tar.extractfile(member).read()
+            tar.members.clear()  # tarfile keeps every member's header otherwise
+            yield member, data
+
+
+def _safe_name(value, member):
+    # Names become file and folder names in the file store
+    if not value or value in (".", "..") or "/" in value or "\\" in value or "\0" in value:
+        raise ArchiveError(f"{member.name}: invalid name {value!r}")
+    return value
+
+
+def _verify(fileobj):
+    count, digest, manifest = 0, hashlib.sha256(), None
+    try:
+        for member, data in _members(fileobj):
+            if manifest is not None:
+                raise ArchiveError("Entries found after the manifest")
+            if member.name == "smartstudy/manifest.json":
+                manifest = json.loads(data)
+                continue
+            checksum = member.pax_headers.get(f"{PREFIX}sha256")
+            if checksum != hashlib.sha256(data).hexdigest():
+                raise ArchiveError(f"Checksum mismatch in {member.name}")
+            kind = member.pax_headers.get(f"{PREFIX}kind")
+            if kind not in REQUIRED:
+                raise ArchiveError(f"{member.name}: unknown kind {kind!r}")
+            for key in REQUIRED[kind]:
+                _safe_name(member.pax_headers.get(f"{PREFIX}{key}"), member)
+            if kind == "course":
+                course = json.loads(data)
+                if not isinstance(course, dict) or not {"name", "created_at"} <= set(course):
+                    raise ArchiveError(f"{member.name}: incomplete course record")
+            if kind in ("note", "flashcards"):
+                data.decode("utf-8")
+            if kind == "quiz" and not isinstance(json.loads(data), list):
+                raise ArchiveError(f"{member.name}: quiz is not a list of questions")
+            digest.update(f"{member.name} {checksum}\n".encode("utf-8"))
+            count += 1
+    except (tarfile.TarError, EOFError, OSError, UnicodeDecodeError, json.JSONDecodeError) as exc:
+        raise ArchiveError(f"Not a readable SmartStudy archive: {exc}") from exc
+    if manifest is None:
+        raise ArchiveError("Archive has no manifest (truncated?)")
+    if manifest.get("format") != FORMAT:
+        raise ArchiveError(f"Unsupported archive format {manifest.get('format')!r}")
+    if manifest.get("members") != count or manifest.get("sha256") != digest.hexdigest():
+        raise ArchiveError("Archive contents do not match its manifest")
+    return manifest
+
+
+class _Importer:
+    def __init__(self, store):
+        self.store = store
+        self.imported, self.skipped = dict.fromkeys(KINDS, 0), dict.fromkeys(KINDS, 0)
+        self.courses = {course["id"] for course in store.list_courses()}
+        self.deck_hashes = (None, {})  # ((course, content), {topic: hash}) of the current content
+
+    def count(self, kind, added):
+        (self.imported if added else self.skipped)[kind] += 1
+
+    def apply(self, headers, data):
+        store = self.store
+        kind = headers[f"{PREFIX}kind"]
+        course_id = headers[f"{PREFIX}course"]
+        content = headers.get(f"{PREFIX}content")
+        topic = headers.get(f"{PREFIX}topic")
+        source_hash = headers.get(f"{PREFIX}source")
+
+        if kind == "course":
+            added = course_id not in self.courses
+            if added:
+                course = json.loads(data)
+                store.add_course({"id": course_id, "name": course["name"], "created_at": course["created_at"]})
+                self.courses.add(course_id)
+            self.count("courses", added)
+        elif kind == "content":
+            self.count("contents", store.add_content(course_id, content))
+        elif kind == "topic":
+            self.count("topics", store.add_topic(course_id, content, topic))
+        elif kind == "note":
+            added = store.note_hash(course_id, content, topic) != headers[f"{PREFIX}sha256"]
+            if added:
+                store.write_note(course_id, content, topic, data.decode("utf-8"))
+            self.count("notes", added)
+        elif kind == "flashcards":
+            if self.deck_hashes[0] != (course_id, content):
+                self.deck_hashes = ((course_id, content), store.topic_flashcard_hashes(course_id, content))
+            text = data.decode("utf-8")
+            added = (
+                self.deck_hashes[1].get(topic) != text_hash(text)
+                or store.flashcard_source_hash(course_id, content, topic) != source_hash
+            )
+            if added:
+                store.write_flashcards(course_id, content, topic, text, source_hash)
+            self.count("flashcards", added)
+        elif kind == "quiz":
+            questions = json.loads(data)
+            added = (
+                store.read_quiz(course_id, content, topic) != questions
+                or store.quiz_source_hash(course_id, content, topic) != source_hash
+            )
+            if added:
+                store.write_quiz(course_id, content, topic, questions, source_hash)
+            self.count("quizzes", added)
+
+
+# Verifies and imports the archive in source (a path or a seekable binary
+# file). Returns ({kind: imported}, {kind: skipped as identical}).
+def import_archive(store, source):
+    if isinstance(source, (str, os.PathLike)):
+        with open(source, "rb") as f:
+            return import_archive(store, f)
+    start = source.tell()
+    _verify(source)
+    source.seek(start)
+
+    importer = _Importer(store)
+    # Members of a course are contiguous: one store batch per course
+    current, batch = None, contextlib.ExitStack()
+    with batch:
+        for member, data in _members(source):
+            headers = member.pax_headers
+            if f"{PREFIX}kind" not in headers:
+                continue  # the manifest
+            if headers[f"{PREFIX}course"] != current:
+                batch.close()
+                current = headers[f"{PREFIX}course"]
+                batch.enter_context(store.batch(current))
+            importer.apply(headers, data)
+    return importer.imported, importer.skipped
+
+
+if __name__ == "__main__":
+    if len(sys.argv) < 3 or sys.argv[1] not in ("export", "import"):
+        sys.exit("Usage: python -m core.archive export OUT.tar.gz [COURSE_ID ...]\n"
+                 "       python -m core.archive import ARCHIVE.tar.gz")
+    store = get_store()
+    if sys.argv[1] == "export":
+        with open(sys.argv[2], "wb") as f:
+            counts = export_courses(store, f, sys.argv[3:] or None)
+        print(f"Exported to {sys.argv[2]}")
+        for name, n in counts.items():
+            print(f"  {name}: {n}")
+    else:
+        try:
+            imported, skipped = import_archive(store, sys.argv[2])
+        except ArchiveError as exc:
+            sys.exit(f"Import failed: {exc}")
+        print(f"Imported {sys.argv[2]}")
+        for name in KINDS:
+            print(f"  {name}: {imported[name]} imported, {skipped[name]} unchanged")
@@ -0,0 +1,195 @@
+import os
+import time
+import threading
+from core.storage import text_hash
+from core.revisions import NoteHistory, diff_span, history_path, journal_path
+from core.background import enqueue
+from core.metrics import metrics
+
+# --- Debounced autosave for the topic editor ---
+# Every editor change is appended to a journal next to the note's history
+# (a NoteHistory of its own: a delta record, fsync'd) and a timer is
+# (re)started. The note is written once the editor has been quiet for
+# DELAY seconds, or at the latest MAX_DELAY seconds after the first unsaved
+# change, so a burst of edits becomes a single store write (and a single
+# revision). Text whose hash matches the saved note is never written. The
+# journal is removed after the write; one left behind by a crash or restart
+# is offered for recovery the next time the topic is opened.
+#
+# Write amplification (bytes written to the journal, note and history per
+# character actually edited) is tracked per editor and in core.metrics.
+#
+# Each browser session has its own saver, for the topic it is editing, kept
+# in st.session_state (see get_autosaver).
+
+DELAY = float(os.getenv("SMARTSTUDY_AUTOSAVE_DELAY", "2"))
+MAX_DELAY = float(os.getenv("SMARTSTUDY_AUTOSAVE_MAX_DELAY", "30"))
+
+
+def _size(path):
+    try:
+        return os.path.getsize(path)
+    except FileNotFoundError:
+        return 0
+
+
+# Bytes fn() wrote to path (a compaction counts the whole new file)
+def _written(path, fn):
+    before = _size(path)
+    result = fn()
+    after = _size(path)
+    return result, after - before if after >= before else after
+
+
+class Autosaver:
+    def __init__(self, store, course_id, content, topic):
+        self.key = (store.course_path(course_id), content, topic)
+        self.store = store
+        self.course_id = course_id
+        self.content = content
+        self.topic = topic
+        self.journal = NoteHistory(journal_path(store.course_path(course_id), content, topic))
+        self.text = store.read_note(course_id, content, topic) or ""  # latest text seen
+        self.saved_hash = text_hash(self.text)
+        self.pending = None  # unsaved text
+        self.first_change = None
+        self.saved_at = None
+        self.stats = {"edits": 0, "writes": 0, "skipped": 0, "changed_chars": 0, "written_bytes": 0}
+        self._timer = None
+        self._lock = threading.RLock()
+
+    def _count(self, name, value=1, **labels):
+        metrics.inc(f"smartstudy_autosave_{name}_total", value, **labels)
+
+    # --- Editor changes ---
+    def change(self, text):
+        digest = text_hash(text)
+        with self._lock:
+            if text == self.text:
+                return
+            prefix, suffix = diff_span(self.text, text)
+            changed = max(len(self.text), len(text)) - prefix - suffix
+            self.text = text
+            self.stats["edits"] += 1
+            self.stats["changed_chars"] += changed
+            self._count("edits")
+            self._count("changed_chars", changed)
+
+            if digest == self.saved_hash:
+                # Edited back to the saved text: nothing left to write
+                self._cancel()
+                self.pending = self.first_change = None
+                self._clear_journal()
+                return
+            _, written = _written(self.journal.path, lambda: self.journal.commit(text, digest))
+            self._wrote("journal", written)
+            self.pending = text
+            now = time.monotonic()
+            if self.first_change is None:
+                self.first_change = now
+            self._cancel()
+            self._timer = threading.Timer(min(DELAY, max(0.0, self.first_change + MAX_DELAY - now)), self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    # Writes the pending text now (the timer, Save and leaving the page)
+    def flush(self):
+        with self._lock:
+            self._cancel()
+            text, self.pending, self.first_change = self.pending, None, None
+            if text is None:
+                return False
+            digest = text_hash(text)
+            if self.topic not in self.store.list_topics(self.course_id, self.content):
+                # Deleted while the timer ran: don't bring the note back
+                self._clear_journal()
+                return False
+            if digest == self.store.note_hash(self.course_id, self.content, self.topic):
+                self.stats["skipped"] += 1
+                self._count("writes", result="unchanged")
+                saved = False
+            else:
+                history = history_path(self.store.course_path(self.course_id), self.content, self.topic)
+                _, written = _written(history, lambda: self.store.write_note(self.course_id, self.content, self.topic, text))
+                self._wrote("history", written)
+                self._wrote("note", len(text.encode("utf-8")))
+                # Refresh this topic's flashcards and quiz in the background
+                enqueue(self.course_id, self.content, self.topic, digest)
+                self.stats["writes"] += 1
+                self._count("writes", result="saved")
+                saved = True
+            self.saved_hash = digest
+            self.saved_at = time.time()
+            self._clear_journal()
+            return saved
+
+    # Saves text right away (the explicit Save button)
+    def save(self, text):
+        with self._lock:
+            self.change(text)
+            if self.pending is None and text_hash(text) != self.store.note_hash(self.course_id, self.content, self.topic):
+                self.pending = text  # e.g. the note was changed elsewhere meanwhile
+            return self.flush()
+
+    # Picks up the note as saved elsewhere (another session, a restore, the
+    # topic deleted and re-created) unless there are edits waiting
+    def refresh(self):
+        with self._lock:
+            if self.pending is not None:
+                return
+            if self.store.note_hash(self.course_id, self.content, self.topic) != self.saved_hash:
+                self.text = self.store.read_note(self.course_id, self.content, self.topic) or ""
+                self.saved_hash = text_hash(self.text)
+
+    # --- Recovery of a journal left by a crash or restart ---
+    # (text, saved_at) of unsaved edits that differ from the note, or None
+    def recover(self):
+        with self._lock:
+            if self.pending is not None:
+                return None  # our own edits, still waiting for the timer
+            revisions = self.journal.revisions()
+            if not revisions:
+                return None
+            if revisions[-1][2] == self.store.note_hash(self.course_id, self.content, self.topic):
+                self._clear_journal()
+                return None
+            return self.journal.checkout(), revisions[-1][1]
+
+    def discard(self):
+        with self._lock:
+            self._cancel()
+            self.pending = self.first_change = None
+            self._clear_journal()
+
+    # --- Helpers ---
+    def _cancel(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+    def _clear_journal(self):
+        for path in (self.journal.path, f"{self.journal.path}.lock"):
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _wrote(self, target, size):
+        self.stats["written_bytes"] += size
+        self._count("bytes", size, target=target)
+
+    # Bytes written per character edited
+    def amplification(self):
+        return self.stats["written_bytes"] / max(1, self.stats["changed_chars"])
+
+
+# The session's saver for this topic. Opening another topic flushes and
+# replaces the previous one, so a session holds at most one.
+def get_autosaver(session, store, course_id, content, topic):
+    saver = session.get("autosaver")
+    if saver is not None and saver.key != (store.course_path(course_id), content, topic):
+        saver.flush()
+        saver = None
+    if saver is None:
+        saver = session["autosaver"] = Autosaver(store, course_id, content, topic)
+    else:
+        saver.refresh()
+    return saver
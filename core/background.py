@@ -0,0 +1,238 @@
+import os
+import time
+import sqlite3
+import logging
+import threading
+from core.paths import find_smartstudy_path
+from core.storage import get_store, text_hash
+from core.pipeline import flashcards_stale, refresh_flashcards, refresh_quiz
+from core.normalize import note_markdown
+from core.providers import get_client
+from core.accounting import BudgetExceededError, metered, next_period_start
+
+# --- Persistent pre-generation queue ---
+# Saving a note enqueues one job for its topic; the job regenerates the
+# topic's flashcards and then its quiz. Jobs live in <SMARTSTUDY_DIR>/jobs.db
+# so they survive restarts. There is at most one job per topic: enqueueing
+# again just replaces the revision (note hash) with the latest one. A job is
+# only removed once the revision it finished is still the latest, so an edit
+# made while a job runs gets picked up by a second pass.
+
+MAX_ATTEMPTS = 3
+RETRY_DELAY = 30  # seconds, multiplied by the attempt number
+STALE_CLAIM = 600  # a "running" job not touched for this long was orphaned by a crash
+HEARTBEAT = 60  # seconds between touches of the running job, well under STALE_CLAIM
+
+log = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    course_id TEXT NOT NULL,
+    content TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    revision TEXT NOT NULL,
+    status TEXT NOT NULL,  -- pending | running | failed
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    updated_at REAL NOT NULL,
+    error TEXT,
+    PRIMARY KEY (course_id, content, topic)
+);
+CREATE INDEX IF NOT EXISTS jobs_by_status ON jobs (status, not_before);
+"""
+
+_local = threading.local()
+_worker = None
+_worker_lock = threading.Lock()
+_wakeup = threading.Event()
+
+
+def _db_path():
+    return os.path.join(find_smartstudy_path(), "jobs.db")
+
+
+def _conn():
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        conn = sqlite3.connect(_db_path(), timeout=30, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA busy_timeout=30000")
+        conn.executescript(SCHEMA)
+        _local.conn = conn
+    return conn
+
+
+# --- Producers / page helpers ---
+def enqueue(course_id, content, topic, revision):
+    _conn().execute(
+        """
+        INSERT INTO jobs (course_id, content, topic, revision, status, attempts, not_before, updated_at)
+        VALUES (?, ?, ?, ?, 'pending', 0, 0, ?)
+        ON CONFLICT (course_id, content, topic) DO UPDATE SET
+            revision = excluded.revision,
+            status = CASE WHEN jobs.status = 'running' THEN 'running' ELSE 'pending' END,
+            attempts = 0,
+            not_before = 0,
+            updated_at = excluded.updated_at,
+            error = NULL
+        """,
+        (course_id, content, topic, revision, time.time()),
+    )
+    ensure_worker()
+    _wakeup.set()
+
+
+# {topic: status} of work still to do for a content (pending or running),
+# used for staleness badges
+def queued_topics(course_id, content):
+    rows = _conn().execute(
+        "SELECT topic, status FROM jobs WHERE course_id = ? AND content = ? AND status != 'failed'",
+        (course_id, content),
+    ).fetchall()
+    return dict(rows)
+
+
+# {topic: error} of jobs that gave up after MAX_ATTEMPTS. They stay failed
+# until enqueued again (pages do so when they find the topic still stale).
+def failed_topics(course_id, content):
+    rows = _conn().execute(
+        "SELECT topic, error FROM jobs WHERE course_id = ? AND content = ? AND status = 'failed'",
+        (course_id, content),
+    ).fetchall()
+    return dict(rows)
+
+
+def failure_notice(failed):
+    details = "; ".join(f"{topic}: {error}" for topic, error in sorted(failed.items()))
+    return ("warning", f"⚠️ Background refresh failed for {len(failed)} topic(s), retrying now ({details}).")
+
+
+# --- Worker ---
+def ensure_worker():
+    global _worker
+    with _worker_lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = threading.Thread(target=_work_forever, name="smartstudy-pregen", daemon=True)
+            _worker.start()
+
+
+def _claim():
+    conn = _conn()
+    now = time.time()
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute(
+            "UPDATE jobs SET status = 'pending' WHERE status = 'running' AND updated_at < ?",
+            (now - STALE_CLAIM,),
+        )
+        row = conn.execute(
+            "SELECT course_id, content, topic, revision, attempts FROM jobs "
+            "WHERE status = 'pending' AND not_before <= ? ORDER BY updated_at LIMIT 1",
+            (now,),
+        ).fetchone()
+        if row is not None:
+            conn.execute(
+                "UPDATE jobs SET status = 'running', updated_at = ? WHERE course_id = ? AND content = ? AND topic = ?",
+                (now, row[0], row[1], row[2]),
+            )
+        conn.execute("COMMIT")
+        return row
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _run(course_id, content, topic):
+    store = get_store()
+    if store.note_hash(course_id, content, topic) is None:
+        return
+    client = metered(get_client(), course_id)
+    if flashcards_stale(store, course_id, content, topic):
+        note = store.read_note(course_id, content, topic)
+        if not note or not note_markdown(note).strip():
+            return
+        refresh_flashcards(store, client, course_id, content, topic)
+    flashcards = store.read_flashcards(course_id, content, topic)
+    if flashcards is not None and store.quiz_source_hash(course_id, content, topic) != text_hash(flashcards):
+        refresh_quiz(store, client, course_id, content, topic)
+
+
+# Keeps the claim on a running job fresh until stop is set, so a long
+# generation is never mistaken for an orphan and re-claimed by another worker
+def _heartbeat(job, stop):
+    course_id, content, topic = job[:3]
+    while not stop.wait(HEARTBEAT):
+        try:
+            _conn().execute(
+                "UPDATE jobs SET updated_at = ? WHERE course_id = ? AND content = ? AND topic = ? AND status = 'running'",
+                (time.time(), course_id, content, topic),
+            )
+        except sqlite3.Error:
+            log.exception("Could not extend the claim on %s / %s", content, topic)
+
+
+def _finish(job, error):
+    course_id, content, topic, revision, attempts = job
+    conn = _conn()
+    if error is None:
+        # Only done if nobody enqueued a newer revision meanwhile
+        cur = conn.execute(
+            "DELETE FROM jobs WHERE course_id = ? AND content = ? AND topic = ? AND revision = ?",
+            (course_id, content, topic, revision),
+        )
+        if cur.rowcount == 0:
+            conn.execute(
+                "UPDATE jobs SET status = 'pending', updated_at = ? WHERE course_id = ? AND content = ? AND topic = ?",
+                (time.time(), course_id, content, topic),
+            )
+        return
+    if isinstance(error, BudgetExceededError):
+        # Not a failure: hold the job until the course's budget resets
+        conn.execute(
+            "UPDATE jobs SET status = 'pending', not_before = ?, updated_at = ?, error = ? "
+            "WHERE course_id = ? AND content = ? AND topic = ?",
+            (next_period_start(), time.time(), str(error), course_id, content, topic),
+        )
+        return
+    attempts += 1
+    conn.execute(
+        "UPDATE jobs SET status = ?, attempts = ?, not_before = ?, updated_at = ?, error = ? "
+        "WHERE course_id = ? AND content = ? AND topic = ?",
+        (
+            "failed" if attempts >= MAX_ATTEMPTS else "pending",
+            attempts,
+            time.time() + RETRY_DELAY * attempts,
+            time.time(),
+            str(error),
+            course_id, content, topic,
+        ),
+    )
+
+
+def _work_forever():
+    while True:
+        try:
+            job = _claim()
+        except sqlite3.Error:
+            log.exception("Could not claim a pre-generation job")
+            job = None
+        if job is None:
+            _wakeup.wait(timeout=5)
+            _wakeup.clear()
+            continue
+        error = None
+        stop = threading.Event()
+        threading.Thread(target=_heartbeat, args=(job, stop), name="smartstudy-pregen-heartbeat", daemon=True).start()
+        try:
+            _run(job[0], job[1], job[2])
+        except Exception as exc:
+            log.warning("Pre-generation failed for %s / %s: %s", job[1], job[2], exc)
+            error = exc
+        finally:
+            stop.set()
+        try:
+            _finish(job, error)
+        except Exception:
+            # The job stays "running" and is re-claimed after STALE_CLAIM;
+            # the worker itself keeps going
+            log.exception("Could not record the result of %s / %s", job[1], job[2])
@@ -0,0 +1,80 @@
+import os
+import json
+import threading
+from collections import OrderedDict
+
+# --- Process-wide cache of parsed JSON files ---
+# Entries are keyed by path and revalidated with a single os.stat() against
+# (inode, mtime_ns, size), so an unchanged file is never parsed twice. Atomic
+# writes replace the file, so its inode changes even when two same-size
+# writes land inside one filesystem timestamp tick; save helpers still call
+# invalidate() for files written in place. Least recently used entries
+# are evicted once either the entry cap or the byte budget (file sizes on
+# disk) is exceeded.
+class JsonFileCache:
+    def __init__(self, max_entries=4096, max_bytes=64 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # path -> (stamp, size, data)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # Cached objects are shared between sessions: callers must not mutate them.
+    def get(self, path, default=None):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            self.invalidate(path)
+            return default
+        stamp = (st.st_ino, st.st_mtime_ns, st.st_size)
+
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == stamp:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[2]
+
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        with self._lock:
+            self.misses += 1
+            self._drop(path)
+            self._entries[path] = (stamp, st.st_size, data)
+            self._bytes += st.st_size
+            while self._entries and (len(self._entries) > self.max_entries or self._bytes > self.max_bytes):
+                _, (_, size, _) = self._entries.popitem(last=False)
+                self._bytes -= size
+        return data
+
+    def invalidate(self, path):
+        with self._lock:
+            self._drop(path)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _drop(self, path):
+        entry = self._entries.pop(path, None)
+        if entry is not None:
+            self._bytes -= entry[1]
+
+    def stats(self):
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
+
+
+json_cache = JsonFileCache(
+    max_entries=int(os.getenv("SMARTSTUDY_CACHE_ENTRIES", "4096")),
+    max_bytes=int(float(os.getenv("SMARTSTUDY_CACHE_MB", "64")) * 1024 * 1024),
+)
@@ -0,0 +1,65 @@
+import os
+import re
+
+try:
+    import tiktoken
+    _encoding = tiktoken.get_encoding("o200k_base")
+except Exception:  # optional dependency
+    _encoding = None
+
+CHUNK_TOKENS = int(os.getenv("SMARTSTUDY_CHUNK_TOKENS", "3000"))
+
+# Block boundaries in Quill HTML and Markdown: blank lines, the end of a
+# paragraph/list/code block, and the start of a heading (incl. "### " cards)
+BLOCK_BREAK = re.compile(
+    r"\n\s*\n|(?<=</p>)|(?<=</ul>)|(?<=</ol>)|(?<=</pre>)|(?<=</blockquote>)"
+    r"|(?=<h[1-6][\s>])|\n(?=#{1,6} )",
+    re.IGNORECASE,
+)
+HEADING = re.compile(r"\s*(<h[1-6][\s>]|#{1,6} )", re.IGNORECASE)
+SENTENCE_BREAK = re.compile(r"(?<=[.!?])\s+|\n")
+
+
+def estimate_tokens(text):
+    if _encoding is not None:
+        return len(_encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+# --- Split text into token-budgeted chunks along headings and paragraphs ---
+# Blocks are packed greedily; a heading starts a new chunk once the current
+# one is at least half full, so sections stay together where they fit. A
+# single block over budget is cut at sentence (then line) boundaries.
+def split_chunks(text, budget=CHUNK_TOKENS):
+    chunks = []
+    current, current_tokens = [], 0
+    for block in _blocks(text, budget):
+        tokens = estimate_tokens(block)
+        starts_section = HEADING.match(block) is not None and current_tokens >= budget // 2
+        if current and (current_tokens + tokens > budget or starts_section):
+            chunks.append("\n".join(current))
+            current, current_tokens = [], 0
+        current.append(block)
+        current_tokens += tokens
+    if current:
+        chunks.append("\n".join(current))
+    return chunks
+
+
+def _blocks(text, budget):
+    for block in BLOCK_BREAK.split(text):
+        if not block or not block.strip():
+            continue
+        if estimate_tokens(block) <= budget:
+            yield block.strip()
+            continue
+        piece, piece_tokens = [], 0
+        for sentence in SENTENCE_BREAK.split(block):
+            tokens = estimate_tokens(sentence)
+            if piece and piece_tokens + tokens > budget:
+                yield " ".join(piece)
+                piece, piece_tokens = [], 0
+            piece.append(sentence)
+            piece_tokens += tokens
+        if piece:
+            yield " ".join(piece)
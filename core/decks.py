@@ -0,0 +1,38 @@
+import threading
+from collections import OrderedDict
+
+MAX_CACHED_DECKS = 256
+
+# (store root, course_id, content) -> (sources, text), most recently used last
+_decks = OrderedDict()
+_lock = threading.Lock()
+
+
+# --- Content-level deck, derived from the topic decks ---
+# The deck records the {topic: hash} it was built from and is only rebuilt
+# when one of those hashes changes. Freshness is checked against the cached
+# manifest, so repeated calls (every Next/Previous click) read no deck files.
+def content_deck(store, course_id, content):
+    sources = store.topic_flashcard_hashes(course_id, content)
+    if not sources:
+        return None
+
+    key = (store.root, course_id, content)
+    with _lock:
+        cached = _decks.get(key)
+        if cached is not None and cached[0] == sources:
+            _decks.move_to_end(key)
+            return cached[1]
+
+    text, built_from = store.read_content_deck(course_id, content)
+    if text is None or built_from != sources:
+        topic_decks = [store.read_flashcards(course_id, content, topic) for topic in sources]
+        text = "\n\n".join(deck.strip() for deck in topic_decks if deck)
+        store.write_content_deck(course_id, content, text, sources)
+
+    with _lock:
+        _decks[key] = (sources, text)
+        _decks.move_to_end(key)
+        while len(_decks) > MAX_CACHED_DECKS:
+            _decks.popitem(last=False)
+    return text
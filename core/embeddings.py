@@ -0,0 +1,177 @@
+import os
+import re
+import zlib
+import shutil
+import threading
+import functools
+import numpy as np
+from core.paths import find_smartstudy_path
+from core.fileio import file_lock
+from core.identity import normalize
+
+# --- Embeddings for near-duplicate detection ---
+# Text is embedded with a local sentence-transformers model when
+# SMARTSTUDY_EMBED_MODEL names one (and the package is installed), otherwise
+# with a hashing vectorizer: word unigrams and bigrams hashed into HASH_DIM signed
+# buckets, L2-normalized. Both give unit vectors, so cosine similarity is a
+# dot product.
+
+HASH_DIM = 256
+DUPLICATE_THRESHOLD = float(os.getenv("SMARTSTUDY_DUPLICATE_THRESHOLD", "0.9"))
+BLOCK = 1024  # rows per matrix product; keeps peak memory at BLOCK x n floats
+WORD = re.compile(r"\w+")
+
+
+class HashingEmbedder:
+    name = f"hash{HASH_DIM}"
+    dim = HASH_DIM
+
+    def embed(self, texts):
+        matrix = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = WORD.findall(normalize(text))
+            for feature in words + [f"{a} {b}" for a, b in zip(words, words[1:])]:
+                h = zlib.crc32(feature.encode("utf-8"))
+                matrix[row, h % self.dim] += 1.0 if h & 0x80000000 else -1.0
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return matrix / np.maximum(norms, 1e-12)
+
+
+class SentenceEmbedder:
+    def __init__(self, model_name):
+        from sentence_transformers import SentenceTransformer
+        self.model = SentenceTransformer(model_name)
+        self.name = re.sub(r"\W+", "_", model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+
+    def embed(self, texts):
+        vectors = self.model.encode(list(texts), normalize_embeddings=True, convert_to_numpy=True)
+        return vectors.astype(np.float32)
+
+
+@functools.lru_cache(maxsize=None)
+def get_embedder():
+    model_name = os.getenv("SMARTSTUDY_EMBED_MODEL")
+    if model_name:
+        try:
+            return SentenceEmbedder(model_name)
+        except Exception:  # optional dependency or model not available offline
+            pass
+    return HashingEmbedder()
+
+
+# --- Per-course vector store ---
+# <SMARTSTUDY_DIR>/embeddings/<course_id>/<embedder>.f32 is a raw float32
+# matrix opened with np.memmap, one row per item; <embedder>.ids lists the
+# item IDs (core.identity) in row order. Items are embedded once: new ones
+# are appended to both files, and the ids file is the source of truth for
+# the row count (rows past it are left over from an interrupted append and
+# are truncated by the next one).
+class EmbeddingIndex:
+    def __init__(self, folder, embedder):
+        self.embedder = embedder
+        self.matrix_path = os.path.join(folder, f"{embedder.name}.f32")
+        self.ids_path = os.path.join(folder, f"{embedder.name}.ids")
+        self.ids = []
+        self.rows = {}
+        self.matrix = np.zeros((0, embedder.dim), dtype=np.float32)
+        self._ids_size = 0
+        self._lock = threading.Lock()
+
+    def _refresh(self):
+        try:
+            size = os.path.getsize(self.ids_path)
+        except FileNotFoundError:
+            return
+        if size == self._ids_size:
+            return
+        with open(self.ids_path, "r", encoding="utf-8") as f:
+            text = f.read()
+        self.ids = text[:text.rfind("\n") + 1].split()
+        self.rows = {item_id: row for row, item_id in enumerate(self.ids)}
+        self._ids_size = size
+        if self.ids:
+            self.matrix = np.memmap(self.matrix_path, dtype=np.float32, mode="r", shape=(len(self.ids), self.embedder.dim))
+
+    def _append(self, item_ids, vectors):
+        os.makedirs(os.path.dirname(self.matrix_path), exist_ok=True)
+        with file_lock(self.ids_path):
+            self._refresh()
+            keep = [i for i, item_id in enumerate(item_ids) if item_id not in self.rows]
+            if not keep:
+                return
+            row_bytes = self.embedder.dim * 4
+            with open(self.matrix_path, "ab") as f:
+                f.truncate(len(self.ids) * row_bytes)
+                f.write(np.ascontiguousarray(vectors[keep], dtype=np.float32).tobytes())
+                f.flush()
+                os.fsync(f.fileno())
+            with open(self.ids_path, "a", encoding="utf-8") as f:
+                f.write("".join(f"{item_ids[i]}\n" for i in keep))
+            self._refresh()
+
+    # items: {id: text}; returns an (n, dim) array in the order of items
+    def vectors(self, items):
+        with self._lock:
+            self._refresh()
+            missing = [item_id for item_id in items if item_id not in self.rows]
+            if missing:
+                self._append(missing, self.embedder.embed([items[item_id] for item_id in missing]))
+            return np.asarray(self.matrix[[self.rows[item_id] for item_id in items]])
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _index_folder(course_id):
+    return os.path.join(find_smartstudy_path(), "embeddings", str(course_id))
+
+
+def get_embedding_index(course_id):
+    embedder = get_embedder()
+    folder = _index_folder(course_id)
+    with _indexes_lock:
+        index = _indexes.get((folder, embedder.name))
+        if index is None:
+            index = _indexes[(folder, embedder.name)] = EmbeddingIndex(folder, embedder)
+    return index
+
+
+# Deletes a course's vectors (every embedder's, on disk and in this process)
+def remove_embeddings(course_id):
+    folder = _index_folder(course_id)
+    with _indexes_lock:
+        for key in [key for key in _indexes if key[0] == folder]:
+            del _indexes[key]
+    shutil.rmtree(folder, ignore_errors=True)
+
+
+# --- Duplicates within a batch of unit vectors ---
+# duplicate_of[i] is the first earlier row whose similarity to row i is at
+# least the threshold (resolved to the first row of its group), or -1.
+# Computed in BLOCK-row slabs, so memory stays O(BLOCK * n).
+def find_duplicates(vectors, threshold=DUPLICATE_THRESHOLD):
+    n = len(vectors)
+    duplicate_of = np.full(n, -1, dtype=np.int64)
+    for start in range(0, n, BLOCK):
+        end = min(n, start + BLOCK)
+        sims = vectors[start:end] @ vectors[:end].T
+        rows, cols = np.triu_indices(end - start)
+        sims[rows, cols + start] = -np.inf  # only earlier rows count
+        best = sims.argmax(axis=1)
+        for row in np.flatnonzero(sims[np.arange(end - start), best] >= threshold):
+            target = best[row]
+            duplicate_of[start + row] = duplicate_of[target] if duplicate_of[target] >= 0 else target
+    return duplicate_of
+
+
+# items: {id: text} in deck order. Returns (ids to keep, {dropped id: kept id}).
+def dedupe(course_id, items, threshold=DUPLICATE_THRESHOLD):
+    if len(items) < 2:
+        return list(items), {}
+    item_ids = list(items)
+    duplicate_of = find_duplicates(get_embedding_index(course_id).vectors(items), threshold)
+    kept = [item_id for item_id, dup in zip(item_ids, duplicate_of) if dup < 0]
+    merged = {item_id: item_ids[dup] for item_id, dup in zip(item_ids, duplicate_of) if dup >= 0}
+    return kept, merged
@@ -0,0 +1,131 @@
+import os
+import json
+import time
+import random
+import shutil
+import tempfile
+import functools
+import contextlib
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+MAX_RETRIES = 20
+
+
+# mkstemp() creates 0600 files; atomic writes should get the same mode a
+# plain open(path, "w") would have produced. os.umask() can only be read by
+# setting it, which races with other threads creating files, so the umask
+# comes from /proc (Linux) or from the mode of a freshly created probe file.
+@functools.lru_cache(maxsize=None)
+def _file_mode():
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return 0o666 & ~int(line.split()[1], 8)
+    except OSError:
+        pass
+    folder = tempfile.mkdtemp()
+    probe = os.path.join(folder, "probe")
+    try:
+        os.close(os.open(probe, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o666))
+        return os.stat(probe).st_mode & 0o777
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+
+
+class WriteConflictError(RuntimeError):
+    pass
+
+
+# --- Atomic writes: temp file in the same folder, then rename over the target ---
+# A crash mid-write leaves the old file untouched (plus a stray .tmp file),
+# never a truncated one.
+def atomic_write_bytes(path, data):
+    folder = os.path.dirname(path)
+    os.makedirs(folder, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=folder, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.chmod(tmp_path, _file_mode())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.remove(tmp_path)
+        raise
+
+
+def atomic_write_text(path, text):
+    atomic_write_bytes(path, text.encode("utf-8"))
+
+
+def atomic_write_json(path, data):
+    atomic_write_bytes(path, json.dumps(data, indent=2).encode("utf-8"))
+
+
+# --- Advisory lock on a sidecar <path>.lock file ---
+@contextlib.contextmanager
+def file_lock(path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(f"{path}.lock", "a+b") as lock:
+        if fcntl:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+        else:
+            while True:
+                try:
+                    lock.seek(0)
+                    msvcrt.locking(lock.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    continue  # LK_LOCK gives up after ~10s; keep waiting
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+            else:
+                lock.seek(0)
+                msvcrt.locking(lock.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def _read_bytes(path):
+    try:
+        with open(path, "rb") as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+# --- Compare-and-swap update of a JSON file ---
+# mutate(data) returns the new data, or None when nothing needs writing.
+# The read and mutate happen without the lock; the write only goes through
+# if the file still holds exactly the bytes we read, otherwise we retry with
+# the fresh contents. The last attempt runs entirely under the lock so a
+# writer can never starve. Returns the data that was written, or None.
+def update_json(path, mutate, default):
+    for attempt in range(MAX_RETRIES + 1):
+        last_attempt = attempt == MAX_RETRIES
+        with contextlib.ExitStack() as stack:
+            if last_attempt:
+                stack.enter_context(file_lock(path))
+            raw = _read_bytes(path)
+            data = json.loads(raw) if raw is not None else json.loads(json.dumps(default))
+            new_data = mutate(data)
+            if new_data is None:
+                return None
+            if not last_attempt:
+                stack.enter_context(file_lock(path))
+                if _read_bytes(path) != raw:
+                    stack.close()
+                    time.sleep(random.uniform(0, 0.005 * (attempt + 1)))
+                    continue
+            atomic_write_json(path, new_data)
+            return new_data
+    raise WriteConflictError(f"Could not update {path}")
@@ -0,0 +1,168 @@
+import os
+import re
+import zlib
+import hashlib
+import threading
+from collections import defaultdict
+from core.fileio import atomic_write_text, file_lock
+
+# --- Content-derived IDs for cards and quiz questions ---
+# IDs hash the normalized text (case, whitespace and Markdown markers
+# ignored), so they survive reordering and cosmetic changes. A regenerated
+# card that is only *similar* gets a new ID; IdentityCatalog.carry_over()
+# then finds the vanished card it most likely replaces so review and score
+# history can be copied across.
+
+MARKUP = re.compile(r"[#*_`>]+|^\s*[-•]\s*", re.MULTILINE)
+WORD = re.compile(r"\w+")
+
+
+def normalize(text):
+    return " ".join(MARKUP.sub(" ", text).lower().split())
+
+
+def _digest(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def card_id(card):
+    title, _, bullets = card.strip().partition("\n")
+    return _digest(normalize(title) + "\n" + "\n".join(normalize(b) for b in bullets.splitlines() if b.strip()))
+
+
+def question_id(question):
+    options = sorted(normalize(str(o)) for o in question.get("options", []))
+    return _digest(normalize(str(question.get("question", ""))) + "\n" + "\n".join(options))
+
+
+def question_text(question):
+    return f"{question.get('question', '')} {question.get('answer', '')}"
+
+
+# --- MinHash signatures (one-permutation hashing) ---
+# Word 3-shingles are hashed once with crc32; the low bits pick one of BINS
+# bins and each bin keeps its smallest value. Two signatures agree on a bin
+# with probability ~ the Jaccard similarity of the shingle sets. Candidates
+# come from LSH: texts sharing every value of at least one band of ROWS bins
+# (short cards leave bins empty, hence the small bands).
+BINS = 32
+ROWS = 2
+EMPTY = -1
+MATCH_THRESHOLD = 0.6
+
+
+def signature(text):
+    words = WORD.findall(normalize(text))
+    shingles = [" ".join(words[i:i + 3]) for i in range(max(1, len(words) - 2))]
+    sig = [EMPTY] * BINS
+    for shingle in shingles:
+        h = zlib.crc32(shingle.encode("utf-8"))
+        b, v = h % BINS, h // BINS
+        if sig[b] == EMPTY or v < sig[b]:
+            sig[b] = v
+    return tuple(sig)
+
+
+def similarity(a, b):
+    used = [x == y for x, y in zip(a, b) if x != EMPTY or y != EMPTY]
+    return sum(used) / len(used) if used else 0.0
+
+
+def _bands(sig):
+    for start in range(0, BINS, ROWS):
+        band = sig[start:start + ROWS]
+        if any(v != EMPTY for v in band):
+            yield (start, band)
+
+
+# {new id: old id} for the new signatures that closely match an old one;
+# every old ID is used at most once, best matches first
+def match(old, new, threshold=MATCH_THRESHOLD):
+    buckets = defaultdict(list)
+    for oid, sig in old.items():
+        for band in _bands(sig):
+            buckets[band].append(oid)
+
+    pairs = []
+    for nid, sig in new.items():
+        candidates = {oid for band in _bands(sig) for oid in buckets.get(band, ())}
+        for oid in candidates:
+            score = similarity(sig, old[oid])
+            if score >= threshold:
+                pairs.append((score, nid, oid))
+
+    mapping = {}
+    used = set()
+    for score, nid, oid in sorted(pairs, reverse=True):
+        if nid not in mapping and oid not in used:
+            mapping[nid] = oid
+            used.add(oid)
+    return mapping
+
+
+# --- Persistent catalog of every ID seen, with its signature ---
+# One "<id> <signature>" line per item in an append-only file. Only items
+# that were never seen before are signed and appended, so a sync of an
+# unchanged deck costs a set difference, and matching only compares the
+# new items against vanished ones that still have history. Signatures are
+# kept as their file text and parsed only when matched, which keeps the
+# first load of a 100k-card catalog cheap.
+class IdentityCatalog:
+    def __init__(self, path):
+        self.path = path
+        self.signatures = {}
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if (st.st_mtime_ns, st.st_size) == self._stamp:
+            return
+        signatures = {}
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2 and parts[1].count(",") == BINS - 1:
+                    signatures[parts[0]] = parts[1]
+        self.signatures = signatures
+        self._stamp = (st.st_mtime_ns, st.st_size)
+
+    # items: {id: text} currently present; has_history(id) tells which
+    # vanished IDs are worth carrying over. Returns {new id: old id}.
+    def carry_over(self, items, has_history):
+        with self._lock:
+            self._load()
+            fresh = [i for i in items if i not in self.signatures]
+            if not fresh:
+                return {}
+            new = {i: signature(items[i]) for i in fresh}
+            orphans = {
+                i: tuple(int(v) for v in s.split(","))
+                for i, s in self.signatures.items() if i not in items and has_history(i)
+            }
+            mapping = match(orphans, new) if orphans else {}
+            new = {i: ",".join(str(v) for v in sig) for i, sig in new.items()}
+
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with file_lock(self.path):
+                self._load()
+                self.signatures.update(new)
+                if len(self.signatures) > 2 * len(items) + 1000:
+                    # Forget vanished items that have nothing to carry over
+                    self.signatures = {
+                        i: s for i, s in self.signatures.items() if i in items or has_history(i)
+                    }
+                    atomic_write_text(self.path, "".join(_line(i, s) for i, s in self.signatures.items()))
+                else:
+                    with open(self.path, "a", encoding="utf-8") as f:
+                        f.write("".join(_line(i, new[i]) for i in fresh))
+                st = os.stat(self.path)
+                self._stamp = (st.st_mtime_ns, st.st_size)
+            return mapping
+
+
+def _line(item_id, sig):
+    return f"{item_id} {sig}\n"
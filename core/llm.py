@@ -0,0 +1,243 @@
+import re
+import functools
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from core.llm_cache import get_llm_cache
+from core.scheduler import call_with_retry, default_workers, llm_slot, run_jobs
+from core.chunking import split_chunks
+from core.quiz_parser import parse_questions
+from core.identity import card_id, question_id
+from core.embeddings import DUPLICATE_THRESHOLD, get_embedder
+from core.providers import MODEL
+from core.metrics import metrics
+
+TEMPERATURE = 0.3
+
+# Bump a *_PROMPT_VERSION whenever its prompt changes so cached replies
+# generated with the old wording are no longer reused.
+FLASHCARD_PROMPT_VERSION = 1
+FLASHCARD_PROMPT = """
+You are a strict study assistant. Use ONLY the provided notes below to create flashcards. 
+Do NOT include any extra information or examples not found in the notes.
+
+Instructions:
+- Create multiple flashcards if the content contains multiple concepts.
+- Each flashcard should focus on only one concept or topic.
+- Use a title for each flashcard (start with ###).
+- Include only 3 to 5 short bullet points (-) per flashcard.
+- Do not combine multiple topics into one flashcard.
+- Be concise and clear — each flashcard should feel clean and easy to revise.
+- Flashcards must include all the topics mentioned in the notes.
+- Do not skip any of the points from the notes.
+- If the notes include examples, include them concisely.
+- If an important concept lacks clarity in the notes, you may add a **very simple example**, but only if it helps understanding and does not introduce unrelated content.
+
+Notes:
+\"\"\"{notes}\"\"\"
+
+Now generate the flashcards in Markdown format.
+"""
+
+# Flashcards are separated by their "### " titles
+CARD_BOUNDARY = re.compile(r'\n(?=### )')
+
+QUIZ_PROMPT_VERSION = 1
+QUIZ_PROMPT = """
+You are a helpful assistant. Use ONLY the notes below to create quiz questions.
+
+Instructions:
+- Generate AS MANY **multiple-choice questions** (MCQs) as needed to fully cover all the key concepts and bullet points from the notes.
+- Each question must have 4 options.
+- Highlight the correct option clearly in the JSON response.
+- Do NOT add any content that is not present in the notes.
+- Do NOT skip any point from the flashcards.
+- Avoid repeating the same concept across questions.
+
+Notes:
+\"\"\"{flashcards}\"\"\"
+
+Format:
+[
+  {{
+    "question": "What is ...?",
+    "options": ["A", "B", "C", "D"],
+    "answer": "B"
+  }},
+  ...
+]
+"""
+
+
+# --- Map-reduce over chunks of large inputs ---
+# Text that fits the chunk budget is sent as one request. Larger text is
+# split along headings/paragraphs, the chunks are generated in parallel and
+# each chunk's reply is cached under its own hash (editing one paragraph
+# only regenerates that chunk); the merge then drops cards and questions
+# that several chunks repeated, word for word or as the same concept
+# reworded (embedding similarity, as core.embeddings.dedupe does for decks).
+def _map_chunks(generate, client, chunks):
+    results = run_jobs([(i, functools.partial(generate, client, chunk)) for i, chunk in enumerate(chunks)])
+    for i in range(len(chunks)):
+        if isinstance(results[i], Exception):
+            raise results[i]
+    return [results[i] for i in range(len(chunks))]
+
+
+# Yields the items of each batch in order, skipping exact repeats (same key)
+# and items whose embedding is within DUPLICATE_THRESHOLD of one already
+# kept. Batches are embedded one at a time, so merged cards still stream.
+def _merge(batches, key, text):
+    seen, kept = set(), None
+    embedder = get_embedder()
+    for batch in batches:
+        fresh = []
+        for item in batch:
+            if key(item) not in seen:
+                seen.add(key(item))
+                fresh.append(item)
+        if not fresh:
+            continue
+        for item, vector in zip(fresh, embedder.embed([text(item) for item in fresh])):
+            if kept is not None and (kept @ vector).max() >= DUPLICATE_THRESHOLD:
+                continue
+            kept = vector[None] if kept is None else np.vstack([kept, vector])
+            yield item
+
+
+def _merge_cards(decks):
+    # Whole cards: common titles ("Example", "Summary") repeat across chunks
+    # with different content
+    cards = ([card.strip() for card in split_cards(deck)] for deck in decks)
+    yield from _merge(cards, card_id, lambda card: card)
+
+
+def _merge_questions(quizzes):
+    # Question plus options: generic wording ("Which of the following is
+    # true?") is shared by different questions
+    return list(_merge(quizzes, question_id, lambda q: f"{q['question']} {' '.join(str(o) for o in q['options'])}"))
+
+# Sent when a quiz reply was truncated or partly invalid: ask only for what
+# the kept questions don't cover yet.
+QUIZ_FOLLOWUP_PROMPT = """
+These questions were already written for the notes below:
+{covered}
+
+Write multiple-choice questions ONLY for the key concepts and bullet points of the notes that are NOT covered above.
+Use exactly the same JSON format (4 options each, "answer" must be one of the options). Return [] if everything is covered.
+
+Notes:
+\"\"\"{flashcards}\"\"\"
+"""
+QUIZ_MAX_FOLLOWUPS = 2
+
+
+def _cached(kind, version, text):
+    cache = get_llm_cache()
+    key = cache.key(kind, version, MODEL, TEMPERATURE, text)
+    value = cache.get(key)
+    metrics.inc("smartstudy_llm_cache_total", kind=kind, result="miss" if value is None else "hit")
+    return cache, key, value
+
+
+# --- Flashcard Generation ---
+def generate_flashcards(client, notes):
+    chunks = split_chunks(notes)
+    if len(chunks) <= 1:
+        return _flashcards_for(client, notes)
+    return "\n".join(_merge_cards(_map_chunks(_flashcards_for, client, chunks)))
+
+
+def _flashcards_for(client, notes):
+    cache, key, cached = _cached("flashcards", FLASHCARD_PROMPT_VERSION, notes)
+    if cached is not None:
+        return cached
+
+    response = call_with_retry(lambda: client.chat.completions.create(
+        model=MODEL,
+        messages=[{"role": "user", "content": FLASHCARD_PROMPT.format(notes=notes)}],
+        temperature=TEMPERATURE
+    ))
+    flashcards = response.choices[0].message.content.strip()
+    cache.put(key, flashcards)
+    return flashcards
+
+
+def split_cards(flashcards):
+    return CARD_BOUNDARY.split(flashcards)
+
+
+# --- Streaming Flashcard Generation ---
+# Yields each card as soon as the next "### " title shows up after it (the
+# last one when the stream ends). Only the card being written is re-scanned
+# per chunk. "\n".join() of the yielded cards is the deck; it is cached
+# once the stream completes, never when it breaks off.
+def stream_flashcards(client, notes):
+    chunks = split_chunks(notes)
+    if len(chunks) > 1:
+        # Chunks are generated in parallel and their cards released in order
+        with ThreadPoolExecutor(max_workers=default_workers()) as pool:
+            decks = pool.map(functools.partial(_flashcards_for, client), chunks)
+            yield from _merge_cards(decks)
+        return
+
+    cache, key, cached = _cached("flashcards", FLASHCARD_PROMPT_VERSION, notes)
+    if cached is not None:
+        yield from split_cards(cached)
+        return
+
+    cards = []
+    pending = ""
+    with llm_slot():  # held until the reply has streamed in (or the stream is closed)
+        stream = call_with_retry(lambda: client.chat.completions.create(
+            model=MODEL,
+            messages=[{"role": "user", "content": FLASHCARD_PROMPT.format(notes=notes)}],
+            temperature=TEMPERATURE,
+            stream=True,
+            stream_options={"include_usage": True}
+        ), slot=False)
+        for chunk in stream:
+            if not chunk.choices:
+                continue
+            pending += chunk.choices[0].delta.content or ""
+            *complete, pending = split_cards(pending.lstrip() if not cards else pending)
+            for card in complete:
+                cards.append(card.rstrip())
+                yield cards[-1]
+    if pending.strip() or not cards:
+        cards.append(pending.strip())
+        yield cards[-1]
+    cache.put(key, "\n".join(cards))
+
+
+# --- Quiz Generation (from one topic's flashcards) ---
+def generate_quiz(client, flashcards):
+    chunks = split_chunks(flashcards)
+    if len(chunks) <= 1:
+        return _quiz_for(client, flashcards)
+    return _merge_questions(_map_chunks(_quiz_for, client, chunks))
+
+
+def _quiz_for(client, flashcards):
+    cache, key, cached = _cached("quiz", QUIZ_PROMPT_VERSION, flashcards)
+    if cached is not None:
+        return cached
+
+    prompt = QUIZ_PROMPT.format(flashcards=flashcards)
+    questions = []
+    for _ in range(QUIZ_MAX_FOLLOWUPS + 1):
+        res = call_with_retry(lambda: client.chat.completions.create(
+            model=MODEL,
+            messages=[{"role": "user", "content": prompt}],
+            temperature=TEMPERATURE
+        ))
+        batch, complete = parse_questions(res.choices[0].message.content or "")
+        questions = _merge_questions([questions, batch])
+        if complete:
+            break
+        covered = "\n".join(f"- {q['question']}" for q in questions) or "- (none)"
+        prompt = QUIZ_FOLLOWUP_PROMPT.format(covered=covered, flashcards=flashcards)
+
+    if not questions:
+        raise ValueError("The model did not return any valid quiz questions")
+    cache.put(key, questions)
+    return questions
@@ -0,0 +1,143 @@
+import os
+import re
+import json
+import time
+import hashlib
+import threading
+import functools
+from core.paths import find_smartstudy_path
+from core.fileio import atomic_write_json
+
+BLANKS = re.compile(r"[ \t]+")
+
+
+# Inputs are Markdown (core.normalize), where line breaks and indentation
+# carry meaning: only runs of blanks inside a line and trailing blanks are
+# ignored, so "# A\nb" and "# A b" get different keys
+def _normalize(text):
+    lines = []
+    for line in text.strip().splitlines():
+        line = line.rstrip()
+        body = line.lstrip(" \t")
+        lines.append(line[:len(line) - len(body)] + BLANKS.sub(" ", body))
+    return "\n".join(lines)
+
+
+# --- Persistent, content-addressed cache of model replies ---
+# Keys hash everything that determines the reply (prompt kind and template
+# version, model, temperature, normalized input), so an edited note misses
+# and an identical note in any course or session hits. Entries live under
+# <SMARTSTUDY_DIR>/cache/llm/<aa>/<key>.json. A hit refreshes the file's
+# mtime: entries unused for longer than max_age are dropped, and size-based
+# eviction removes the least recently used first.
+class LLMCache:
+    def __init__(self, folder, max_bytes, max_age):
+        self.folder = folder
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.hits = 0
+        self.misses = 0
+        self._bytes = None  # total size on disk, computed on first put
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(kind, version, model, temperature, text):
+        payload = json.dumps([kind, version, model, temperature, _normalize(text)])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.folder, key[:2], f"{key}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) > self.max_age:
+                self._discard(path)
+                entry = None
+            else:
+                with open(path, "r", encoding="utf-8") as f:
+                    entry = json.load(f)
+        except (FileNotFoundError, ValueError):
+            entry = None
+
+        with self._lock:
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return entry["value"]
+
+    def put(self, key, value):
+        path = self._path(key)
+        atomic_write_json(path, {"created": time.time(), "value": value})
+        size = os.path.getsize(path)
+        with self._lock:
+            if self._bytes is None:
+                self._bytes = self._scan_size()
+            else:
+                self._bytes += size
+            over_budget = self._bytes > self.max_bytes
+        if over_budget:
+            self.evict()
+
+    # --- Eviction: expired entries first, then least recently used ---
+    def evict(self):
+        now = time.time()
+        entries = []
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                path = os.path.join(root, name)
+                try:
+                    st = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                if now - st.st_mtime > self.max_age:
+                    self._discard(path)
+                else:
+                    entries.append((st.st_mtime, st.st_size, path))
+
+        entries.sort()
+        total = sum(size for _, size, _ in entries)
+        target = self.max_bytes * 0.9  # leave headroom so we don't evict on every put
+        for _, size, path in entries:
+            if total <= target:
+                break
+            self._discard(path)
+            total -= size
+        with self._lock:
+            self._bytes = total
+
+    def _scan_size(self):
+        total = 0
+        for root, _, files in os.walk(self.folder):
+            for name in files:
+                try:
+                    total += os.path.getsize(os.path.join(root, name))
+                except FileNotFoundError:
+                    pass
+        return total
+
+    def _discard(self, path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+
+@functools.lru_cache(maxsize=None)
+def get_llm_cache():
+    return LLMCache(
+        os.path.join(find_smartstudy_path(), "cache", "llm"),
+        max_bytes=int(float(os.getenv("SMARTSTUDY_LLM_CACHE_MB", "256")) * 1024 * 1024),
+        max_age=float(os.getenv("SMARTSTUDY_LLM_CACHE_DAYS", "90")) * 86400,
+    )
@@ -0,0 +1,115 @@
+import os
+import time
+import bisect
+import threading
+import contextlib
+from core.paths import find_smartstudy_path
+from core.fileio import atomic_write_text
+
+# --- Process-wide counters and latency histograms ---
+# Everything is kept in memory and written as Prometheus text exposition
+# format to <SMARTSTUDY_DIR>/metrics.prom (SMARTSTUDY_METRICS_FILE), at most
+# every SMARTSTUDY_METRICS_INTERVAL seconds. Point node_exporter's textfile
+# collector at the folder, or just read the file.
+
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+HELP = {
+    "smartstudy_llm_requests_total": ("counter", "LLM API requests"),
+    "smartstudy_llm_errors_total": ("counter", "LLM API requests that raised"),
+    "smartstudy_llm_tokens_total": ("counter", "Tokens used by LLM requests"),
+    "smartstudy_llm_cost_usd_total": ("counter", "Estimated LLM cost in US dollars"),
+    "smartstudy_llm_request_seconds": ("histogram", "LLM request latency (streams: until the last chunk)"),
+    "smartstudy_llm_cache_total": ("counter", "LLM reply cache lookups"),
+    "smartstudy_llm_budget_refusals_total": ("counter", "Generations refused by a course token budget"),
+    "smartstudy_io_seconds": ("histogram", "Storage reads and writes made by the pages"),
+    "smartstudy_autosave_edits_total": ("counter", "Editor changes seen by autosave"),
+    "smartstudy_autosave_changed_chars_total": ("counter", "Characters changed by those edits"),
+    "smartstudy_autosave_writes_total": ("counter", "Debounced note writes (result=saved or unchanged)"),
+    "smartstudy_autosave_bytes_total": ("counter", "Bytes autosave wrote to the journal, note and history"),
+}
+
+
+class Metrics:
+    def __init__(self, path, interval):
+        self.path = path
+        self.interval = interval
+        self.counters = {}
+        self.histograms = {}  # key -> [bucket counts..., +Inf count, sum]
+        self._exported = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, name, value=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+        self.maybe_export()
+
+    def observe(self, name, seconds, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            hist = self.histograms.get(key)
+            if hist is None:
+                hist = self.histograms[key] = [0] * (len(BUCKETS) + 2)
+            hist[bisect.bisect_left(BUCKETS, seconds)] += 1
+            hist[-1] += seconds
+        self.maybe_export()
+
+    @contextlib.contextmanager
+    def timer(self, name, **labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start, **labels)
+
+    def render(self):
+        with self._lock:
+            counters = sorted(self.counters.items())
+            histograms = sorted((key, list(hist)) for key, hist in self.histograms.items())
+        lines = []
+        described = set()
+
+        def describe(name):
+            if name not in described:
+                kind, text = HELP.get(name, ("untyped", name))
+                lines.append(f"# HELP {name} {text}")
+                lines.append(f"# TYPE {name} {kind}")
+                described.add(name)
+
+        for (name, labels), value in counters:
+            describe(name)
+            lines.append(f"{name}{_labels(labels)} {value:g}")
+        for (name, labels), hist in histograms:
+            describe(name)
+            cumulative = 0
+            for bound, count in zip(BUCKETS + ("+Inf",), hist[:-1]):
+                cumulative += count
+                lines.append(f"{name}_bucket{_labels(labels + (('le', f'{bound:g}' if bound != '+Inf' else bound),))} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labels)} {hist[-1]:g}")
+            lines.append(f"{name}_count{_labels(labels)} {cumulative}")
+        return "\n".join(lines) + "\n"
+
+    def maybe_export(self):
+        if time.monotonic() - self._exported >= self.interval:
+            self.export()
+
+    def export(self):
+        self._exported = time.monotonic()
+        try:
+            atomic_write_text(self.path, self.render())
+        except OSError:
+            pass  # metrics must never break a page
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in labels)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(labels, escaped)) + "}"
+
+
+metrics = Metrics(
+    os.getenv("SMARTSTUDY_METRICS_FILE") or os.path.join(find_smartstudy_path(), "metrics.prom"),
+    float(os.getenv("SMARTSTUDY_METRICS_INTERVAL", "10")),
+)
@@ -0,0 +1,62 @@
+import os
+import sys
+from core.paths import find_smartstudy_path
+from core.storage import FileStore, SqliteStore
+
+# --- One-shot import of an existing SmartStudy tree into SQLite ---
+# Usage: python -m core.migrate [SMARTSTUDY_DIR]
+# Safe to re-run: every row is written with INSERT OR REPLACE. After it
+# finishes, start the app with SMARTSTUDY_STORE=sqlite.
+def migrate_to_sqlite(root, db_path=None):
+    source = FileStore(root)
+    target = SqliteStore(root, db_path)
+    counts = {"courses": 0, "contents": 0, "topics": 0, "notes": 0, "flashcards": 0, "quizzes": 0}
+
+    for course in source.list_courses():
+        course_id = course["id"]
+        target.add_course(course)
+        counts["courses"] += 1
+
+        for content in source.list_contents(course_id):
+            target.add_content(course_id, content)
+            counts["contents"] += 1
+
+            deck = source.read_flashcards(course_id, content)
+            if deck is not None:
+                target.write_flashcards(course_id, content, None, deck)
+                counts["flashcards"] += 1
+
+            for topic in source.list_topics(course_id, content):
+                target.add_topic(course_id, content, topic)
+                counts["topics"] += 1
+
+                note = source.read_note(course_id, content, topic)
+                if note is not None:
+                    target.write_note(course_id, content, topic, note)
+                    counts["notes"] += 1
+
+                cards = source.read_flashcards(course_id, content, topic)
+                if cards is not None:
+                    target.write_flashcards(
+                        course_id, content, topic, cards,
+                        source.flashcard_source_hash(course_id, content, topic),
+                    )
+                    counts["flashcards"] += 1
+
+                questions = source.read_quiz(course_id, content, topic)
+                if questions is not None:
+                    target.write_quiz(
+                        course_id, content, topic, questions,
+                        source.quiz_source_hash(course_id, content, topic),
+                    )
+                    counts["quizzes"] += 1
+
+    return counts
+
+
+if __name__ == "__main__":
+    root = os.path.abspath(sys.argv[1]) if len(sys.argv) > 1 else find_smartstudy_path()
+    counts = migrate_to_sqlite(root)
+    print(f"Migrated {root} -> {os.path.join(root, 'smartstudy.db')}")
+    for name, count in counts.items():
+        print(f"  {name}: {count}")
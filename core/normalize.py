@@ -0,0 +1,204 @@
+import re
+import functools
+from html.parser import HTMLParser
+
+# --- Quill HTML -> compact Markdown ---
+# Notes are stored as the editor's HTML. Before they reach a prompt, a hash or
+# the search index they are turned into Markdown that keeps the structure
+# (headings, nested lists, code blocks, quotes, bold/italic/inline code,
+# links) and drops everything cosmetic: classes, inline styles, colours,
+# fonts, empty paragraphs, entities and runs of whitespace. Restyling a note
+# therefore leaves its Markdown (and the flashcards made from it) unchanged.
+#
+# MarkdownWriter is a streaming html.parser handler: feed() it the HTML in
+# pieces and it writes Markdown as tags close, never holding more than the
+# current block. Only text that starts or ends with a block tag (as every
+# editor note does) is treated as HTML; anything else (Markdown, plain
+# notes, "if a<b and x>y") is passed through unchanged.
+
+HEADINGS = {f"h{n}": "#" * n for n in range(1, 7)}
+BLOCKS = {"p", "div", "section", "article", "header", "footer", "table", "tr", "figure"}
+SKIPPED = {"script", "style", "head", "title", "noscript"}
+INLINE = {"strong": "**", "b": "**", "em": "*", "i": "*", "s": "~~", "strike": "~~", "del": "~~"}
+_BLOCK_TAGS = "|".join(sorted(set(HEADINGS) | BLOCKS | {"ul", "ol", "li", "blockquote", "pre"}))
+LOOKS_LIKE_HTML = re.compile(
+    rf"^\s*(?:<!--.*?-->\s*)*<(?:{_BLOCK_TAGS})[\s/>]|</(?:{_BLOCK_TAGS})>\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+SPACES = re.compile(r"\s+")
+INDENT = re.compile(r"ql-indent-(\d+)")
+LIST_ITEM = re.compile(r"\s*(?:-|\d+\.) ")
+
+
+class MarkdownWriter(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.out = []  # finished blocks
+        self.line = []  # inline pieces of the current block
+        self.lists = []  # stack of ["-" | 1, 2, ...] per open list
+        self.prefix = ""  # marker of the current block ("## ", "- ", "> "...)
+        self.quote = 0
+        self.pre = 0
+        self.skip = 0
+        self.link = None
+        self.opened = False  # the last piece is an opening inline marker
+
+    # --- Inline markers ---
+    # Markdown only honours "**x**" when the markers hug the text, so
+    # whitespace just inside them is moved outside: "**bold **text" would
+    # render literally. An empty pair is dropped.
+    def _open_inline(self, marker):
+        self.line.append(marker)
+        self.opened = True
+
+    def _close_inline(self, marker):
+        if self.opened:
+            self.line.pop()  # nothing between the markers
+            self.opened = False
+            return
+        text = "".join(self.line)
+        stripped = text.rstrip()
+        self.line = [stripped, marker, text[len(stripped):]]
+
+    # --- Blocks ---
+    def _end_block(self):
+        if self.pre:
+            if self.line and self.line[-1] != "\n":
+                self.line.append("\n")  # a line of a code block
+            return
+        text = "".join(self.line)
+        self.line = []
+        text = SPACES.sub(" ", text).strip()
+        if text:
+            self.out.append("> " * self.quote + self.prefix + text)
+        self.prefix = ""
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED:
+            self.skip += 1
+            return
+        if self.skip:
+            return
+        if tag in HEADINGS:
+            self._end_block()
+            self.prefix = HEADINGS[tag] + " "
+        elif tag in BLOCKS:
+            self._end_block()
+        elif tag == "br":
+            if self.pre:
+                self.line.append("\n")
+            else:
+                self._end_block()
+        elif tag in ("ul", "ol"):
+            self._end_block()
+            self.lists.append("-" if tag == "ul" else 0)
+        elif tag == "li":
+            self._end_block()
+            # Quill 2 writes every list as <ol> and marks bullets per item
+            # (and Quill 1 nests with ql-indent-N classes instead of tags)
+            attrs = dict(attrs)
+            indent = INDENT.search(attrs.get("class") or "")
+            depth = max(len(self.lists) - 1, 0) + (int(indent.group(1)) if indent else 0)
+            if self.lists and self.lists[-1] != "-" and attrs.get("data-list") != "bullet":
+                self.lists[-1] += 1
+                marker = f"{self.lists[-1]}."
+            else:
+                marker = "-"
+            self.prefix = "  " * depth + marker + " "
+        elif tag == "blockquote":
+            self._end_block()
+            self.quote += 1
+        elif tag == "pre":
+            self._end_block()
+            self.pre += 1
+        elif tag == "code" and not self.pre:
+            self._open_inline("`")
+        elif tag in INLINE:
+            self._open_inline(INLINE[tag])
+        elif tag == "a":
+            self.link = dict(attrs).get("href")
+            self.line.append("[")
+            self.opened = False
+        elif tag == "img":
+            alt = dict(attrs).get("alt")
+            if alt:
+                self.line.append(alt)
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED:
+            self.skip = max(self.skip - 1, 0)
+            return
+        if self.skip:
+            return
+        if tag in HEADINGS or tag in BLOCKS or tag == "li":
+            self._end_block()
+        elif tag in ("ul", "ol"):
+            self._end_block()
+            if self.lists:
+                self.lists.pop()
+        elif tag == "blockquote":
+            self._end_block()
+            self.quote = max(self.quote - 1, 0)
+        elif tag == "pre" and self.pre:
+            self.pre -= 1
+            code = "".join(self.line).strip("\n")
+            self.line = []
+            if code.strip():
+                self.out.append(f"```\n{code}\n```")
+        elif tag == "code" and not self.pre:
+            self._close_inline("`")
+        elif tag in INLINE:
+            self._close_inline(INLINE[tag])
+        elif tag == "a":
+            self.line.append(f"]({self.link})" if self.link else "]")
+            self.link = None
+            self.opened = False
+
+    def handle_data(self, data):
+        if self.skip or not data:
+            return
+        if self.opened:
+            stripped = data.lstrip()
+            if not stripped:
+                return  # wait for the text (or the closing tag)
+            if len(stripped) != len(data) and not self.pre:
+                self.line[-1] = data[:len(data) - len(stripped)] + self.line[-1]
+                data = stripped
+            self.opened = False
+        self.line.append(data)
+
+    # Markdown written so far (complete blocks only)
+    def take(self):
+        blocks, self.out = self.out, []
+        return blocks
+
+    def close(self):
+        super().close()
+        self._end_block()
+
+
+def _join(blocks):
+    # Consecutive list items (and quote lines) stay together, other blocks
+    # are separated by a blank line
+    lines = []
+    for block in blocks:
+        if lines:
+            previous = lines[-1]
+            tight = (LIST_ITEM.match(previous) and LIST_ITEM.match(block)) or (previous[:1] == block[:1] == ">")
+            if not tight:
+                lines.append("")
+        lines.append(block)
+    return "\n".join(lines)
+
+
+# Cached by note text: each saved revision is converted once per process
+@functools.lru_cache(maxsize=512)
+def note_markdown(text):
+    if not text:
+        return ""
+    if not LOOKS_LIKE_HTML.search(text):
+        return text.strip()
+    writer = MarkdownWriter()
+    writer.feed(text)
+    writer.close()
+    return _join(writer.take())
@@ -0,0 +1,58 @@
+import math
+import streamlit as st
+
+PAGE_SIZES = [12, 24, 48]
+
+# --- Server-side filtering and pagination for the course/content/topic grids ---
+# Only the current page is rendered, so the number of widgets per rerun is
+# bounded by the largest page size however many items there are.
+
+
+# Pure part: (items on the page, number of matches, page count, page)
+def page_slice(items, query="", page=1, page_size=PAGE_SIZES[0], text=str):
+    query = query.strip().lower()
+    matches = [item for item in items if query in text(item).lower()] if query else items
+    pages = max(1, math.ceil(len(matches) / page_size))
+    page = min(max(1, page), pages)
+    start = (page - 1) * page_size
+    return matches[start:start + page_size], len(matches), pages, page
+
+
+# Renders the filter box and page controls and returns the visible items.
+# key namespaces the widgets' session state (one per grid); text(item) is
+# what the filter matches against.
+def paginate(items, key, label="items", text=str):
+    if len(items) <= PAGE_SIZES[0]:
+        return items  # everything fits: no controls
+
+    page_key = f"{key}_page"
+    col_filter, col_size = st.columns([0.75, 0.25])
+    with col_filter:
+        query = st.text_input(f"🔍 Filter {label}", key=f"{key}_filter", placeholder="Type to filter...")
+    with col_size:
+        page_size = st.selectbox("Per page", PAGE_SIZES, key=f"{key}_page_size")
+
+    # A new filter or page size starts again from the first page
+    if st.session_state.get(f"{key}_view") != (query, page_size):
+        st.session_state[f"{key}_view"] = (query, page_size)
+        st.session_state[page_key] = 1
+
+    visible, total, pages, page = page_slice(items, query, st.session_state.get(page_key, 1), page_size, text)
+    st.session_state[page_key] = page
+
+    col_prev, col_info, col_next = st.columns([0.2, 0.6, 0.2])
+    with col_prev:
+        if st.button("⬅️ Prev", key=f"{key}_prev", disabled=page <= 1):
+            st.session_state[page_key] = page - 1
+            st.rerun()
+    with col_info:
+        if total:
+            first = (page - 1) * page_size + 1
+            st.caption(f"Showing {first}–{first + len(visible) - 1} of {total} {label} · page {page} of {pages}")
+        else:
+            st.caption(f"No {label} match “{query}”.")
+    with col_next:
+        if st.button("Next ➡️", key=f"{key}_next", disabled=page >= pages):
+            st.session_state[page_key] = page + 1
+            st.rerun()
+    return visible
@@ -0,0 +1,30 @@
+import os
+import functools
+from dotenv import load_dotenv
+import psutil
+
+load_dotenv()
+
+# --- Find a suitable drive and create base SmartStudy folder ---
+# Streamlit re-runs page scripts on every interaction, but modules are only
+# imported once per process, so the partition scan below happens exactly once.
+@functools.lru_cache(maxsize=None)
+def find_smartstudy_path():
+    # Explicit override (env or .env) skips the partition scan entirely
+    override = os.getenv("SMARTSTUDY_DIR")
+    if override:
+        base = os.path.abspath(os.path.expanduser(override))
+        os.makedirs(base, exist_ok=True)
+        return base
+
+    for part in psutil.disk_partitions():
+        if part.device.startswith("C:"):
+            continue  # Skip system drive
+        try:
+            base = os.path.join(part.device, "SmartStudy")
+            os.makedirs(base, exist_ok=True)
+            return base
+        except:
+            continue
+    # Fallback to current directory if no external drive found
+    return os.path.abspath("SmartStudy")
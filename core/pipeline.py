@@ -0,0 +1,72 @@
+import functools
+from core.storage import text_hash
+from core.normalize import note_markdown
+from core.llm import generate_flashcards, generate_quiz
+from core.scheduler import run_jobs
+
+# Flashcards are generated from a topic's note and quizzes from a topic's
+# flashcards; each artifact records the hash of its source, which is how
+# "stale" is decided below.
+
+
+# --- Flashcards ---
+# Decks are generated from the note's Markdown (core/normalize.py) and record
+# its hash, so restyling a note does not make them stale. Decks made before
+# that recorded the hash of the raw note and stay fresh until it changes.
+def flashcards_stale(store, course_id, content, topic):
+    source = store.flashcard_source_hash(course_id, content, topic)
+    return source != store.note_source_hash(course_id, content, topic) and source != store.note_hash(course_id, content, topic)
+
+
+def stale_flashcard_topics(store, course_id, content):
+    stale = []
+    for topic in store.list_topics(course_id, content):
+        # Hashes are recorded on write: only notes that changed are read
+        if store.note_hash(course_id, content, topic) is None or not flashcards_stale(store, course_id, content, topic):
+            continue
+        note = store.read_note(course_id, content, topic)
+        if note and note_markdown(note).strip():
+            stale.append(topic)
+    return stale
+
+
+def refresh_flashcards(store, client, course_id, content, topic):
+    notes = note_markdown(store.read_note(course_id, content, topic) or "")
+    flashcards = generate_flashcards(client, notes)
+    store.write_flashcards(course_id, content, topic, flashcards, text_hash(notes))
+    return flashcards
+
+
+# --- Quizzes ---
+def stale_quiz_topics(store, course_id, content):
+    return [
+        topic for topic, deck_hash in store.topic_flashcard_hashes(course_id, content).items()
+        if store.quiz_source_hash(course_id, content, topic) != deck_hash
+    ]
+
+
+def refresh_quiz(store, client, course_id, content, topic):
+    flashcards = store.read_flashcards(course_id, content, topic)
+    questions = generate_quiz(client, flashcards)
+    store.write_quiz(course_id, content, topic, questions, text_hash(flashcards))
+    return questions
+
+
+# --- Everything stale in one or more contents, in parallel ---
+# Flashcards run first because quizzes are generated from them. Job labels
+# are (content, topic, "flashcards" | "quiz"); see run_jobs for on_progress.
+def refresh_stale(store, client, course_id, contents, on_progress=None):
+    flashcard_jobs = [
+        ((content, topic, "flashcards"), functools.partial(refresh_flashcards, store, client, course_id, content, topic))
+        for content in contents
+        for topic in stale_flashcard_topics(store, course_id, content)
+    ]
+    results = run_jobs(flashcard_jobs, on_progress)
+
+    quiz_jobs = [
+        ((content, topic, "quiz"), functools.partial(refresh_quiz, store, client, course_id, content, topic))
+        for content in contents
+        for topic in stale_quiz_topics(store, course_id, content)
+    ]
+    results.update(run_jobs(quiz_jobs, on_progress))
+    return results
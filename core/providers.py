@@ -0,0 +1,52 @@
+import os
+import functools
+from core.paths import find_smartstudy_path
+
+# --- LLM provider selection ---
+# SMARTSTUDY_LLM_PROVIDER picks the backend: "openai" (default; any
+# OpenAI-compatible server via OPENAI_BASE_URL) or "local", a deterministic
+# rule-based stand-in that needs no key or network. SMARTSTUDY_MODEL
+# overrides the provider's default model.
+PROVIDER = os.getenv("SMARTSTUDY_LLM_PROVIDER", "openai").strip().lower()
+DEFAULT_MODELS = {"openai": "gpt-4.1-nano", "local": "local-rules"}
+MODEL = os.getenv("SMARTSTUDY_MODEL") or DEFAULT_MODELS.get(PROVIDER, DEFAULT_MODELS["openai"])
+BASE_URL = os.getenv("OPENAI_BASE_URL") or None
+
+
+def requires_api_key():
+    return PROVIDER != "local"
+
+
+def saved_api_key():
+    key = os.getenv("OPENAI_API_KEY")
+    key_file = os.path.join(find_smartstudy_path(), "api_key.txt")
+    if not key and os.path.exists(key_file):
+        with open(key_file, "r") as f:
+            key = f.read().strip()
+    return key
+
+
+# --- One pooled client per (provider, key, base URL) per process ---
+# Streamlit re-runs every page on each click; building a new OpenAI client
+# there threw away its HTTP connection pool (and the TLS handshake) every
+# time. The client is thread-safe, so pages, the background worker and the
+# generation pool all share it. Its own retries are off: core.scheduler's
+# call_with_retry retries, under the rate limit and concurrency cap.
+@functools.lru_cache(maxsize=8)
+def _client(provider, api_key, base_url):
+    if provider == "local":
+        from core.local_backend import LocalClient
+        return LocalClient()
+    if provider != "openai":
+        raise ValueError(f"Unknown LLM provider: {provider}")
+    from openai import OpenAI
+    return OpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+
+
+def get_client(api_key=None):
+    if not requires_api_key():
+        return _client(PROVIDER, None, None)
+    api_key = api_key or saved_api_key()
+    if not api_key:
+        raise RuntimeError("No OpenAI API key configured")
+    return _client(PROVIDER, api_key, BASE_URL)
@@ -0,0 +1,104 @@
+import os
+import threading
+from core.paths import find_smartstudy_path
+from core.fileio import atomic_write_text, file_lock
+from core.identity import IdentityCatalog, question_text
+
+# --- Per-question score history of a course ---
+# <SMARTSTUDY_DIR>/quiz_history/<course_id>.log holds "<question id>
+# <attempts> <correct>" lines; the last line for a question wins. Questions
+# are keyed by core.identity.question_id(), and a regenerated question that
+# closely matches a vanished one inherits its totals.
+
+COMPACT_SLACK = 1000
+
+
+class QuizHistory:
+    def __init__(self, path):
+        self.path = path
+        self.catalog = IdentityCatalog(path[:-len(".log")] + ".questions")
+        self.totals = {}  # question id -> (attempts, correct)
+        self._lines = 0
+        self._stamp = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if (st.st_mtime_ns, st.st_size) == self._stamp:
+            return
+        totals, lines = {}, 0
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and line.endswith("\n"):
+                    totals[parts[0]] = (int(parts[1]), int(parts[2]))
+                    lines += 1
+        self.totals, self._lines = totals, lines
+        self._stamp = (st.st_mtime_ns, st.st_size)
+
+    def _write(self, qid, totals):
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with file_lock(self.path):
+            self._load()
+            self.totals[qid] = totals
+            if self._lines + 1 > 2 * len(self.totals) + COMPACT_SLACK:
+                atomic_write_text(self.path, "".join(f"{q} {a} {c}\n" for q, (a, c) in self.totals.items()))
+                self._lines = len(self.totals)
+            else:
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(f"{qid} {totals[0]} {totals[1]}\n")
+                self._lines += 1
+            st = os.stat(self.path)
+            self._stamp = (st.st_mtime_ns, st.st_size)
+
+    # questions: {question id: question dict} currently in the quiz
+    def sync(self, questions):
+        with self._lock:
+            self._load()
+            texts = {qid: question_text(q) for qid, q in questions.items()}
+            for new, old in self.catalog.carry_over(texts, self.totals.__contains__).items():
+                if new not in self.totals:
+                    self._write(new, self.totals[old])
+
+    def record(self, qid, correct):
+        with self._lock:
+            self._load()
+            attempts, right = self.totals.get(qid, (0, 0))
+            self._write(qid, (attempts + 1, right + int(bool(correct))))
+
+    # Served from memory: the log is re-read by sync() when the quiz is
+    # built and by record() before every append, so reruns do no file I/O
+    def get(self, qid):
+        with self._lock:
+            return self.totals.get(qid, (0, 0))
+
+
+_histories = {}
+_histories_lock = threading.Lock()
+
+
+def _history_path(course_id):
+    return os.path.join(find_smartstudy_path(), "quiz_history", f"{course_id}.log")
+
+
+def get_quiz_history(course_id):
+    path = _history_path(course_id)
+    with _histories_lock:
+        history = _histories.get(path)
+        if history is None:
+            history = _histories[path] = QuizHistory(path)
+    return history
+
+
+# Deletes a course's score history (on disk and in this process)
+def remove_quiz_history(course_id):
+    path = _history_path(course_id)
+    with _histories_lock:
+        _histories.pop(path, None)
+    catalog = path[:-len(".log")] + ".questions"
+    for stale in (path, f"{path}.lock", catalog, f"{catalog}.lock"):
+        if os.path.exists(stale):
+            os.remove(stale)
@@ -0,0 +1,94 @@
+import re
+import json
+
+# A code fence opening or closing the whole reply (never one inside a string)
+LEADING_FENCE = re.compile(r"^\s*```[a-zA-Z]*[ \t]*\n?")
+TRAILING_FENCE = re.compile(r"\n?[ \t]*```\s*$")
+OBJECT_START = re.compile(r"\{")
+KEY_START = re.compile(r"\{\s*\"")  # an object with a key, not "{topic}" in prose
+ARRAY_END = re.compile(r"\s*,?\s*\]")  # a trailing comma is a common slip
+LETTERS = "ABCD"
+
+_decoder = json.JSONDecoder()
+
+
+# --- Tolerant parsing of quiz replies ---
+# Model replies may be wrapped in code fences, followed by commentary, or cut
+# off mid-array. Rather than json.loads() on the whole reply, every complete
+# top-level {...} object is decoded where it stands and validated on its own,
+# so the good questions survive whatever happens around them. Returns
+# (questions, complete); complete is False when the reply was truncated or
+# some objects had to be dropped, i.e. coverage may be missing. Text after
+# the array's closing "]" (or after the last question, when the reply is not
+# an array) is commentary, braces or not, unless it starts a JSON object
+# that never ends: a JSON-lines or bare-object reply cut off mid-question.
+def parse_questions(reply):
+    text = TRAILING_FENCE.sub("", LEADING_FENCE.sub("", reply, count=1), count=1)
+    try:
+        data = json.loads(text)
+        if isinstance(data, dict):
+            data = data.get("questions", [data])
+        if isinstance(data, list):
+            questions = [q for q in map(validate_question, data) if q is not None]
+            return questions, len(questions) == len(data)
+    except ValueError:
+        pass
+
+    first = OBJECT_START.search(text)
+    in_array = first is not None and "[" in text[:first.start()]
+    questions, dropped, unparsed = [], 0, 0  # unparsed: failures since the last object
+    closed = cut_off = False  # cut_off: an object-like failure since the last object
+    pos = 0
+    while True:
+        match = OBJECT_START.search(text, pos)
+        if match is None:
+            break
+        try:
+            obj, end = _decoder.raw_decode(text, match.start())
+        except ValueError:
+            # Broken or truncated object (or commentary): try again from the next "{"
+            unparsed += 1
+            cut_off = cut_off or KEY_START.match(text, match.start()) is not None
+            pos = match.start() + 1
+            continue
+        question = validate_question(obj)
+        dropped += unparsed + (question is None)
+        unparsed, cut_off = 0, False
+        if question is not None:
+            questions.append(question)
+        pos = end
+        if in_array and ARRAY_END.match(text, pos):
+            closed = True
+            break
+
+    # An array that never closed was cut off, whatever came last; otherwise
+    # a trailing object that never decoded was
+    truncated = (in_array and not closed) or cut_off
+    return questions, not truncated and dropped == 0
+
+
+# --- Schema: question text, 4 distinct options, answer one of the options ---
+# An answer given as a letter ("B") or index (1) is mapped onto its option.
+def validate_question(obj):
+    if not isinstance(obj, dict):
+        return None
+    question = obj.get("question")
+    options = obj.get("options")
+    answer = obj.get("answer")
+    if not isinstance(question, str) or not question.strip():
+        return None
+    if not isinstance(options, list) or len(options) != 4:
+        return None
+    options = [str(o).strip() for o in options]
+    if len(set(options)) != 4 or not all(options):
+        return None
+
+    if isinstance(answer, int) and not isinstance(answer, bool) and 0 <= answer < 4:
+        answer = options[answer]
+    elif isinstance(answer, str):
+        answer = answer.strip()
+        if answer not in options and len(answer) == 1 and answer.upper() in LETTERS:
+            answer = options[LETTERS.index(answer.upper())]
+    if answer not in options:
+        return None
+    return {"question": question.strip(), "options": options, "answer": answer}
@@ -0,0 +1,240 @@
+import os
+import time
+import zlib
+import shutil
+import threading
+from core.fileio import atomic_write_bytes, file_lock
+
+# --- Revision history of a note ---
+# <course folder>/history/<content>/<topic>.rev is an append-only chain of
+# records, each an ASCII header line followed by a zlib payload:
+#   <rev> <S|D> <unix time> <sha256 of the text> <prefix> <suffix> <payload size>
+# S (snapshot) records hold the whole text. D (delta) records hold only what
+# changed since the previous revision: the text keeps the first <prefix> and
+# last <suffix> characters of the previous one and the payload is the middle,
+# compressed with the replaced middle as zlib dictionary (editing a sentence
+# costs a few bytes, not a copy of the note).
+#
+# Every SNAPSHOT_EVERY revisions a snapshot bounds the chain a checkout has
+# to replay. Only the newest KEEP_REVISIONS are retained: once there are
+# COMPACT_SLACK more, the file is rewritten starting from a fresh snapshot.
+# The store keeps the current text as the note itself, so reading the latest
+# version never touches the history.
+
+SNAPSHOT_EVERY = int(os.getenv("SMARTSTUDY_NOTE_SNAPSHOT_EVERY", "20"))
+KEEP_REVISIONS = int(os.getenv("SMARTSTUDY_NOTE_REVISIONS", "200"))
+COMPACT_SLACK = 50
+ZDICT_BYTES = 32768  # zlib window
+
+
+# Length of the common prefix, by binary search over slice comparisons
+# (memcmp speed instead of a Python loop per character)
+def _common_prefix(a, b):
+    low, high = 0, min(len(a), len(b))
+    while low < high:
+        mid = (low + high + 1) // 2
+        if a[:mid] == b[:mid]:
+            low = mid
+        else:
+            high = mid - 1
+    return low
+
+
+# (prefix, suffix): characters text shares with previous at each end
+def diff_span(previous, text):
+    prefix = _common_prefix(previous, text)
+    return prefix, _common_prefix(previous[prefix:][::-1], text[prefix:][::-1])
+
+
+def _encode(previous, text, snapshot):
+    if snapshot or previous is None:
+        return "S", 0, 0, zlib.compress(text.encode("utf-8"))
+    prefix, suffix = diff_span(previous, text)
+    replaced = previous[prefix:len(previous) - suffix].encode("utf-8")[-ZDICT_BYTES:]
+    compressor = zlib.compressobj(zdict=replaced) if replaced else zlib.compressobj()
+    middle = text[prefix:len(text) - suffix].encode("utf-8")
+    return "D", prefix, suffix, compressor.compress(middle) + compressor.flush()
+
+
+def _decode(previous, kind, prefix, suffix, payload):
+    if kind == "S":
+        return zlib.decompress(payload).decode("utf-8")
+    replaced = previous[prefix:len(previous) - suffix].encode("utf-8")[-ZDICT_BYTES:]
+    decompressor = zlib.decompressobj(zdict=replaced) if replaced else zlib.decompressobj()
+    middle = (decompressor.decompress(payload) + decompressor.flush()).decode("utf-8")
+    return previous[:prefix] + middle + previous[len(previous) - suffix:]
+
+
+def _record(rev, kind, saved_at, digest, prefix, suffix, payload):
+    header = f"{rev} {kind} {saved_at:.3f} {digest} {prefix} {suffix} {len(payload)}\n"
+    return header.encode("ascii") + payload
+
+
+class NoteHistory:
+    def __init__(self, path):
+        self.path = path
+        # one entry per revision: (rev, kind, saved_at, digest, prefix, suffix, offset, size)
+        self.entries = []
+        self._end = 0  # bytes of complete records
+        self._stamp = None
+        self._latest = None  # (rev, text) of the newest revision, once decoded
+        self._lock = threading.RLock()
+
+    # --- Index of record headers, read incrementally ---
+    def _refresh(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            self.entries, self._end, self._stamp, self._latest = [], 0, None, None
+            return
+        if self._stamp is not None and (st.st_ino, st.st_size) == self._stamp:
+            return
+        if self._stamp is None or st.st_ino != self._stamp[0] or st.st_size < self._end:
+            self.entries, self._end, self._latest = [], 0, None  # new or compacted file
+        with open(self.path, "rb") as f:
+            f.seek(self._end)
+            while True:
+                header = f.readline()
+                parts = header.split()
+                if not header.endswith(b"\n") or len(parts) != 7:
+                    break  # end of file, or a record torn by a crash
+                size = int(parts[6])
+                offset = f.tell()
+                if offset + size > st.st_size:
+                    break
+                f.seek(size, os.SEEK_CUR)
+                self.entries.append((
+                    int(parts[0]), parts[1].decode("ascii"), float(parts[2]), parts[3].decode("ascii"),
+                    int(parts[4]), int(parts[5]), offset, size,
+                ))
+                self._end = offset + size
+        self._stamp = (st.st_ino, st.st_size)
+
+    def _text_at(self, position):
+        if self._latest is not None and self._latest[0] == self.entries[position][0]:
+            return self._latest[1]
+        start = position
+        while self.entries[start][1] != "S":
+            start -= 1
+        text = None
+        with open(self.path, "rb") as f:
+            for rev, kind, _, _, prefix, suffix, offset, size in self.entries[start:position + 1]:
+                f.seek(offset)
+                text = _decode(text, kind, prefix, suffix, f.read(size))
+        return text
+
+    # --- Reading ---
+    def latest_hash(self):
+        with self._lock:
+            self._refresh()
+            return self.entries[-1][3] if self.entries else None
+
+    # [(rev, saved_at, sha256)], oldest first
+    def revisions(self):
+        with self._lock:
+            self._refresh()
+            return [(rev, saved_at, digest) for rev, _, saved_at, digest, *_ in self.entries]
+
+    # Text of revision rev (the newest by default), or None if not retained
+    def checkout(self, rev=None):
+        with self._lock:
+            self._refresh()
+            if not self.entries:
+                return None
+            if rev is None:
+                position = len(self.entries) - 1
+            else:
+                position = rev - self.entries[0][0]
+                if not 0 <= position < len(self.entries) or self.entries[position][0] != rev:
+                    return None
+            return self._text_at(position)
+
+    # --- Writing ---
+    # Appends text as a new revision and returns its number; saving the same
+    # text again returns the current revision without writing anything.
+    def commit(self, text, digest, saved_at=None):
+        saved_at = time.time() if saved_at is None else saved_at
+        with self._lock, file_lock(self.path):
+            self._refresh()
+            if self.entries and self.entries[-1][3] == digest:
+                return self.entries[-1][0]
+            if len(self.entries) + 1 > KEEP_REVISIONS + COMPACT_SLACK:
+                return self._compact(text, digest, saved_at)
+
+            previous = self._text_at(len(self.entries) - 1) if self.entries else None
+            rev = self.entries[-1][0] + 1 if self.entries else 1
+            since_snapshot = 0
+            for entry in reversed(self.entries):
+                if entry[1] == "S":
+                    break
+                since_snapshot += 1
+            kind, prefix, suffix, payload = _encode(previous, text, since_snapshot + 1 >= SNAPSHOT_EVERY)
+            record = _record(rev, kind, saved_at, digest, prefix, suffix, payload)
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            with open(self.path, "ab") as f:
+                f.truncate(self._end)  # drop a torn record left by a crash
+                f.write(record)
+                f.flush()
+                os.fsync(f.fileno())
+            self._refresh()
+            self._latest = (rev, text)
+            return rev
+
+    # Rewrites the chain with only the newest KEEP_REVISIONS - 1 revisions
+    # plus text, re-encoded from a snapshot
+    def _compact(self, text, digest, saved_at):
+        keep = self.entries[len(self.entries) - max(KEEP_REVISIONS - 1, 0):] if KEEP_REVISIONS > 1 else []
+        first = len(self.entries) - len(keep)
+        versions = [(entry[0], entry[2], entry[3], self._text_at(first + i)) for i, entry in enumerate(keep)]
+        rev = self.entries[-1][0] + 1
+        versions.append((rev, saved_at, digest, text))
+
+        chunks, previous = [], None
+        for i, (number, at, version_digest, version_text) in enumerate(versions):
+            kind, prefix, suffix, payload = _encode(previous, version_text, i % SNAPSHOT_EVERY == 0)
+            chunks.append(_record(number, kind, at, version_digest, prefix, suffix, payload))
+            previous = version_text
+        atomic_write_bytes(self.path, b"".join(chunks))
+        self._refresh()
+        self._latest = (rev, text)
+        return rev
+
+
+# --- Paths and per-process instances ---
+def history_path(course_path, content=None, topic=None):
+    folder = os.path.join(course_path, "history")
+    if content is None:
+        return folder
+    if topic is None:
+        return os.path.join(folder, content)
+    return os.path.join(folder, content, f"{topic}.rev")
+
+
+# Unsaved editor changes (core/autosave.py), next to the history
+def journal_path(course_path, content, topic):
+    return os.path.join(history_path(course_path, content), f"{topic}.journal")
+
+
+_histories = {}
+_histories_lock = threading.Lock()
+
+
+def get_note_history(course_path, content, topic):
+    path = history_path(course_path, content, topic)
+    with _histories_lock:
+        history = _histories.get(path)
+        if history is None:
+            history = _histories[path] = NoteHistory(path)
+    return history
+
+
+# Deletes the history of a topic, a content or (content=None) a whole course
+def remove_history(course_path, content=None, topic=None):
+    path = history_path(course_path, content, topic)
+    if topic is None:
+        shutil.rmtree(path, ignore_errors=True)
+        return
+    journal = journal_path(course_path, content, topic)
+    for stale in (path, f"{path}.lock", journal, f"{journal}.lock"):
+        if os.path.exists(stale):
+            os.remove(stale)
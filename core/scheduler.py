@@ -0,0 +1,108 @@
+import os
+import time
+import random
+import threading
+import functools
+import contextlib
+from concurrent.futures import ThreadPoolExecutor, as_completed
+import openai
+
+
+# --- Token bucket: at most `rate` calls per second, bursts up to `capacity` ---
+class TokenBucket:
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.rate:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+@functools.lru_cache(maxsize=None)
+def get_rate_limiter():
+    return TokenBucket(float(os.getenv("SMARTSTUDY_LLM_RPS", "2")))
+
+
+# --- Retry with full-jitter exponential backoff on 429 / 5xx / network errors ---
+def _is_retryable(exc):
+    if isinstance(exc, openai.APIConnectionError):  # includes timeouts
+        return True
+    status = getattr(exc, "status_code", None)
+    return status == 429 or (status is not None and status >= 500)
+
+
+def _retry_after(exc):
+    response = getattr(exc, "response", None)
+    try:
+        return float(response.headers.get("retry-after"))
+    except (AttributeError, TypeError, ValueError):
+        return None
+
+
+# slot=False when the caller already holds a request slot (see llm_slot)
+def call_with_retry(fn, retries=5, base_delay=1.0, max_delay=30.0, slot=True):
+    for attempt in range(retries + 1):
+        try:
+            with llm_slot() if slot else contextlib.nullcontext():
+                get_rate_limiter().acquire()
+                return fn()
+        except Exception as exc:
+            if attempt == retries or not _is_retryable(exc):
+                raise
+            delay = max(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)), _retry_after(exc) or 0)
+        time.sleep(delay)  # backoff without holding a slot
+
+
+def default_workers():
+    return int(os.getenv("SMARTSTUDY_LLM_CONCURRENCY", "4"))
+
+
+# --- Process-wide cap on requests in flight ---
+# run_jobs pools nest (a page refreshing several topics, each topic split
+# into chunks), so the pools alone would allow workers x workers requests.
+# Every request holds one of SMARTSTUDY_LLM_CONCURRENCY slots instead; a
+# slot is never held while waiting for other jobs, so nesting can't deadlock.
+@functools.lru_cache(maxsize=None)
+def _slots():
+    return threading.BoundedSemaphore(max(1, default_workers()))
+
+
+@contextlib.contextmanager
+def llm_slot():
+    with _slots():
+        yield
+
+
+# --- Fan out generation jobs over a bounded worker pool ---
+# jobs is a list of (label, fn). on_progress(label, error, done, total) is
+# called from the calling thread as each job finishes, so Streamlit widgets
+# can be updated from it. Returns {label: result or exception}.
+def run_jobs(jobs, on_progress=None, max_workers=None):
+    if max_workers is None:
+        max_workers = default_workers()
+    results = {}
+    if not jobs:
+        return results
+    with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(jobs)))) as pool:
+        futures = {pool.submit(fn): label for label, fn in jobs}
+        for done, future in enumerate(as_completed(futures), start=1):
+            label = futures[future]
+            error = future.exception()
+            results[label] = error if error is not None else future.result()
+            if on_progress:
+                on_progress(label, error, done, len(jobs))
+    return results
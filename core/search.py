@@ -0,0 +1,327 @@
+import os
+import re
+import logging
+import time
+import sqlite3
+import threading
+import functools
+import contextlib
+from core.paths import find_smartstudy_path
+from core.normalize import note_markdown
+
+# --- Full-text search over notes, flashcards and quizzes ---
+# An SQLite FTS5 index in <SMARTSTUDY_DIR>/search.db, kept separate from the
+# store so it works with either backend. get_store() wraps the store in
+# IndexedStore, which updates the index on every note, flashcard and quiz
+# write and drops entries when a course, content or topic is deleted.
+# Existing data is indexed once, on a background thread started when the
+# home page first loads (start_build), in transactions of BUILD_BATCH
+# documents. While a build runs, updates from store writes are queued and
+# applied by the builder when it finishes, so a save never waits for the
+# index.
+#
+# docs maps (course_id, content, topic, kind) to the FTS rowid; topic is ""
+# for content-level artifacts (the combined deck is not indexed, it repeats
+# the topic decks).
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS docs (
+    id INTEGER PRIMARY KEY,
+    course_id TEXT NOT NULL,
+    content TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    kind TEXT NOT NULL,
+    UNIQUE (course_id, content, topic, kind)
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS docs_fts USING fts5(
+    title, body,
+    tokenize = 'unicode61 remove_diacritics 2',
+    prefix = '2 3'
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+
+TITLE_WEIGHT = 5.0
+RANK_BUDGET = 0.04  # seconds; beyond that, unranked (newest first) results
+FALLBACK_BUDGET = 0.2  # seconds for the unranked query; beyond that, what it found so far
+BUILD_BATCH = 200  # documents per build transaction
+TERM = re.compile(r"\w+")
+
+log = logging.getLogger(__name__)
+
+
+def _quiz_text(questions):
+    return "\n".join(
+        f"{q.get('question', '')} {' '.join(str(o) for o in q.get('options', []))}" for q in questions or []
+    )
+
+
+class SearchIndex:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self._local = threading.local()
+        self._build_lock = threading.Lock()
+        self._builder = None  # background build thread
+        self._builder_lock = threading.Lock()
+        self._building = False
+        self._queued = []  # (method, args) of updates made during a build
+        self._queued_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.executescript(SCHEMA)
+            self._local.conn = conn
+        return conn
+
+    # --- Updates ---
+    # True when a build is running and the update was queued for it
+    def _defer(self, method, *args):
+        with self._queued_lock:
+            if self._building:
+                self._queued.append((method, args))
+                return True
+        return False
+
+    def update(self, course_id, content, topic, kind, title, body):
+        if not self._defer(self._update, course_id, content, topic, kind, title, body):
+            self._update(course_id, content, topic, kind, title, body)
+
+    def _update(self, course_id, content, topic, kind, title, body):
+        conn = self._conn()
+        with _transaction(conn):
+            _upsert(conn, course_id, content, topic, kind, title, body)
+
+    def index_note(self, course_id, content, topic, text):
+        self.update(course_id, content, topic, "note", f"{content} {topic}", note_markdown(text or ""))
+
+    def index_flashcards(self, course_id, content, topic, text):
+        self.update(course_id, content, topic, "flashcards", f"{content} {topic}", text or "")
+
+    def index_quiz(self, course_id, content, topic, questions):
+        self.update(course_id, content, topic, "quiz", f"{content} {topic}", _quiz_text(questions))
+
+    def remove(self, course_id, content=None, topic=None):
+        if not self._defer(self._remove, course_id, content, topic):
+            self._remove(course_id, content, topic)
+
+    def _remove(self, course_id, content, topic):
+        where, params = "course_id = ?", [course_id]
+        if content is not None:
+            where, params = where + " AND content = ?", params + [content]
+        if topic is not None:
+            where, params = where + " AND topic = ?", params + [topic]
+        conn = self._conn()
+        with _transaction(conn):
+            conn.execute(f"DELETE FROM docs_fts WHERE rowid IN (SELECT id FROM docs WHERE {where})", params)
+            conn.execute(f"DELETE FROM docs WHERE {where}", params)
+
+    # --- Initial build from whatever the store already holds ---
+    # Committed every BUILD_BATCH documents, so other writers to search.db
+    # wait one short transaction at most. Updates queued meanwhile are
+    # applied afterwards, in order: they are at least as new as what the
+    # build read from the store.
+    def ensure_built(self, store, rebuild=False):
+        with self._build_lock:
+            if not rebuild and self.is_built():
+                return
+            with self._queued_lock:
+                self._building = True
+            try:
+                self._build_batches(store, rebuild)
+            finally:
+                while True:
+                    with self._queued_lock:
+                        queued, self._queued = self._queued, []
+                        if not queued:
+                            self._building = False
+                            break
+                    for method, args in queued:
+                        try:
+                            method(*args)
+                        except sqlite3.Error:
+                            log.exception("Could not update the search index")
+
+    def _build_batches(self, store, rebuild):
+        conn = self._conn()
+        if rebuild:
+            with _transaction(conn):
+                conn.execute("DELETE FROM meta WHERE key = 'built'")
+                conn.execute("DELETE FROM docs_fts")
+                conn.execute("DELETE FROM docs")
+        batch = []
+
+        def flush():
+            with _transaction(conn):
+                for args in batch:
+                    _upsert(conn, *args)
+            batch.clear()
+
+        for course in store.list_courses():
+            course_id = course["id"]
+            for content in store.list_contents(course_id):
+                for topic in store.list_topics(course_id, content):
+                    title = f"{content} {topic}"
+                    note = store.read_note(course_id, content, topic)
+                    if note is not None:
+                        batch.append((course_id, content, topic, "note", title, note_markdown(note)))
+                    flashcards = store.read_flashcards(course_id, content, topic)
+                    if flashcards is not None:
+                        batch.append((course_id, content, topic, "flashcards", title, flashcards))
+                    questions = store.read_quiz(course_id, content, topic)
+                    if questions is not None:
+                        batch.append((course_id, content, topic, "quiz", title, _quiz_text(questions)))
+                    if len(batch) >= BUILD_BATCH:
+                        flush()
+        flush()
+        with _transaction(conn):
+            conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('built', '1')")
+
+    def is_built(self):
+        return self._conn().execute("SELECT value FROM meta WHERE key = 'built'").fetchone() is not None
+
+    # Builds the index on a background thread unless it is built already;
+    # returns whether it is
+    def start_build(self, store):
+        if self.is_built():
+            return True
+        with self._builder_lock:
+            if self._builder is None or not self._builder.is_alive():
+                self._builder = threading.Thread(target=self._build, args=(store,), name="smartstudy-search-build", daemon=True)
+                self._builder.start()
+        return False
+
+    def _build(self, store):
+        try:
+            self.ensure_built(store)
+        except sqlite3.Error:
+            log.exception("Could not build the search index")
+
+    # --- Queries ---
+    # Every word must match; words of 3+ characters also match as prefixes, so
+    # results show up while typing (shorter ones would match nearly
+    # everything). Ranked by BM25 with titles weighted up. BM25 has to score
+    # every matching document, so a query matching most of a large index
+    # gives up ranking after RANK_BUDGET and returns the newest matches.
+    def search(self, query, limit=20, course_id=None):
+        terms = TERM.findall(query.lower())
+        if not terms:
+            return []
+        match = " ".join(f'"{t}"*' if len(t) >= 3 else f'"{t}"' for t in terms)
+        where, params = "docs_fts MATCH ?", [match]
+        if course_id is not None:
+            where, params = where + " AND d.course_id = ?", params + [course_id]
+        select = (
+            "SELECT d.course_id, d.content, d.topic, d.kind, "
+            "snippet(docs_fts, 1, '**', '**', ' … ', 12), {rank} "
+            f"FROM docs_fts JOIN docs d ON d.id = docs_fts.rowid WHERE {where} "
+        )
+
+        conn = self._conn()
+        deadline = time.monotonic() + RANK_BUDGET
+        conn.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+        try:
+            rows = conn.execute(
+                select.format(rank="-bm25(docs_fts, ?, 1.0) AS score") + "ORDER BY score DESC LIMIT ?",
+                [TITLE_WEIGHT] + params + [limit],
+            ).fetchall()
+        except sqlite3.OperationalError as exc:
+            if "interrupted" not in str(exc):
+                raise
+            rows = None
+        finally:
+            conn.set_progress_handler(None, 0)
+        if rows is None:
+            rows = []
+            deadline = time.monotonic() + FALLBACK_BUDGET
+            conn.set_progress_handler(lambda: time.monotonic() > deadline, 10000)
+            try:
+                for row in conn.execute(select.format(rank="0.0") + "ORDER BY docs_fts.rowid DESC LIMIT ?", params + [limit]):
+                    rows.append(row)
+            except sqlite3.OperationalError as exc:
+                if "interrupted" not in str(exc):
+                    raise
+            finally:
+                conn.set_progress_handler(None, 0)
+        return [
+            {"course_id": c, "content": content, "topic": t, "kind": k, "snippet": s, "score": score}
+            for c, content, t, k, s, score in rows
+        ]
+
+
+@contextlib.contextmanager
+def _transaction(conn):
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        yield
+        conn.execute("COMMIT")
+    except BaseException:
+        conn.execute("ROLLBACK")
+        raise
+
+
+def _upsert(conn, course_id, content, topic, kind, title, body):
+    row = conn.execute(
+        "SELECT id FROM docs WHERE course_id = ? AND content = ? AND topic = ? AND kind = ?",
+        (course_id, content, topic or "", kind),
+    ).fetchone()
+    if row is None:
+        doc_id = conn.execute(
+            "INSERT INTO docs (course_id, content, topic, kind) VALUES (?, ?, ?, ?)",
+            (course_id, content, topic or "", kind),
+        ).lastrowid
+    else:
+        doc_id = row[0]
+        conn.execute("DELETE FROM docs_fts WHERE rowid = ?", (doc_id,))
+    conn.execute("INSERT INTO docs_fts (rowid, title, body) VALUES (?, ?, ?)", (doc_id, title, body))
+
+
+@functools.lru_cache(maxsize=None)
+def get_search_index():
+    return SearchIndex(os.path.join(find_smartstudy_path(), "search.db"))
+
+
+# --- Store wrapper that keeps the index current ---
+# Index errors are logged, not raised: the store write already succeeded and
+# the index can be rebuilt from the store with ensure_built(rebuild=True).
+class IndexedStore:
+    def __init__(self, store, index):
+        self.store = store
+        self.index = index
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def _safely(self, fn, *args):
+        try:
+            fn(*args)
+        except sqlite3.Error:
+            log.exception("Could not update the search index")
+
+    def delete_course(self, course_id):
+        self.store.delete_course(course_id)
+        self._safely(self.index.remove, course_id)
+
+    def delete_content(self, course_id, content):
+        self.store.delete_content(course_id, content)
+        self._safely(self.index.remove, course_id, content)
+
+    def delete_topic(self, course_id, content, topic):
+        self.store.delete_topic(course_id, content, topic)
+        self._safely(self.index.remove, course_id, content, topic)
+
+    def write_note(self, course_id, content, topic, text):
+        self.store.write_note(course_id, content, topic, text)
+        self._safely(self.index.index_note, course_id, content, topic, text)
+
+    def write_flashcards(self, course_id, content, topic, text, source_hash=None):
+        self.store.write_flashcards(course_id, content, topic, text, source_hash)
+        if topic is not None:
+            self._safely(self.index.index_flashcards, course_id, content, topic, text)
+
+    def write_quiz(self, course_id, content, topic, questions, source_hash):
+        self.store.write_quiz(course_id, content, topic, questions, source_hash)
+        self._safely(self.index.index_quiz, course_id, content, topic, questions)
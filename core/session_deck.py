@@ -0,0 +1,38 @@
+# --- Decks held in st.session_state between reruns ---
+# Streamlit re-runs the whole page on every click. The quiz and revision
+# pages build their deck once (reading files, hashing, merging duplicates)
+# and keep it in the session together with the store's stamp() for the
+# course (a generation counter bumped by every write); later reruns only
+# compare the stamp and then index into the deck. __slots__ keeps the per-item overhead down for
+# sessions holding large decks.
+
+
+class Question:
+    __slots__ = ("id", "text", "options", "answer")
+
+    def __init__(self, qid, text, options, answer):
+        self.id = qid
+        self.text = text
+        self.options = tuple(options)
+        self.answer = answer
+
+
+class Deck:
+    __slots__ = ("key", "stamp", "items", "notices")
+
+    # items: tuple of card strings or Questions; notices: (level, message)
+    # pairs shown on every rerun, e.g. ("caption", "3 topics queued")
+    def __init__(self, key, stamp, items, notices=()):
+        self.key = key
+        self.stamp = stamp
+        self.items = tuple(items)
+        self.notices = tuple(notices)
+
+
+# The session's deck stored under slot, or None when it was built for
+# another key or the course changed since
+def current_deck(session, slot, key, stamp):
+    deck = session.get(slot)
+    if deck is None or deck.key != key or deck.stamp != stamp:
+        return None
+    return deck
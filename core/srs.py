@@ -0,0 +1,228 @@
+import os
+import heapq
+import threading
+from collections import OrderedDict, deque
+from core.paths import find_smartstudy_path
+from core.fileio import atomic_write_text, file_lock
+from core.decks import content_deck
+from core.llm import split_cards
+from core.identity import IdentityCatalog, card_id
+
+# --- Spaced repetition (SM-2) across every card of a course ---
+# Per-card state is (ease, interval in days, repetitions, lapses, due time).
+# Each review appends one line to <SMARTSTUDY_DIR>/srs/<course_id>.log:
+#   <card id> <ease> <interval> <reps> <lapses> <due>
+# the last line for a card wins. Loading replays the log once per process;
+# later calls only read lines appended since (by any process). The log is
+# rewritten with one line per card once it holds more than twice as many
+# lines as cards.
+#
+# Due cards are served from a min-heap of (due, card id) with lazy deletion:
+# a review pushes a new entry, and entries whose due time no longer matches
+# the card's state (or whose card left the course) are dropped when they
+# reach the top. Cards that were never reviewed are served after due cards,
+# in deck order.
+#
+# Cards are keyed by core.identity.card_id(). When a regenerated deck
+# replaces a reviewed card with a near-identical one, the old card's state
+# is copied to the new ID (see IdentityCatalog), so its schedule survives.
+
+INITIAL_EASE = 2.5
+MIN_EASE = 1.3
+RELEARN_DELAY = 600  # seconds before a forgotten card is shown again
+DAY = 86400
+COMPACT_SLACK = 1000
+
+# Buttons offered after a card is revealed, as (label, SM-2 grade)
+GRADES = [("Again", 1), ("Hard", 3), ("Good", 4), ("Easy", 5)]
+
+
+def sm2(state, grade, now):
+    ease, interval, reps, lapses, _ = state or (INITIAL_EASE, 0.0, 0, 0, 0.0)
+    if grade < 3:
+        reps, lapses, interval = 0, lapses + 1, 1.0
+        due = now + RELEARN_DELAY
+    else:
+        reps += 1
+        interval = 1.0 if reps == 1 else 6.0 if reps == 2 else round(interval * ease, 2)
+        due = now + interval * DAY
+    ease = max(MIN_EASE, ease + 0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    return (round(ease, 3), interval, reps, lapses, round(due, 1))
+
+
+class CourseSchedule:
+    def __init__(self, path):
+        self.path = path
+        self.catalog = IdentityCatalog(path[:-len(".log")] + ".cards")
+        self.states = {}  # card id -> (ease, interval, reps, lapses, due)
+        self.heap = []
+        self.cards = {}  # card id -> card text, for the cards currently in the course
+        self.new = deque()  # never-reviewed card ids, deck order
+        self._lines = 0
+        self._offset = 0
+        self._inode = None
+        self._lock = threading.Lock()
+
+    # --- Persistence ---
+    def _refresh(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return
+        if st.st_ino != self._inode or st.st_size < self._offset:
+            # First load, or the log was compacted by another process
+            self.states, self._lines, self._offset, self._inode = {}, 0, 0, st.st_ino
+            self._replay()
+            self.heap = [(state[4], cid) for cid, state in self.states.items()]
+            heapq.heapify(self.heap)
+        elif st.st_size > self._offset:
+            for cid, state in self._replay():
+                heapq.heappush(self.heap, (state[4], cid))
+
+    def _replay(self):
+        changed = []
+        with open(self.path, "rb") as f:
+            f.seek(self._offset)
+            data = f.read()
+        end = data.rfind(b"\n") + 1  # ignore a line that is still being written
+        for line in data[:end].decode("utf-8").splitlines():
+            parts = line.split()
+            if len(parts) != 6:
+                continue
+            state = (float(parts[1]), float(parts[2]), int(parts[3]), int(parts[4]), float(parts[5]))
+            self.states[parts[0]] = state
+            changed.append((parts[0], state))
+            self._lines += 1
+        self._offset += end
+        return changed
+
+    def _append(self, cid, state):
+        line = f"{cid} {state[0]:g} {state[1]:g} {state[2]} {state[3]} {state[4]:.1f}\n"
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with file_lock(self.path):
+            self._refresh()
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(line)
+            self.states[cid] = state
+            self._lines += 1
+            self._offset += len(line.encode("utf-8"))
+            if self._inode is None:
+                self._inode = os.stat(self.path).st_ino
+            if self._lines > 2 * len(self.states) + COMPACT_SLACK:
+                self._compact()
+
+    def _compact(self):
+        text = "".join(
+            f"{cid} {s[0]:g} {s[1]:g} {s[2]} {s[3]} {s[4]:.1f}\n" for cid, s in self.states.items()
+        )
+        atomic_write_text(self.path, text)
+        st = os.stat(self.path)
+        self._lines, self._offset, self._inode = len(self.states), st.st_size, st.st_ino
+
+    # --- Queue ---
+    def sync(self, cards):
+        with self._lock:
+            self._refresh()
+            if cards.keys() != self.cards.keys():
+                for new, old in self.catalog.carry_over(cards, self.states.__contains__).items():
+                    if new not in self.states:
+                        self._append(new, self.states[old])
+                # Stale heap entries of removed cards are dropped by next_card();
+                # rebuilding keeps cards that come back schedulable
+                self.heap = [(state[4], cid) for cid, state in self.states.items() if cid in cards]
+                heapq.heapify(self.heap)
+                self.new = deque(cid for cid in cards if cid not in self.states)
+            self.cards = cards
+
+    def next_card(self, now):
+        with self._lock:
+            self._refresh()
+            while self.heap:
+                due, cid = self.heap[0]
+                state = self.states.get(cid)
+                if cid not in self.cards or state is None or state[4] != due:
+                    heapq.heappop(self.heap)  # stale entry
+                    continue
+                if due <= now:
+                    return cid
+                break
+            while self.new and self.new[0] in self.states:
+                self.new.popleft()
+            return self.new[0] if self.new else None
+
+    def next_due_time(self):
+        with self._lock:
+            return self.heap[0][0] if self.heap else None
+
+    def review(self, cid, grade, now):
+        with self._lock:
+            state = sm2(self.states.get(cid), grade, now)
+            self._append(cid, state)
+            heapq.heappush(self.heap, (state[4], cid))
+            return state
+
+    def counts(self, now):
+        with self._lock:
+            due = sum(1 for cid, s in self.states.items() if s[4] <= now and cid in self.cards)
+            return {"due": due, "new": len(self.new), "total": len(self.cards)}
+
+
+# --- Process-wide schedules, one per course ---
+_schedules = {}
+_schedules_lock = threading.Lock()
+
+
+def _schedule_path(course_id):
+    return os.path.join(find_smartstudy_path(), "srs", f"{course_id}.log")
+
+
+def get_schedule(course_id):
+    path = _schedule_path(course_id)
+    with _schedules_lock:
+        schedule = _schedules.get(path)
+        if schedule is None:
+            schedule = _schedules[path] = CourseSchedule(path)
+    return schedule
+
+
+# Deletes a course's review state (on disk and in this process)
+def remove_schedule(course_id):
+    path = _schedule_path(course_id)
+    with _schedules_lock:
+        _schedules.pop(path, None)
+        for key in [key for key in _course_cards if key[1] == course_id]:
+            del _course_cards[key]
+    catalog = path[:-len(".log")] + ".cards"
+    for stale in (path, f"{path}.lock", catalog, f"{catalog}.lock"):
+        if os.path.exists(stale):
+            os.remove(stale)
+
+
+# --- Every card of a course: {card id: card text} ---
+# Rebuilt only when a content deck changes; content_deck() returns the same
+# string object while a deck is unchanged, so the identity check is cheap.
+MAX_CACHED_COURSES = 32
+_course_cards = OrderedDict()
+
+
+def course_cards(store, course_id):
+    decks = [content_deck(store, course_id, content) for content in store.list_contents(course_id)]
+    key = (store.root, course_id)
+    with _schedules_lock:
+        cached = _course_cards.get(key)
+        if cached is not None and len(cached[0]) == len(decks) and all(a is b for a, b in zip(cached[0], decks)):
+            _course_cards.move_to_end(key)
+            return cached[1]
+
+    cards = {}
+    for deck in decks:
+        for card in split_cards(deck or ""):
+            if card.strip():
+                cards.setdefault(card_id(card), card.strip())
+
+    with _schedules_lock:
+        _course_cards[key] = (decks, cards)
+        _course_cards.move_to_end(key)
+        while len(_course_cards) > MAX_CACHED_COURSES:
+            _course_cards.popitem(last=False)
+    return cards
@@ -0,0 +1,767 @@
+import os
+import json
+import shutil
+import hashlib
+import sqlite3
+import threading
+import functools
+import contextlib
+from core.paths import find_smartstudy_path
+from core.fileio import atomic_write_json, atomic_write_text, update_json
+from core.cache import json_cache
+from core.search import IndexedStore, get_search_index
+from core.revisions import get_note_history, remove_history
+from core.srs import remove_schedule
+from core.quiz_history import remove_quiz_history
+from core.embeddings import remove_embeddings
+from core.normalize import note_markdown
+
+# Every page goes through the store returned by get_store(). Two backends are
+# available and selected with the SMARTSTUDY_STORE environment variable:
+#   files  (default) - the original JSON/Markdown tree under revisions/<course_id>
+#   sqlite           - a single smartstudy.db in WAL mode (see core/migrate.py)
+# Content-level artifacts use topic=None throughout.
+
+
+def text_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+# --- File backend (original on-disk layout) ---
+class FileStore:
+    def __init__(self, root):
+        self.root = root
+        self.course_file = os.path.join(root, "courses.json")
+        self.revision_folder = os.path.join(root, "revisions")
+        self._local = threading.local()  # manifest batches of this thread
+        os.makedirs(self.revision_folder, exist_ok=True)
+
+    # --- Paths ---
+    def course_path(self, course_id):
+        return os.path.join(self.revision_folder, course_id)
+
+    def _content_file(self, course_id):
+        return os.path.join(self.course_path(course_id), "content_list.json")
+
+    def _topic_file(self, course_id, content):
+        return os.path.join(self.course_path(course_id), "topics", f"{content}.json")
+
+    def _note_file(self, course_id, content, topic):
+        return os.path.join(self.course_path(course_id), "notes", f"{_file_name(content, topic)}.md")
+
+    def _flashcard_file(self, course_id, content, topic=None):
+        return os.path.join(self.course_path(course_id), "flashcards", f"{_file_name(content, topic)}.md")
+
+    def _manifest_file(self, course_id):
+        return os.path.join(self.course_path(course_id), "manifest.json")
+
+    def _quiz_file(self, course_id, content, topic):
+        return os.path.join(self.course_path(course_id), "quiz", f"{_file_name(content, topic)}.json")
+
+    def _legacy_quiz_files(self, course_id, content):
+        # Whole-content quizzes written before quizzes were generated per topic
+        quiz_folder = os.path.join(self.course_path(course_id), "quiz")
+        return (
+            os.path.join(quiz_folder, f"{content}.json"),
+            os.path.join(quiz_folder, f"{content}_hash.txt"),
+        )
+
+    # --- Helpers ---
+    # JSON reads go through the process-wide cache; every write invalidates it.
+    def _read_list(self, path):
+        return list(json_cache.get(path, []))
+
+    def _update_list(self, path, mutate):
+        try:
+            return update_json(path, mutate, [])
+        finally:
+            json_cache.invalidate(path)
+
+    def _read_text(self, path):
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def _write_text(self, path, text):
+        atomic_write_text(path, text)
+
+    def _remove(self, path):
+        if os.path.exists(path):
+            os.remove(path)
+        json_cache.invalidate(path)
+
+    # --- Artifact manifest ---
+    # manifest.json maps content -> topic ("" for content level) -> kind ->
+    # {"path": <relative path>, ...metadata} for every note, flashcard deck
+    # and quiz file in the course, and holds the course's "generation": a
+    # counter bumped by every artifact write and delete (see stamp()). Lookups and cascading deletes use it instead of scanning
+    # folders with startswith(), which is O(files in course) and confuses
+    # contents like "Math" and "Math_Advanced".
+    def _manifest(self, course_id):
+        pending = self._batch(course_id)
+        if pending is not None:
+            return pending[0]
+        manifest = json_cache.get(self._manifest_file(course_id))
+        if manifest is None:
+            manifest = self._update_manifest(course_id, lambda m: m)
+        return manifest
+
+    def _update_manifest(self, course_id, mutate):
+        pending = self._batch(course_id)
+        if pending is not None:
+            result = mutate(pending[0])
+            if result is not None:
+                pending[0] = result
+                pending[1].append(mutate)
+            return pending[0]
+        path = self._manifest_file(course_id)
+        try:
+            return update_json(path, lambda m: mutate(m if m is not None else self._scan_manifest(course_id)), None)
+        finally:
+            json_cache.invalidate(path)
+
+    # Trees written before the manifest existed: probe the exact file name of
+    # every known (content, topic) pair, never a prefix match.
+    def _scan_manifest(self, course_id):
+        course_path = self.course_path(course_id)
+        contents = {}
+        for content in self.list_contents(course_id):
+            entries = {}
+            quiz_file, hash_file = self._legacy_quiz_files(course_id, content)
+            candidates = [("", "flashcards", self._flashcard_file(course_id, content)),
+                          ("", "quiz", quiz_file),
+                          ("", "quiz_hash", hash_file)]
+            for topic in self.list_topics(course_id, content):
+                candidates.append((topic, "note", self._note_file(course_id, content, topic)))
+                candidates.append((topic, "flashcards", self._flashcard_file(course_id, content, topic)))
+                candidates.append((topic, "quiz", self._quiz_file(course_id, content, topic)))
+            for topic, kind, path in candidates:
+                for candidate in (path, _legacy_path(path, content)):
+                    if os.path.exists(candidate):
+                        entries.setdefault(topic, {})[kind] = {"path": os.path.relpath(candidate, course_path)}
+                        break
+            contents[content] = entries
+        return {"contents": contents}
+
+    # Where an artifact is stored: the path registered in the manifest (trees
+    # written before file names were escaped keep their old names), else
+    # the default for new files
+    def _path(self, course_id, content, topic, kind, default):
+        artifact = self._manifest(course_id)["contents"].get(content, {}).get(topic or "", {}).get(kind)
+        return os.path.join(self.course_path(course_id), artifact["path"]) if artifact else default
+
+    def _register(self, course_id, content, topic, kind, path, **meta):
+        artifact = {"path": os.path.relpath(path, self.course_path(course_id)), **meta}
+        current = self._manifest(course_id)["contents"].get(content, {}).get(topic or "", {})
+        previous = current.get(kind, {}).get("path")
+
+        # Written even when the entry is unchanged: the file was rewritten,
+        # so the generation moves on
+        def add(manifest):
+            manifest["contents"].setdefault(content, {}).setdefault(topic or "", {})[kind] = artifact
+            return _bumped(manifest)
+
+        manifest = self._update_manifest(course_id, add)
+        if previous is not None and previous != artifact["path"]:
+            # Moved from an old-style file name: drop the old file unless
+            # another artifact still maps to it
+            self._remove_unreferenced(course_id, [previous], manifest or self._manifest(course_id))
+
+    def _unregister(self, course_id, content, topic=None):
+        # Drops a whole content (topic=None) or one topic; returns the removed entries
+        removed = {}
+
+        def drop(manifest):
+            removed.clear()
+            entries = manifest["contents"].get(content)
+            if entries is None:
+                return None
+            if topic is None:
+                removed.update(manifest["contents"].pop(content))
+            elif topic in entries:
+                removed[topic] = entries.pop(topic)
+            else:
+                return None
+            return _bumped(manifest)
+
+        manifest = self._update_manifest(course_id, drop)
+        if removed:
+            paths = [artifact["path"] for kinds in removed.values() for artifact in kinds.values()]
+            self._remove_unreferenced(course_id, paths, manifest or self._manifest(course_id))
+
+    # Deletes the files at paths (relative to the course) that no artifact
+    # left in manifest uses. Old trees named files "<content>_<topic>", so
+    # "Math"/"Advanced_X" and "Math_Advanced"/"X" may share one file.
+    def _remove_unreferenced(self, course_id, paths, manifest):
+        used = {
+            artifact["path"]
+            for entries in manifest["contents"].values()
+            for kinds in entries.values()
+            for artifact in kinds.values()
+        }
+        course_path = self.course_path(course_id)
+        for path in paths:
+            if path not in used:
+                self._remove(os.path.join(course_path, path))
+
+    # --- Batched manifest updates (bulk imports) ---
+    # Inside batch(course_id) this thread's manifest updates for the course
+    # are applied to an in-memory copy and replayed in one update_json at
+    # the end (on the manifest as it is then, so concurrent writers are not
+    # lost). Without it, writing n artifacts rewrites the manifest n times.
+    def _batch(self, course_id):
+        batches = getattr(self._local, "batches", None)
+        return batches.get(course_id) if batches else None
+
+    @contextlib.contextmanager
+    def batch(self, course_id):
+        if self._batch(course_id) is not None:
+            yield  # nested
+            return
+        if not hasattr(self._local, "batches"):
+            self._local.batches = {}
+        self._local.batches[course_id] = pending = [json.loads(json.dumps(self._manifest(course_id))), []]
+        try:
+            yield
+        finally:
+            del self._local.batches[course_id]
+            if pending[1]:
+                self._update_manifest(course_id, functools.partial(_replay, pending[1]))
+
+    # The course's generation: changes whenever a note, deck or quiz of the
+    # course is written or removed, for session-level caches. Read through
+    # json_cache, so an unchanged manifest costs one stat() call.
+    def stamp(self, course_id):
+        manifest = json_cache.get(self._manifest_file(course_id))
+        return manifest.get("generation", 0) if manifest else 0
+
+    # --- Courses ---
+    def list_courses(self):
+        return self._read_list(self.course_file)
+
+    def add_course(self, course):
+        self._update_list(self.course_file, lambda courses: courses + [course])
+        os.makedirs(self.course_path(course["id"]), exist_ok=True)
+
+    def delete_course(self, course_id):
+        self._update_list(self.course_file, lambda courses: _without(courses, lambda c: c["id"] == course_id))
+        shutil.rmtree(self.course_path(course_id), ignore_errors=True)
+        _remove_course_state(course_id)
+
+    # --- Contents ---
+    def list_contents(self, course_id):
+        return self._read_list(self._content_file(course_id))
+
+    def add_content(self, course_id, content):
+        return self._update_list(self._content_file(course_id), lambda items: _with(items, content)) is not None
+
+    def delete_content(self, course_id, content):
+        self._manifest(course_id)  # built from the lists on first use, so before they change
+        self._update_list(self._content_file(course_id), lambda items: _without(items, lambda c: c == content))
+
+        # Cleanup associated notes, flashcards and quizzes, then the topic list
+        self._unregister(course_id, content)
+        self._remove(self._topic_file(course_id, content))
+        remove_history(self.course_path(course_id), content)
+
+    # --- Topics ---
+    def list_topics(self, course_id, content):
+        return self._read_list(self._topic_file(course_id, content))
+
+    def add_topic(self, course_id, content, topic):
+        return self._update_list(self._topic_file(course_id, content), lambda items: _with(items, topic)) is not None
+
+    def delete_topic(self, course_id, content, topic):
+        self._manifest(course_id)
+        self._update_list(self._topic_file(course_id, content), lambda items: _without(items, lambda t: t == topic))
+        self._unregister(course_id, content, topic)
+        remove_history(self.course_path(course_id), content, topic)
+
+    # --- Notes ---
+    def read_note(self, course_id, content, topic):
+        return self._read_text(self._path(course_id, content, topic, "note", self._note_file(course_id, content, topic)))
+
+    # Every save is also appended to the note's revision history
+    # (core/revisions.py); the note file itself stays the latest version.
+    # The manifest records the hash of the HTML (the revision's identity)
+    # and of its Markdown (what flashcards are generated from), so freshness
+    # checks never read or hash the note.
+    def write_note(self, course_id, content, topic, text):
+        path = self._note_file(course_id, content, topic)
+        digest = text_hash(text)
+        revision = get_note_history(self.course_path(course_id), content, topic).commit(text, digest)
+        self._write_text(path, text)
+        self._register(
+            course_id, content, topic, "note", path,
+            hash=digest, markdown_hash=text_hash(note_markdown(text)), revision=revision,
+        )
+
+    def _note_artifact(self, course_id, content, topic):
+        artifact = self._manifest(course_id)["contents"].get(content, {}).get(topic, {}).get("note")
+        if artifact is not None and "markdown_hash" not in artifact:
+            # Registered before hashes were recorded: backfill once
+            text = self.read_note(course_id, content, topic)
+            if text is None:
+                return None
+            self.write_note(course_id, content, topic, text)
+            artifact = self._manifest(course_id)["contents"][content][topic]["note"]
+        return artifact
+
+    # Hash of the current note (None if there is none)
+    def note_hash(self, course_id, content, topic):
+        artifact = self._note_artifact(course_id, content, topic)
+        return artifact["hash"] if artifact else None
+
+    # Hash of the note's Markdown, recorded as the source of its flashcards
+    def note_source_hash(self, course_id, content, topic):
+        artifact = self._note_artifact(course_id, content, topic)
+        return artifact["markdown_hash"] if artifact else None
+
+    # [(revision, saved_at, hash)] of the retained revisions, oldest first
+    def note_revisions(self, course_id, content, topic):
+        return get_note_history(self.course_path(course_id), content, topic).revisions()
+
+    def read_note_revision(self, course_id, content, topic, revision):
+        return get_note_history(self.course_path(course_id), content, topic).checkout(revision)
+
+    # --- Flashcards ---
+    def read_flashcards(self, course_id, content, topic=None):
+        path = self._path(course_id, content, topic, "flashcards", self._flashcard_file(course_id, content, topic))
+        return self._read_text(path)
+
+    def write_flashcards(self, course_id, content, topic, text, source_hash=None):
+        path = self._flashcard_file(course_id, content, topic)
+        self._write_text(path, text)
+        self._register(course_id, content, topic, "flashcards", path, hash=text_hash(text), source=source_hash)
+
+    # Hash of the note a topic deck was generated from (None if unknown)
+    def flashcard_source_hash(self, course_id, content, topic):
+        entry = self._manifest(course_id)["contents"].get(content, {}).get(topic, {})
+        return entry.get("flashcards", {}).get("source")
+
+    # {topic: hash} of every topic deck in the content, sorted by topic.
+    # Answered from the (cached) manifest without opening any deck.
+    def topic_flashcard_hashes(self, course_id, content):
+        entries = self._manifest(course_id)["contents"].get(content, {})
+        hashes = {}
+        for topic in sorted(t for t in entries if t and "flashcards" in entries[t]):
+            artifact = entries[topic]["flashcards"]
+            if "hash" not in artifact:
+                # Registered before hashes were recorded: backfill once
+                text = self.read_flashcards(course_id, content, topic)
+                if text is None:
+                    continue
+                self.write_flashcards(course_id, content, topic, text, artifact.get("source"))
+                hashes[topic] = text_hash(text)
+            else:
+                hashes[topic] = artifact["hash"]
+        return hashes
+
+    # The content-level deck is derived from the topic decks; sources is the
+    # {topic: hash} it was built from.
+    def read_content_deck(self, course_id, content):
+        artifact = self._manifest(course_id)["contents"].get(content, {}).get("", {}).get("flashcards")
+        if artifact is None:
+            return None, None
+        return self.read_flashcards(course_id, content), artifact.get("sources")
+
+    def write_content_deck(self, course_id, content, text, sources):
+        path = self._flashcard_file(course_id, content)
+        self._write_text(path, text)
+        self._register(course_id, content, None, "flashcards", path, hash=text_hash(text), sources=sources)
+
+    # --- Quiz (one per topic) ---
+    def read_quiz(self, course_id, content, topic):
+        return json_cache.get(self._path(course_id, content, topic, "quiz", self._quiz_file(course_id, content, topic)))
+
+    # Hash of the topic deck the quiz was generated from (None if unknown)
+    def quiz_source_hash(self, course_id, content, topic):
+        entry = self._manifest(course_id)["contents"].get(content, {}).get(topic, {})
+        return entry.get("quiz", {}).get("source")
+
+    def write_quiz(self, course_id, content, topic, questions, source_hash):
+        # Quiz first, manifest last: a crash in between only forces a regeneration
+        quiz_file = self._quiz_file(course_id, content, topic)
+        atomic_write_json(quiz_file, questions)
+        json_cache.invalidate(quiz_file)
+        self._register(course_id, content, topic, "quiz", quiz_file, source=source_hash)
+
+
+# Review schedule, quiz scores and embedding vectors are kept outside the
+# store, keyed by course id; a course re-created with the same id starts clean
+def _remove_course_state(course_id):
+    remove_schedule(course_id)
+    remove_quiz_history(course_id)
+    remove_embeddings(course_id)
+
+
+# --- File names of notes, decks and quizzes ---
+# "<content>_<topic>" (just "<content>" for content-level decks), with "_"
+# and "%" escaped in the content so the first "_" always ends it: "Math" /
+# "Advanced_X" and "Math_Advanced" / "X" get different files. Names without
+# either character are unchanged from the original layout.
+def _file_name(content, topic=None):
+    escaped = content.replace("%", "%25").replace("_", "%5F")
+    return escaped if topic is None else f"{escaped}_{topic}"
+
+
+# The same path under the unescaped name older versions used
+def _legacy_path(path, content):
+    folder, name = os.path.split(path)
+    escaped = content.replace("%", "%25").replace("_", "%5F")
+    if not name.startswith(escaped):
+        return path
+    return os.path.join(folder, content + name[len(escaped):])
+
+
+def _bumped(manifest):
+    manifest["generation"] = manifest.get("generation", 0) + 1
+    return manifest
+
+
+def _replay(mutations, manifest):
+    changed = False
+    for mutate in mutations:
+        result = mutate(manifest)
+        if result is not None:
+            manifest, changed = result, True
+    return manifest if changed else None
+
+
+# --- List mutations for update_json (None = nothing to write) ---
+def _with(items, item):
+    if item in items:
+        return None
+    return items + [item]
+
+
+def _without(items, match):
+    kept = [i for i in items if not match(i)]
+    return kept if len(kept) != len(items) else None
+
+
+# --- SQLite backend (WAL mode, one row per artifact) ---
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS courses (
+    id TEXT PRIMARY KEY,
+    name TEXT NOT NULL,
+    created_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS contents (
+    course_id TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (course_id, name)
+);
+CREATE TABLE IF NOT EXISTS topics (
+    course_id TEXT NOT NULL,
+    content TEXT NOT NULL,
+    name TEXT NOT NULL,
+    PRIMARY KEY (course_id, content, name)
+);
+CREATE TABLE IF NOT EXISTS notes (
+    course_id TEXT NOT NULL,
+    content TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    body TEXT NOT NULL,
+    hash TEXT,
+    markdown_hash TEXT,  -- hash of core.normalize.note_markdown(body)
+    PRIMARY KEY (course_id, content, topic)
+);
+CREATE TABLE IF NOT EXISTS flashcards (
+    course_id TEXT NOT NULL,
+    content TEXT NOT NULL,
+    topic TEXT NOT NULL,  -- '' for the content-level deck
+    body TEXT NOT NULL,
+    hash TEXT,
+    source_hash TEXT,  -- hash of the note a topic deck was generated from
+    sources TEXT,  -- JSON {topic: hash} the content-level deck was built from
+    PRIMARY KEY (course_id, content, topic)
+);
+CREATE TABLE IF NOT EXISTS generations (
+    course_id TEXT PRIMARY KEY,
+    generation INTEGER NOT NULL  -- bumped by every artifact write and delete
+);
+CREATE TABLE IF NOT EXISTS quizzes (
+    course_id TEXT NOT NULL,
+    content TEXT NOT NULL,
+    topic TEXT NOT NULL,
+    questions TEXT NOT NULL,
+    source_hash TEXT,  -- hash of the topic deck the quiz was generated from
+    PRIMARY KEY (course_id, content, topic)
+);
+"""
+
+
+class SqliteStore:
+    def __init__(self, root, db_path=None):
+        self.root = root
+        self.db_path = db_path or os.path.join(root, "smartstudy.db")
+        self._local = threading.local()
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        # Whole-content quizzes predate per-topic quizzes; they are derived
+        # data and get regenerated per topic on demand
+        if "topic" not in [row[1] for row in conn.execute("PRAGMA table_info(quizzes)")]:
+            conn.execute("DROP TABLE quizzes")
+            conn.executescript(SCHEMA)
+        # Databases created before a column was added
+        for table, column in (("notes", "hash"), ("notes", "markdown_hash"), ("flashcards", "hash"), ("flashcards", "source_hash"), ("flashcards", "sources")):
+            columns = [row[1] for row in conn.execute(f"PRAGMA table_info({table})")]
+            if column not in columns:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} TEXT")
+
+    # --- Connection / transactions ---
+    # Streamlit runs every session in its own thread, so each thread keeps
+    # its own connection. WAL lets readers proceed while one writer commits.
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    def _tx(self):
+        return _Transaction(self._conn())
+
+    def _rows(self, sql, params=()):
+        return self._conn().execute(sql, params).fetchall()
+
+    def _value(self, sql, params=()):
+        row = self._conn().execute(sql, params).fetchone()
+        return row[0] if row else None
+
+    # Every write is its own short transaction already
+    def batch(self, course_id):
+        return contextlib.nullcontext()
+
+    # The course's generation: bumped in the same transaction as every note,
+    # deck or quiz write and delete of the course, for session-level caches
+    def stamp(self, course_id):
+        return self._value("SELECT generation FROM generations WHERE course_id = ?", (course_id,)) or 0
+
+    def _bump(self, conn, course_id):
+        conn.execute(
+            "INSERT INTO generations (course_id, generation) VALUES (?, 1) "
+            "ON CONFLICT (course_id) DO UPDATE SET generation = generation + 1",
+            (course_id,),
+        )
+
+    def course_path(self, course_id):
+        return os.path.join(self.root, "revisions", course_id)
+
+    # --- Courses ---
+    def list_courses(self):
+        rows = self._rows("SELECT id, name, created_at FROM courses ORDER BY rowid")
+        return [{"id": r[0], "name": r[1], "created_at": r[2]} for r in rows]
+
+    def add_course(self, course):
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO courses (id, name, created_at) VALUES (?, ?, ?)",
+                (course["id"], course["name"], course["created_at"]),
+            )
+
+    def delete_course(self, course_id):
+        with self._tx() as conn:
+            conn.execute("DELETE FROM courses WHERE id = ?", (course_id,))
+            for table in ("contents", "topics", "notes", "flashcards", "quizzes"):
+                conn.execute(f"DELETE FROM {table} WHERE course_id = ?", (course_id,))
+            self._bump(conn, course_id)
+        remove_history(self.course_path(course_id))
+        _remove_course_state(course_id)
+
+    # --- Contents ---
+    def list_contents(self, course_id):
+        rows = self._rows("SELECT name FROM contents WHERE course_id = ? ORDER BY rowid", (course_id,))
+        return [r[0] for r in rows]
+
+    def add_content(self, course_id, content):
+        with self._tx() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO contents (course_id, name) VALUES (?, ?)",
+                (course_id, content),
+            )
+            return cur.rowcount > 0
+
+    def delete_content(self, course_id, content):
+        with self._tx() as conn:
+            conn.execute("DELETE FROM contents WHERE course_id = ? AND name = ?", (course_id, content))
+            for table in ("topics", "notes", "flashcards", "quizzes"):
+                conn.execute(f"DELETE FROM {table} WHERE course_id = ? AND content = ?", (course_id, content))
+            self._bump(conn, course_id)
+        remove_history(self.course_path(course_id), content)
+
+    # --- Topics ---
+    def list_topics(self, course_id, content):
+        rows = self._rows(
+            "SELECT name FROM topics WHERE course_id = ? AND content = ? ORDER BY rowid",
+            (course_id, content),
+        )
+        return [r[0] for r in rows]
+
+    def add_topic(self, course_id, content, topic):
+        with self._tx() as conn:
+            cur = conn.execute(
+                "INSERT OR IGNORE INTO topics (course_id, content, name) VALUES (?, ?, ?)",
+                (course_id, content, topic),
+            )
+            return cur.rowcount > 0
+
+    def delete_topic(self, course_id, content, topic):
+        with self._tx() as conn:
+            conn.execute(
+                "DELETE FROM topics WHERE course_id = ? AND content = ? AND name = ?",
+                (course_id, content, topic),
+            )
+            for table in ("notes", "flashcards", "quizzes"):
+                conn.execute(
+                    f"DELETE FROM {table} WHERE course_id = ? AND content = ? AND topic = ?",
+                    (course_id, content, topic),
+                )
+            self._bump(conn, course_id)
+        remove_history(self.course_path(course_id), content, topic)
+
+    # --- Notes ---
+    def read_note(self, course_id, content, topic):
+        return self._value(
+            "SELECT body FROM notes WHERE course_id = ? AND content = ? AND topic = ?",
+            (course_id, content, topic),
+        )
+
+    def write_note(self, course_id, content, topic, text):
+        digest = text_hash(text)
+        get_note_history(self.course_path(course_id), content, topic).commit(text, digest)
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO notes (course_id, content, topic, body, hash, markdown_hash) VALUES (?, ?, ?, ?, ?, ?)",
+                (course_id, content, topic, text, digest, text_hash(note_markdown(text))),
+            )
+            self._bump(conn, course_id)
+
+    def note_hash(self, course_id, content, topic):
+        row = self._conn().execute(
+            "SELECT hash, CASE WHEN hash IS NULL THEN body END FROM notes WHERE course_id = ? AND content = ? AND topic = ?",
+            (course_id, content, topic),
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0] or text_hash(row[1])
+
+    def note_source_hash(self, course_id, content, topic):
+        row = self._conn().execute(
+            "SELECT markdown_hash, CASE WHEN markdown_hash IS NULL THEN body END FROM notes WHERE course_id = ? AND content = ? AND topic = ?",
+            (course_id, content, topic),
+        ).fetchone()
+        if row is None:
+            return None
+        return row[0] or text_hash(note_markdown(row[1]))
+
+    def note_revisions(self, course_id, content, topic):
+        return get_note_history(self.course_path(course_id), content, topic).revisions()
+
+    def read_note_revision(self, course_id, content, topic, revision):
+        return get_note_history(self.course_path(course_id), content, topic).checkout(revision)
+
+    # --- Flashcards ---
+    def read_flashcards(self, course_id, content, topic=None):
+        return self._value(
+            "SELECT body FROM flashcards WHERE course_id = ? AND content = ? AND topic = ?",
+            (course_id, content, topic or ""),
+        )
+
+    def write_flashcards(self, course_id, content, topic, text, source_hash=None):
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO flashcards (course_id, content, topic, body, hash, source_hash) VALUES (?, ?, ?, ?, ?, ?)",
+                (course_id, content, topic or "", text, text_hash(text), source_hash),
+            )
+            self._bump(conn, course_id)
+
+    def flashcard_source_hash(self, course_id, content, topic):
+        return self._value(
+            "SELECT source_hash FROM flashcards WHERE course_id = ? AND content = ? AND topic = ?",
+            (course_id, content, topic),
+        )
+
+    def topic_flashcard_hashes(self, course_id, content):
+        rows = self._rows(
+            "SELECT topic, hash, CASE WHEN hash IS NULL THEN body END FROM flashcards WHERE course_id = ? AND content = ? AND topic != '' ORDER BY topic",
+            (course_id, content),
+        )
+        return {topic: hash or text_hash(body) for topic, hash, body in rows}
+
+    def read_content_deck(self, course_id, content):
+        row = self._conn().execute(
+            "SELECT body, sources FROM flashcards WHERE course_id = ? AND content = ? AND topic = ''",
+            (course_id, content),
+        ).fetchone()
+        if row is None:
+            return None, None
+        return row[0], json.loads(row[1]) if row[1] else None
+
+    def write_content_deck(self, course_id, content, text, sources):
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO flashcards (course_id, content, topic, body, hash, sources) VALUES (?, ?, '', ?, ?, ?)",
+                (course_id, content, text, text_hash(text), json.dumps(sources)),
+            )
+            self._bump(conn, course_id)
+
+    # --- Quiz (one per topic) ---
+    def read_quiz(self, course_id, content, topic):
+        questions = self._value(
+            "SELECT questions FROM quizzes WHERE course_id = ? AND content = ? AND topic = ?",
+            (course_id, content, topic),
+        )
+        return json.loads(questions) if questions is not None else None
+
+    def quiz_source_hash(self, course_id, content, topic):
+        return self._value(
+            "SELECT source_hash FROM quizzes WHERE course_id = ? AND content = ? AND topic = ?",
+            (course_id, content, topic),
+        )
+
+    def write_quiz(self, course_id, content, topic, questions, source_hash):
+        with self._tx() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO quizzes (course_id, content, topic, questions, source_hash) VALUES (?, ?, ?, ?, ?)",
+                (course_id, content, topic, json.dumps(questions), source_hash),
+            )
+            self._bump(conn, course_id)
+
+
+class _Transaction:
+    # BEGIN IMMEDIATE takes the write lock up front, so two sessions never
+    # deadlock trying to upgrade a read transaction at the same time.
+    def __init__(self, conn):
+        self.conn = conn
+
+    def __enter__(self):
+        self.conn.execute("BEGIN IMMEDIATE")
+        return self.conn
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.conn.execute("COMMIT")
+        else:
+            self.conn.execute("ROLLBACK")
+        return False
+
+
+STORES = {
+    "files": FileStore,
+    "sqlite": SqliteStore,
+}
+
+
+# --- Process-wide store ---
+@functools.lru_cache(maxsize=None)
+def get_store():
+    backend = os.getenv("SMARTSTUDY_STORE", "files").lower()
+    if backend not in STORES:
+        raise ValueError(f"Unknown SMARTSTUDY_STORE '{backend}' (expected one of: {', '.join(STORES)})")
+    return IndexedStore(STORES[backend](find_smartstudy_path()), get_search_index())
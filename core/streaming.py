@@ -0,0 +1,54 @@
+import threading
+from core.storage import text_hash
+from core.normalize import note_markdown
+from core.llm import stream_flashcards
+
+
+# --- Flashcard decks that are still being written by the model ---
+# Generation runs in a background thread so page reruns (Next/Previous)
+# don't interrupt it; each rerun just reads the cards received so far. The
+# deck is written to the store in one atomic write once the stream ends, so
+# a broken stream never leaves a partial deck on disk.
+class StreamingDeck:
+    def __init__(self):
+        self.cards = []
+        self.done = False
+        self.error = None
+        self.first_card = threading.Event()
+
+
+# (store root, course_id, content, topic, note hash) -> StreamingDeck
+_streams = {}
+_lock = threading.Lock()
+
+
+def stream_deck(store, client, course_id, content, topic):
+    note = note_markdown(store.read_note(course_id, content, topic) or "")
+    key = (store.root, course_id, content, topic, text_hash(note))
+    with _lock:
+        deck = _streams.get(key)
+        if deck is None or deck.error is not None:
+            deck = StreamingDeck()
+            _streams[key] = deck
+            threading.Thread(
+                target=_consume,
+                args=(deck, key, store, client, course_id, content, topic, note),
+                name="smartstudy-stream",
+                daemon=True,
+            ).start()
+    return deck
+
+
+def _consume(deck, key, store, client, course_id, content, topic, note):
+    try:
+        for card in stream_flashcards(client, note):
+            deck.cards.append(card)
+            deck.first_card.set()
+        store.write_flashcards(course_id, content, topic, "\n".join(deck.cards), key[-1])
+        deck.done = True
+        with _lock:
+            _streams.pop(key, None)
+    except Exception as exc:
+        deck.error = exc  # kept so the page can show it; the next request retries
+    finally:
+        deck.first_card.set()
@@ -1,23 +1,14 @@
 import streamlit as st
 import os
-import json
-import psutil
-
-# --- Find suitable drive for SmartStudy storage ---
-def find_smartstudy_path():
-    for part in psutil.disk_partitions():
-        if part.device.startswith("C:"):
-            continue  # Skip system drive
-        try:
-            base = os.path.join(part.device, "SmartStudy")
-            os.makedirs(base, exist_ok=True)
-            return base
-        except:
-            continue
-    return os.path.abspath("SmartStudy")  # fallback
-
-# --- Set base SmartStudy directory ---
-SMARTSTUDY_DIR = find_smartstudy_path()
+from dotenv import load_dotenv
+from core.providers import get_client, requires_api_key
+from core.accounting import budget_exceeded, course_budget, metered, tokens_used
+from core.storage import get_store
+from core.pipeline import refresh_stale
+from core.pagination import paginate
+
+load_dotenv()
+store = get_store()
 
 # --- Validate session ---
 if "selected_course_id" not in st.session_state or "selected_course_name" not in st.session_state:
@@ -26,19 +17,10 @@ if "selected_course_id" not in st.session_state or "selected_course_name" not in
 
 course_id = st.session_state.selected_course_id
 course_name = st.session_state.selected_course_name
-
-# ✅ All folders will now go under SmartStudy
-course_path = os.path.join(SMARTSTUDY_DIR, "revisions", course_id)
-content_file = os.path.join(course_path, "content_list.json")
-os.makedirs(course_path, exist_ok=True)
-
+st.session_state.pop("review_course", None)  # leaving course review mode
 
 # Load content
-if os.path.exists(content_file):
-    with open(content_file, "r") as f:
-        content_list = json.load(f)
-else:
-    content_list = []
+content_list = store.list_contents(course_id)
 
 st.markdown("""
     <style>
@@ -74,17 +56,44 @@ if st.session_state.show_add_content:
         new_content = st.text_input("Enter new content", key="content_input")
 
         if st.button("Add Content", key="add_content_btn"):
-            if new_content and new_content not in content_list:
-                content_list.append(new_content)
-                with open(content_file, "w") as f:
-                    json.dump(content_list, f, indent=2)
-
+            if new_content and store.add_content(course_id, new_content):
                 # Clear input and hide the popover
                 st.session_state.pop("content_input", None)
                 st.session_state.show_add_content = False
                 st.success(f"Added content: {new_content}")
                 st.rerun()
 
+# --- Generate every stale flashcard deck and quiz in the course, in parallel ---
+if content_list and st.button("⚡ Prepare all flashcards & quizzes", key="prepare_all_btn"):
+    api_key = st.session_state.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
+    if requires_api_key() and not api_key:
+        st.error("🚫 No OpenAI API key found. Please enter your API key on the homepage.")
+    elif budget_exceeded(course_id):
+        st.error(f"🪙 This course has used its token budget for the month ({tokens_used(course_id)} / {course_budget(course_id)} tokens).")
+    else:
+        progress = st.progress(0.0, text="Checking for updated notes...")
+
+        def report(label, error, done, total):
+            content, topic, kind = label
+            status = f"⚠️ {content} / {topic} {kind} failed: {error}" if error else f"✅ {content} / {topic} {kind}"
+            progress.progress(done / total, text=f"{status} ({done}/{total})")
+
+        results = refresh_stale(store, metered(get_client(api_key), course_id), course_id, content_list, on_progress=report)
+        progress.empty()
+        failed = [label for label, result in results.items() if isinstance(result, Exception)]
+        if failed:
+            st.warning(f"{len(failed)} of {len(results)} generation(s) failed: " + ", ".join(f"{c} / {t} {k}" for c, t, k in failed))
+        else:
+            st.success(f"Everything is up to date ({len(results)} item(s) generated).")
+
+# --- Spaced-repetition review of every card in the course ---
+if content_list and st.button("🧠 Review due cards", key="review_due_btn"):
+    st.session_state.review_course = True
+    st.switch_page("pages/revise_flashcards.py")
+
+if course_budget(course_id):
+    st.caption(f"🪙 Tokens used this month: {tokens_used(course_id):,} of {course_budget(course_id):,}")
+
 # Inject custom CSS for box-style
 st.markdown("""
 <style>
@@ -108,10 +117,11 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# 📂 Display in 2 columns with styled boxes
+# 📂 Display in 2 columns with styled boxes (one page at a time)
+visible_contents = paginate(content_list, key="contents", label="contents")
 col1, col2 = st.columns(2)
 
-for idx, item in enumerate(content_list):
+for idx, item in enumerate(visible_contents):
     with (col1 if idx % 2 == 0 else col2):
         st.markdown('<div class="box">', unsafe_allow_html=True)
         st.markdown(f'<div class="module-title">🔹 {item}</div>', unsafe_allow_html=True)
@@ -150,44 +160,8 @@ for idx, item in enumerate(content_list):
             spacer, col_confirm, col_cancel = st.columns([0.12, 0.25, 0.4])
             with col_confirm:
                 if st.button("✅ Yes, Delete", key=f"confirm_delete_{item}"):
-                    content_list = [c for c in content_list if c != item]
-                    with open(content_file, "w") as f:
-                        json.dump(content_list, f, indent=2)
-
-                    # Also remove associated topic/note folders (optional cleanup)
-                    # --- START: Cleanup associated files ---
-                    # 1. Delete topic metadata JSON
-                    topic_file = os.path.join(course_path, "topics", f"{item}.json")
-                    if os.path.exists(topic_file):
-                        os.remove(topic_file)
-
-                    # 2. Delete related note files
-                    notes_folder = os.path.join(course_path, "notes")
-                    if os.path.exists(notes_folder):
-                        for note_file in os.listdir(notes_folder):
-                            if note_file.startswith(f"{item}_"):
-                                os.remove(os.path.join(notes_folder, note_file))
-
-                    # 3. Delete related flashcards (both content-level and topic-level)
-                    flashcards_folder = os.path.join(course_path, "flashcards")
-                    if os.path.exists(flashcards_folder):
-                        for flash_file in os.listdir(flashcards_folder):
-                            if flash_file == f"{item}.md" or flash_file.startswith(f"{item}_"):
-                                os.remove(os.path.join(flashcards_folder, flash_file))
-                  
-                    quiz_folder = os.path.join(course_path, "quiz")
-                    if os.path.exists(quiz_folder):
-                        for quiz_file in os.listdir(quiz_folder):
-                            if quiz_file == f"{item}.json" or quiz_file.startswith(f"{item}_"):
-                                os.remove(os.path.join(quiz_folder, quiz_file))
-                    # --- END: Cleanup associated files ---
-
-                    # if os.path.exists(content_topic):
-                    #     os.remove(content_topic)
-                    # # If you have per-topic notes under notes folder
-                    # for note_file in os.listdir(content_note):
-                    #     if note_file.startswith(f"{item}_"):
-                    #         os.remove(os.path.join(content_note, note_file))
+                    # Removes the topic list, notes, flashcards and quizzes too
+                    store.delete_content(course_id, item)
 
                     del st.session_state.confirm_delete_content
                     st.success(f"Deleted '{item}'")
@@ -1,36 +1,28 @@
 import streamlit as st
 import os
 import random
-import json
-import hashlib
 from dotenv import load_dotenv
-from openai import OpenAI
-import psutil
-
-# --- Helper: Locate SmartStudy directory ---
-def find_smartstudy_path():
-    for part in psutil.disk_partitions():
-        if part.device.startswith("C:"):
-            continue
-        try:
-            base = os.path.join(part.device, "SmartStudy")
-            os.makedirs(base, exist_ok=True)
-            return base
-        except:
-            continue
-    return os.path.abspath("SmartStudy")
+from core.providers import get_client, requires_api_key
+from core.storage import get_store
+from core.pipeline import refresh_quiz, stale_quiz_topics
+from core.scheduler import run_jobs
+from core.background import enqueue, failed_topics, failure_notice, queued_topics
+from core.accounting import budget_exceeded, metered
+from core.metrics import metrics
+from core.identity import question_id, question_text
+from core.embeddings import dedupe
+from core.quiz_history import get_quiz_history
+from core.session_deck import Deck, Question, current_deck
 
 # --- Setup ---
 load_dotenv()
-SMARTSTUDY_DIR = find_smartstudy_path()
+store = get_store()
 api_key = st.session_state.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
 
-if not api_key:
+if requires_api_key() and not api_key:
     st.error("🚫 No OpenAI API key found. Please enter your API key above.")
     st.stop()
 
-client = OpenAI(api_key=api_key)
-
 # --- Session Validation ---
 if "selected_course_id" not in st.session_state or "selected_content_for_quiz" not in st.session_state:
     st.error("Missing course or content. Please go back and try again.")
@@ -39,75 +31,8 @@ if "selected_course_id" not in st.session_state or "selected_content_for_quiz" n
 # --- Paths ---
 course_id = st.session_state.selected_course_id
 content_name = st.session_state.selected_content_for_quiz
-course_path = os.path.join(SMARTSTUDY_DIR, "revisions", course_id)
-flashcards_folder = os.path.join(course_path, "flashcards")
-quiz_folder = os.path.join(course_path, "quiz")
-os.makedirs(quiz_folder, exist_ok=True)
-
-# --- Resolve Flashcard Path ---
-flashcard_file = os.path.join(flashcards_folder, f"{content_name}.md")
-if not os.path.exists(flashcard_file):
-    # Try matching a topic-level flashcard starting with content_name_
-    topic_candidates = [
-        os.path.join(flashcards_folder, f)
-        for f in os.listdir(flashcards_folder)
-        if f.startswith(f"{content_name}_") and f.endswith(".md")
-    ]
-    if topic_candidates:
-        # Combine them into content-level flashcard
-        topic_flashcards = []
-        for file in sorted(topic_candidates):
-            with open(file, "r", encoding="utf-8") as f:
-                topic_flashcards.append(f.read().strip())
-
-        combined = "\n\n".join(topic_flashcards)
-        with open(flashcard_file, "w", encoding="utf-8") as f:
-            f.write(combined)
-    else:
-        st.error("❌ Flashcards not found for this content.")
-        st.stop()
-
-# --- Read flashcards ---
-with open(flashcard_file, "r", encoding="utf-8") as f:
-    flashcard_data = f.read()
-
-# --- Hash for change detection ---
-content_hash = hashlib.md5(flashcard_data.encode("utf-8")).hexdigest()
-quiz_file = os.path.join(quiz_folder, f"{content_name}.json")
-quiz_hash_file = os.path.join(quiz_folder, f"{content_name}_hash.txt")
-
-# --- Generate Quiz from Flashcards ---
-def generate_quiz_from_flashcards(flashcards):
-    prompt = f"""
-You are a helpful assistant. Use ONLY the notes below to create quiz questions.
-
-Instructions:
-- Generate AS MANY **multiple-choice questions** (MCQs) as needed to fully cover all the key concepts and bullet points from the notes.
-- Each question must have 4 options.
-- Highlight the correct option clearly in the JSON response.
-- Do NOT add any content that is not present in the notes.
-- Do NOT skip any point from the flashcards.
-- Avoid repeating the same concept across questions.
-
-Notes:
-\"\"\"{flashcards}\"\"\"
-
-Format:
-[
-  {{
-    "question": "What is ...?",
-    "options": ["A", "B", "C", "D"],
-    "answer": "B"
-  }},
-  ...
-]
-"""
-    res = client.chat.completions.create(
-        model="gpt-4.1-nano",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3
-    )
-    return json.loads(res.choices[0].message.content)
+st.session_state.pop("review_course", None)  # leaving course review mode
+client = metered(get_client(api_key), course_id)  # shared per process, keeps its connection pool
 
 st.markdown("""
     <style>
@@ -121,25 +46,105 @@ st.markdown("""
 if st.button("← Back", key="back_button"):
     st.switch_page("pages/course_page.py")  # Adjust to the actual page you're returning to
 
-# --- Load or Refresh Quiz ---
-if (
-    not os.path.exists(quiz_file)
-    or not os.path.exists(quiz_hash_file)
-    or open(quiz_hash_file).read().strip() != content_hash
-):
-    with st.spinner("Generating quiz from updated flashcards..."):
-        quiz_data = generate_quiz_from_flashcards(flashcard_data)
-        with open(quiz_file, "w", encoding="utf-8") as f:
-            json.dump(quiz_data, f, indent=2)
-        with open(quiz_hash_file, "w") as f:
-            f.write(content_hash)
-else:
-    with open(quiz_file, "r", encoding="utf-8") as f:
-        quiz_data = json.load(f)
+
+# --- Build the content quiz (first visit, or after the course changed) ---
+def build_quiz_deck():
+    notices = []
+    with metrics.timer("smartstudy_io_seconds", op="flashcard_hashes"):
+        deck_hashes = store.topic_flashcard_hashes(course_id, content_name)
+    if not deck_hashes:
+        st.error("❌ Flashcards not found for this content.")
+        st.stop()
+
+    # Quizzes are stored per topic with the hash of the deck they came from,
+    # so only topics whose flashcards changed are regenerated. A topic that
+    # already has an older quiz keeps it while the background queue
+    # refreshes it; topics with no quiz at all are generated now, in parallel.
+    # A background job that gave up is retried, and its error shown.
+    stale_topics = []
+    queued = queued_topics(course_id, content_name)
+    failed = failed_topics(course_id, content_name)
+    retried = {}
+    for topic in stale_quiz_topics(store, course_id, content_name):
+        if store.quiz_source_hash(course_id, content_name, topic) is None:
+            stale_topics.append(topic)
+        else:
+            if topic not in queued:
+                enqueue(course_id, content_name, topic, deck_hashes[topic])
+                if topic in failed:
+                    retried[topic] = failed[topic]
+            queued[topic] = "pending"
+    if retried:
+        notices.append(failure_notice(retried))
+    if stale_topics and budget_exceeded(course_id):
+        # Out of tokens for the month: the worker generates these once it resets
+        for topic in stale_topics:
+            enqueue(course_id, content_name, topic, deck_hashes[topic])
+            queued[topic] = "pending"
+        notices.append(("warning", f"🪙 This course has used its token budget for the month. {len(stale_topics)} topic quiz(zes) are queued until it resets."))
+        stale_topics = []
+    if queued:
+        notices.append(("caption", f"⏳ {len(queued)} topic(s) are being refreshed in the background; their previous questions are included."))
+    if stale_topics:
+        progress = st.progress(0.0, text=f"Generating quiz for {len(stale_topics)} updated topic(s)...")
+
+        def report(topic, error, done, total):
+            status = f"⚠️ {topic} failed: {error}" if error else f"✅ {topic}"
+            progress.progress(done / total, text=f"{status} ({done}/{total})")
+
+        results = run_jobs(
+            [(topic, lambda topic=topic: refresh_quiz(store, client, course_id, content_name, topic)) for topic in stale_topics],
+            on_progress=report,
+        )
+        progress.empty()
+        failed = [topic for topic, result in results.items() if isinstance(result, Exception)]
+        if failed:
+            notices.append(("warning", f"Could not generate questions for: {', '.join(failed)}"))
+
+    # --- Assemble the content quiz from the per-topic pieces ---
+    quiz_data = []
+    with metrics.timer("smartstudy_io_seconds", op="read_quizzes"):
+        for topic in deck_hashes:
+            quiz_data.extend(store.read_quiz(course_id, content_name, topic) or [])
+    if not quiz_data:
+        st.error("❌ No quiz questions could be generated for this content.")
+        st.stop()
+
+    # Score history is keyed by content-derived question IDs, so it survives
+    # regeneration and reshuffling; near-identical new questions inherit it
+    questions_by_id = {question_id(q): q for q in quiz_data}
+    get_quiz_history(course_id).sync(questions_by_id)
+
+    # --- Skip near-duplicate questions generated for different topics ---
+    kept, merged = dedupe(course_id, {qid: question_text(q) for qid, q in questions_by_id.items()})
+    if merged:
+        notices.append(("caption", f"🧹 Skipped {len(merged)} near-duplicate question(s) repeated across topics."))
+    questions = [
+        Question(qid, questions_by_id[qid]["question"], questions_by_id[qid]["options"], questions_by_id[qid]["answer"])
+        for qid in kept
+    ]
+    # Stamp taken after generation, which writes to the course
+    return Deck((course_id, content_name), store.stamp(course_id), questions, notices)
+
+
+# Built once per session; later reruns (Submit, Next, radio clicks) only
+# compare the course stamp and index into the deck: no reads, no hashing.
+deck = current_deck(st.session_state, "quiz_deck", (course_id, content_name), store.stamp(course_id))
+if deck is None:
+    previous = st.session_state.get("quiz_deck")
+    deck = build_quiz_deck()
+    st.session_state.quiz_deck = deck
+    if previous is None or [q.id for q in previous.items] != [q.id for q in deck.items]:
+        # Different questions: the running quiz no longer lines up with them
+        for key in ["quiz_order", "current_question_index", "score", "selected_option", "show_answer"]:
+            st.session_state.pop(key, None)
+for level, message in deck.notices:
+    getattr(st, level)(message)
+history = get_quiz_history(course_id)
 
 # --- Session Setup ---
-if "quiz_questions" not in st.session_state:
-    st.session_state.quiz_questions = random.sample(quiz_data, len(quiz_data))
+if "quiz_order" not in st.session_state:
+    st.session_state.quiz_order = random.sample(range(len(deck.items)), len(deck.items))
     st.session_state.current_question_index = 0
     st.session_state.score = 0
     st.session_state.show_answer = False
@@ -147,13 +152,17 @@ if "quiz_questions" not in st.session_state:
 
 # --- Display Quiz ---
 current_index = st.session_state.current_question_index
-current_question = st.session_state.quiz_questions[current_index]
+current_question = deck.items[st.session_state.quiz_order[current_index]]
+current_id = current_question.id
 
-st.markdown(f"### ❓ Question {current_index + 1} of {len(quiz_data)}")
-st.write(current_question["question"])
+st.markdown(f"### ❓ Question {current_index + 1} of {len(deck.items)}")
+st.write(current_question.text)
+attempts, correct = history.get(current_id)
+if attempts:
+    st.caption(f"📈 Answered correctly {correct} of {attempts} time(s) before")
 
 # --- Answer Options ---
-options = current_question["options"]
+options = current_question.options
 selected_index = (
     options.index(st.session_state.selected_option)
     if st.session_state.get("selected_option") in options
@@ -170,9 +179,11 @@ selected_option = st.radio(
 col1, col2 = st.columns(2)
 with col1:
     if st.button("✅ Submit"):
+        if not st.session_state.show_answer:
+            history.record(current_id, selected_option == current_question.answer)
         st.session_state.selected_option = selected_option
         st.session_state.show_answer = True
-        if selected_option == current_question["answer"]:
+        if selected_option == current_question.answer:
             st.session_state.score += 1
 with col2:
     if st.button("❌ Show Answer"):
@@ -182,7 +193,7 @@ with col2:
 if st.session_state.show_answer:
     st.markdown("### 🧾 Answer Review:")
     for opt in options:
-        if opt == current_question["answer"]:
+        if opt == current_question.answer:
             st.markdown(f"- ✅ **{opt}**", unsafe_allow_html=True)
         elif opt == st.session_state.selected_option:
             st.markdown(f"- ❌ <span style='color:red;'>{opt}</span>", unsafe_allow_html=True)
@@ -190,18 +201,18 @@ if st.session_state.show_answer:
             st.markdown(f"- {opt}", unsafe_allow_html=True)
 
 # --- Navigation ---
-if current_index + 1 < len(st.session_state.quiz_questions):
+if current_index + 1 < len(st.session_state.quiz_order):
     if st.button("➡️ Next Question"):
         st.session_state.current_question_index += 1
         st.session_state.selected_option = None
         st.session_state.show_answer = False
         st.rerun()
 else:
-    st.success(f"🎉 Quiz Complete! Your Score: {st.session_state.score} / {len(quiz_data)}")
+    st.success(f"🎉 Quiz Complete! Your Score: {st.session_state.score} / {len(deck.items)}")
     col1, col2 = st.columns(2)
     with col1:
         if st.button("🔁 Restart Quiz"):
-            for key in ["quiz_questions", "current_question_index", "score", "selected_option", "show_answer"]:
+            for key in ["quiz_order", "current_question_index", "score", "selected_option", "show_answer"]:
                 st.session_state.pop(key, None)
             st.rerun()
     with col2:
@@ -1,35 +1,72 @@
 import streamlit as st
 import os
-import re
+import time
 from dotenv import load_dotenv
-from openai import OpenAI
-import psutil
+from core.providers import get_client, requires_api_key
+from core.storage import get_store
+from core.decks import content_deck
+from core.llm import split_cards
+from core.streaming import stream_deck
+from core.pipeline import flashcards_stale
+from core.llm_cache import get_llm_cache
+from core.background import enqueue, failed_topics, failure_notice, queued_topics
+from core.accounting import budget_exceeded, metered
+from core.metrics import metrics
+from core.srs import GRADES, course_cards, get_schedule
+from core.identity import card_id
+from core.embeddings import dedupe
+from core.session_deck import Deck, current_deck
 
 load_dotenv()
 
-# --- Locate SmartStudy directory ---
-def find_smartstudy_path():
-    for part in psutil.disk_partitions():
-        if part.device.startswith("C:"):
-            continue
-        try:
-            base = os.path.join(part.device, "SmartStudy")
-            os.makedirs(base, exist_ok=True)
-            return base
-        except:
-            continue
-    return os.path.abspath("SmartStudy")
-
-SMARTSTUDY_DIR = find_smartstudy_path()
+store = get_store()
+
+# --- Course review: due cards from every content, in spaced-repetition order ---
+if st.session_state.get("review_course") and "selected_course_id" in st.session_state:
+    course_id = st.session_state.selected_course_id
+    with metrics.timer("smartstudy_io_seconds", op="course_cards"):
+        cards = course_cards(store, course_id)
+    schedule = get_schedule(course_id)
+    schedule.sync(cards)
+    now = time.time()
+    counts = schedule.counts(now)
+
+    st.markdown("<h2 style='text-align: left;'>🧠 Review - due cards</h2>", unsafe_allow_html=True)
+    st.caption(f"{counts['due']} due · {counts['new']} new · {counts['total']} cards in this course")
+
+    current = schedule.next_card(now)
+    if current is None:
+        next_due = schedule.next_due_time()
+        when = f" Next card is due {time.strftime('%d %b %H:%M', time.localtime(next_due))}." if next_due else ""
+        st.success(f"🎉 Nothing to review right now.{when}")
+    else:
+        title, _, answer = cards[current].partition("\n")
+        st.markdown(title, unsafe_allow_html=True)
+        if st.session_state.get("review_revealed") == current:
+            st.markdown(answer, unsafe_allow_html=True)
+            for column, (label, grade) in zip(st.columns(len(GRADES)), GRADES):
+                with column:
+                    if st.button(label, key=f"grade_{grade}"):
+                        schedule.review(current, grade, time.time())
+                        st.session_state.pop("review_revealed", None)
+                        st.rerun()
+        elif st.button("👀 Show answer"):
+            st.session_state.review_revealed = current
+            st.rerun()
+
+    st.markdown("---")
+    if st.button("🏠 Back to Course"):
+        st.session_state.pop("review_course", None)
+        st.session_state.pop("review_revealed", None)
+        st.switch_page("pages/course_page.py")
+    st.stop()
 
 # --- API Key ---
 api_key = st.session_state.get("OPENAI_API_KEY", os.getenv("OPENAI_API_KEY"))
-if not api_key:
+if requires_api_key() and not api_key:
     st.error("🚫 No OpenAI API key found. Please enter your API key on the homepage.")
     st.stop()
 
-client = OpenAI(api_key=api_key)
-
 # --- Session validation ---
 if "selected_course_id" not in st.session_state or (
     "selected_content_for_revision" not in st.session_state and
@@ -39,10 +76,7 @@ if "selected_course_id" not in st.session_state or (
     st.stop()
 
 course_id = st.session_state.selected_course_id
-course_path = os.path.join(SMARTSTUDY_DIR, "revisions", course_id)
-notes_folder = os.path.join(course_path, "notes")
-flashcards_folder = os.path.join(course_path, "flashcards")
-os.makedirs(flashcards_folder, exist_ok=True)
+client = metered(get_client(api_key), course_id)  # shared per process, keeps its connection pool
 
 # --- Identify revision mode ---
 is_topic_revision = "selected_topic_for_revision" in st.session_state
@@ -51,98 +85,122 @@ if is_topic_revision:
     content_name = st.session_state.selected_content
     topic_name = st.session_state.selected_topic_for_revision
     title = f"{content_name} - {topic_name}"
-
-    note_file = os.path.join(notes_folder, f"{content_name}_{topic_name}.md")
-    flashcards_file_path = os.path.join(flashcards_folder, f"{content_name}_{topic_name}.md")
-
-    if not os.path.exists(note_file):
-        st.warning("Note not found for this topic.")
-        st.stop()
-    with open(note_file, "r", encoding="utf-8") as f:
-        all_notes = f.read()
-
 else:
     content_name = st.session_state.selected_content_for_revision
     topic_name = None
     title = content_name
-    flashcards_file_path = os.path.join(flashcards_folder, f"{content_name}.md")
-
-    # Combine all topic-level flashcards
-    topic_flashcards = []
-    if os.path.exists(flashcards_folder):
-        topic_files = sorted([
-            f for f in os.listdir(flashcards_folder)
-            if f.startswith(f"{content_name}_") and f.endswith(".md")
-        ])
-        for file in topic_files:
-            file_path = os.path.join(flashcards_folder, file)
-            with open(file_path, "r", encoding="utf-8") as f:
-                topic_flashcards.append(f.read().strip())
-
-        combined_flashcards = "\n\n".join(topic_flashcards)
-        with open(flashcards_file_path, "w", encoding="utf-8") as f:
-            f.write(combined_flashcards)
-
-        all_notes = combined_flashcards
-    else:
-        st.warning("No topic flashcards found.")
-        st.stop()
-
-if not all_notes.strip():
-    st.warning("No notes available for flashcard generation.")
-    st.stop()
 
 # --- Flashcard Display Title ---
 st.markdown(f"<h2 style='text-align: left;'>🧠 Revision - {title}</h2>", unsafe_allow_html=True)
 
-# --- Flashcard Generation Function ---
-def generate_flashcards_openai(notes):
-    prompt = f"""
-You are a strict study assistant. Use ONLY the provided notes below to create flashcards. 
-Do NOT include any extra information or examples not found in the notes.
-
-Instructions:
-- Create multiple flashcards if the content contains multiple concepts.
-- Each flashcard should focus on only one concept or topic.
-- Use a title for each flashcard (start with ###).
-- Include only 3 to 5 short bullet points (-) per flashcard.
-- Do not combine multiple topics into one flashcard.
-- Be concise and clear — each flashcard should feel clean and easy to revise.
-- Flashcards must include all the topics mentioned in the notes.
-- Do not skip any of the points from the notes.
-- If the notes include examples, include them concisely.
-- If an important concept lacks clarity in the notes, you may add a **very simple example**, but only if it helps understanding and does not introduce unrelated content.
-
-Notes:
-\"\"\"{notes}\"\"\"
-
-Now generate the flashcards in Markdown format.
-"""
-    response = client.chat.completions.create(
-        model="gpt-4.1-nano",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3
-    )
-    return response.choices[0].message.content.strip()
-
-# --- Generate or Load Flashcards ---
-if os.path.exists(flashcards_file_path):
-    with open(flashcards_file_path, "r", encoding="utf-8") as f:
-        flashcards_text = f.read().strip()
+
+# --- Load or generate the deck (first visit, or after the course changed) ---
+# Returns (deck, None), or (None, streaming) while a missing deck is being
+# written; a half-written deck is not kept in the session.
+def build_card_deck():
+    notices = []
+    if is_topic_revision:
+        with metrics.timer("smartstudy_io_seconds", op="read_note"):
+            all_notes = store.read_note(course_id, content_name, topic_name)
+        if all_notes is None:
+            st.warning("Note not found for this topic.")
+            st.stop()
+    else:
+        # Combined topic-level flashcards (rebuilt only when a topic deck changes)
+        with metrics.timer("smartstudy_io_seconds", op="content_deck"):
+            all_notes = content_deck(store, course_id, content_name)
+        if all_notes is None:
+            st.warning("No topic flashcards found.")
+            st.stop()
+        # Topics whose background refresh gave up are retried, with the error shown
+        failed = {}
+        for topic, error in failed_topics(course_id, content_name).items():
+            note_hash = store.note_hash(course_id, content_name, topic)
+            if note_hash is not None:  # not deleted since
+                enqueue(course_id, content_name, topic, note_hash)
+                failed[topic] = error
+        if failed:
+            notices.append(failure_notice(failed))
+        refreshing = queued_topics(course_id, content_name)
+        if refreshing:
+            notices.append(("caption", f"⏳ {len(refreshing)} topic(s) are being refreshed in the background; showing the current flashcards."))
+
+    if not all_notes.strip():
+        st.warning("No notes available for flashcard generation.")
+        st.stop()
+
+    if not is_topic_revision:
+        flashcards_text = all_notes.strip()  # the content deck is already flashcards
+    else:
+        # A deck built from an older version of the note is shown right away
+        # while the background queue regenerates it. A missing deck is streamed:
+        # cards appear as the model finishes them. Identical notes are answered
+        # from the LLM cache without an API call.
+        note_hash = store.note_hash(course_id, content_name, topic_name)
+        with metrics.timer("smartstudy_io_seconds", op="read_flashcards"):
+            flashcards_text = store.read_flashcards(course_id, content_name, topic_name)
+        if flashcards_text is None and budget_exceeded(course_id):
+            enqueue(course_id, content_name, topic_name, note_hash)
+            st.warning("🪙 This course has used its token budget for the month. The flashcards are queued and will be generated when the budget resets.")
+            st.stop()
+        if flashcards_text is None:
+            streaming = stream_deck(store, client, course_id, content_name, topic_name)
+            with st.spinner("Generating flashcards..."):
+                streaming.first_card.wait()
+            if streaming.error is not None:
+                st.error(f"Could not generate flashcards: {streaming.error}")
+                st.stop()
+            return None, streaming
+        if flashcards_stale(store, course_id, content_name, topic_name):
+            if topic_name not in queued_topics(course_id, content_name):
+                failed = failed_topics(course_id, content_name)
+                if topic_name in failed:
+                    notices.append(failure_notice({topic_name: failed[topic_name]}))
+                enqueue(course_id, content_name, topic_name, note_hash)
+            notices.append(("caption", "⏳ Notes changed: showing the previous flashcards while they refresh in the background."))
+
+    # --- Split into individual flashcards ---
+    cards = split_cards(flashcards_text.strip())
+
+    # --- Merge near-duplicate cards that several topics produced ---
+    if not is_topic_revision:
+        cards_by_id = {card_id(card): card for card in cards if card.strip()}
+        kept, merged = dedupe(course_id, cards_by_id)
+        cards = [cards_by_id[cid] for cid in kept]
+        if merged:
+            notices.append(("caption", f"🧹 Merged {len(merged)} near-duplicate flashcard(s) repeated across topics."))
+    return Deck((course_id, content_name, topic_name), store.stamp(course_id), cards, notices), None
+
+
+# Built once per session; Previous/Next reruns only compare the course
+# stamp and index into the deck. A deck still being streamed is kept in the
+# session too, so polling reruns follow the same stream (and see it fail)
+# instead of starting another one.
+streaming = None
+deck_key = (course_id, content_name, topic_name)
+deck = current_deck(st.session_state, "card_deck", deck_key, store.stamp(course_id))
+stream = st.session_state.get("card_stream")
+if deck is None and stream is not None and stream[0] == deck_key and not stream[1].done:
+    streaming = stream[1]
+elif deck is None:
+    deck, streaming = build_card_deck()
+    if deck is not None:
+        st.session_state.card_deck = deck
+        st.session_state.pop("card_stream", None)
+    else:
+        st.session_state.card_stream = (deck_key, streaming)
+if streaming is not None:
+    cards = list(streaming.cards)
 else:
-    with st.spinner("Generating flashcards..."):
-        flashcards_text = generate_flashcards_openai(all_notes)
-        with open(flashcards_file_path, "w", encoding="utf-8") as f:
-            f.write(flashcards_text)
-
-# --- Split into individual flashcards ---
-cards = re.split(r'\n(?=### )', flashcards_text)
-if not cards or cards == [""]:
+    for level, message in deck.notices:
+        getattr(st, level)(message)
+    cards = deck.items
+if not cards or tuple(cards) == ("",):
     st.warning("No flashcards found.")
     st.stop()
+index = min(st.session_state.get("flashcard_index", 0), len(cards) - 1)
 
 # --- Display Flashcard ---
-index = st.session_state.get("flashcard_index", 0)
 st.markdown(f"### 🧾 Flashcard {index + 1} of {len(cards)}")
 st.markdown(cards[index], unsafe_allow_html=True)
 
@@ -157,14 +215,31 @@ with col_next:
         st.session_state.flashcard_index = index + 1
         st.rerun()
 
+# --- Keep polling while the model is still writing cards ---
+if streaming is not None and streaming.error is not None:
+    # Broke off after the first cards: nothing was saved
+    st.error(f"Could not finish generating flashcards: {streaming.error}. Showing the {len(cards)} card(s) received so far.")
+    if st.button("🔁 Try again"):
+        st.session_state.pop("card_stream", None)
+        st.rerun()
+elif streaming is not None and not streaming.done:
+    st.caption(f"✍️ Still writing flashcards... {len(cards)} ready so far.")
+
 st.markdown("---")
+cache_stats = get_llm_cache().stats()
+st.caption(f"⚡ Flashcard cache: {cache_stats['hits']} hits / {cache_stats['misses']} misses")
 
 # --- Back Button ---
 if st.button("🏠 Back to Content"):
     st.session_state.pop("flashcard_index", None)
+    st.session_state.pop("card_stream", None)
     if is_topic_revision:
         st.session_state.pop("selected_topic_for_revision", None)
         st.switch_page("pages/topic_page.py")
     else:
         st.session_state.pop("selected_content_for_revision", None)
         st.switch_page("pages/course_page.py")
+
+if streaming is not None and not streaming.done and streaming.error is None:
+    time.sleep(0.5)
+    st.rerun()
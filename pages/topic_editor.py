@@ -1,22 +1,10 @@
 import streamlit as st
-import os
+import time
 from streamlit_quill import st_quill
-import psutil
-
-# --- SmartStudy Path Setup ---
-def find_smartstudy_path():
-    for part in psutil.disk_partitions():
-        if part.device.startswith("C:"):
-            continue
-        try:
-            base = os.path.join(part.device, "SmartStudy")
-            os.makedirs(base, exist_ok=True)
-            return base
-        except:
-            continue
-    return os.path.abspath("SmartStudy")  # fallback to local
-
-SMARTSTUDY_DIR = find_smartstudy_path()
+from core.storage import get_store
+from core.autosave import get_autosaver
+
+store = get_store()
 
 # --- Validate Session ---
 if "selected_course_id" not in st.session_state or \
@@ -29,17 +17,10 @@ if "selected_course_id" not in st.session_state or \
 course_id = st.session_state.selected_course_id
 content_name = st.session_state.selected_content
 topic_name = st.session_state.selected_topic
-
-# --- Note Path ---
-note_dir = os.path.join(SMARTSTUDY_DIR, "revisions", course_id, "notes")
-os.makedirs(note_dir, exist_ok=True)
-note_file = os.path.join(note_dir, f"{content_name}_{topic_name}.md")
+st.session_state.pop("review_course", None)  # leaving course review mode
 
 # --- Load Existing Note ---
-existing_note = ""
-if os.path.exists(note_file):
-    with open(note_file, "r", encoding="utf-8") as f:
-        existing_note = f.read()
+existing_note = store.read_note(course_id, content_name, topic_name) or ""
 
 # --- UI ---
 st.markdown("""
@@ -52,12 +33,64 @@ st.markdown("""
 
 st.markdown(f"<h2>📝 Editing: {topic_name}</h2>", unsafe_allow_html=True)
 
-note = st_quill(value=existing_note, html=True, key="editor")
+saver = get_autosaver(st.session_state, store, course_id, content_name, topic_name)
+
+
+def reload_editor():
+    # Remounts the editor with the note as it now is
+    st.session_state.editor_generation = st.session_state.get("editor_generation", 0) + 1
+    st.rerun()
+
+
+# --- Unsaved edits left by a crash or restart ---
+recovered = saver.recover()
+if recovered is not None:
+    recovered_text, recovered_at = recovered
+    st.warning(f"📝 Found unsaved edits from {time.strftime('%d %b %Y %H:%M:%S', time.localtime(recovered_at))}.")
+    col_restore, col_discard = st.columns(2)
+    with col_restore:
+        if st.button("↩️ Restore unsaved edits"):
+            saver.save(recovered_text)
+            reload_editor()
+    with col_discard:
+        if st.button("🗑️ Discard them"):
+            saver.discard()
+            st.rerun()
+
+autosave = st.toggle("Autosave", value=True, key="autosave")
+note = st_quill(value=existing_note, html=True, key=f"editor_{st.session_state.get('editor_generation', 0)}")
+
+# Changes are journaled right away and written once the editor goes quiet
+if autosave and recovered is None and note is not None:
+    saver.change(note)
 
 if st.button("💾 Save Note"):
-    with open(note_file, "w", encoding="utf-8") as f:
-        f.write(note)
+    saver.save(note)
     st.success("✅ Note saved successfully!")
 
+if saver.saved_at is not None or saver.pending is not None:
+    status = "✏️ Unsaved changes" if saver.pending is not None else f"💾 Saved at {time.strftime('%H:%M:%S', time.localtime(saver.saved_at))}"
+    stats = saver.stats
+    st.caption(
+        f"{status} · {stats['edits']} edit(s) → {stats['writes']} write(s), {stats['skipped']} skipped"
+        f" · {saver.amplification():.1f} bytes written per character edited"
+    )
+
+# --- Revision history ---
+with st.expander("🕘 Revision history"):
+    revisions = store.note_revisions(course_id, content_name, topic_name)
+    if not revisions:
+        st.caption("No saved revisions yet.")
+    else:
+        labels = {rev: f"#{rev} · {time.strftime('%d %b %Y %H:%M', time.localtime(saved_at))}" for rev, saved_at, _ in reversed(revisions)}
+        revision = st.selectbox("Revision", list(labels), format_func=labels.get)
+        old_note = store.read_note_revision(course_id, content_name, topic_name, revision)
+        st.markdown(old_note, unsafe_allow_html=True)
+        if revision != revisions[-1][0] and st.button("↩️ Restore this revision"):
+            saver.save(old_note)
+            reload_editor()
+
 if st.button("🔙 Go Back"):
+    saver.flush()
+    st.session_state.pop("autosaver", None)
     st.switch_page("pages/topic_page.py")
@@ -1,23 +1,8 @@
 import streamlit as st
-import os
-import json
-from streamlit_quill import st_quill
-import psutil
-
-# --- Locate preferred drive for SmartStudy storage ---
-def find_smartstudy_path():
-    for part in psutil.disk_partitions():
-        if part.device.startswith("C:"):
-            continue
-        try:
-            base = os.path.join(part.device, "SmartStudy")
-            os.makedirs(base, exist_ok=True)
-            return base
-        except:
-            continue
-    return os.path.abspath("SmartStudy")  # fallback
-
-SMARTSTUDY_DIR = find_smartstudy_path()
+from core.storage import get_store
+from core.pagination import paginate
+
+store = get_store()
 
 # Validate session
 if "selected_course_id" not in st.session_state or "selected_content" not in st.session_state:
@@ -27,24 +12,10 @@ if "selected_course_id" not in st.session_state or "selected_content" not in st.
 course_id = st.session_state.selected_course_id
 course_name = st.session_state.selected_course_name
 content_name = st.session_state.selected_content
-
-# ✅ Use SmartStudy base path
-course_path = os.path.join(SMARTSTUDY_DIR, "revisions", course_id)
-topic_dir = os.path.join(course_path, "topics")
-note_dir = os.path.join(course_path, "notes")
-
-os.makedirs(topic_dir, exist_ok=True)
-os.makedirs(note_dir, exist_ok=True)
-
-topic_file = os.path.join(topic_dir, f"{content_name}.json")
-
+st.session_state.pop("review_course", None)  # leaving course review mode
 
 # Load topics
-if os.path.exists(topic_file):
-    with open(topic_file, "r") as f:
-        topics = json.load(f)
-else:
-    topics = []
+topics = store.list_topics(course_id, content_name)
 
 st.markdown("""
     <style>
@@ -104,11 +75,7 @@ if st.session_state.show_add_topic:
         new_topic = st.text_input("Enter topic name:", key="topic_input")
 
         if st.button("Add Topic", key="add_topic_btn"):
-            if new_topic and new_topic not in topics:
-                topics.append(new_topic)
-                with open(topic_file, "w") as f:
-                    json.dump(topics, f, indent=2)
-
+            if new_topic and store.add_topic(course_id, content_name, new_topic):
                 # Clear input and hide the popover
                 st.session_state.pop("topic_input", None)
                 st.session_state.show_add_topic = False
@@ -119,7 +86,7 @@ if st.session_state.show_add_topic:
 if not topics:
     st.info("No topics added yet.")
 else:
-    for topic in topics:
+    for topic in paginate(topics, key=f"topics_{content_name}", label="topics"):
         st.markdown('<div class="box">', unsafe_allow_html=True)
         col1, col2, col3, col4 = st.columns([0.6, 0.13, 0.13, 0.14])
 
@@ -156,13 +123,7 @@ else:
                 col_extra, col_confirm, col_cancel = st.columns([0.1,0.3, 0.9])
                 with col_confirm:
                     if st.button("✅ Yes, Delete", key=f"confirm_delete_{topic}"):
-                        topics = [t for t in topics if t != topic]
-                        with open(topic_file, "w") as f:
-                            json.dump(topics, f, indent=2)
-
-                        note_path = os.path.join(note_dir, f"{content_name}_{topic}.md")
-                        if os.path.exists(note_path):
-                            os.remove(note_path)
+                        store.delete_topic(course_id, content_name, topic)
 
                         del st.session_state.topic_to_delete
                         st.success(f"Deleted topic: {topic}")
@@ -1,44 +1,24 @@
 import streamlit as st
 import os
-import json
 import uuid
 import datetime
-import psutil
-
-# --- STEP 1: Find a suitable drive and create base SmartStudy folder ---
-def find_smartstudy_path():
-    for part in psutil.disk_partitions():
-        if part.device.startswith("C:"):
-            continue  # Skip system drive
-        try:
-            base = os.path.join(part.device, "SmartStudy")
-            os.makedirs(base, exist_ok=True)
-            return base
-        except:
-            continue
-    # Fallback to current directory if no external drive found
-    return os.path.abspath("SmartStudy")
+from core.paths import find_smartstudy_path
+from core.storage import get_store
+from core.background import ensure_worker
+from core.search import get_search_index
+from core.pagination import paginate
+from core.archive import ArchiveError, export_courses, import_archive, prune_exports
 
 # --- Setup SmartStudy Path ---
 SMARTSTUDY_DIR = find_smartstudy_path()
-COURSE_FILE = os.path.join(SMARTSTUDY_DIR, "courses.json")
-REVISION_FOLDER = os.path.join(SMARTSTUDY_DIR, "revisions")
 API_KEY_FILE = os.path.join(SMARTSTUDY_DIR, "api_key.txt")
-
-os.makedirs(REVISION_FOLDER, exist_ok=True)
+store = get_store()
+ensure_worker()  # resume pre-generation jobs queued before a restart
+search_ready = get_search_index().start_build(store)  # first run: index existing notes in the background
 
 # --- Load courses ---
-def load_courses():
-    if os.path.exists(COURSE_FILE):
-        with open(COURSE_FILE, "r") as f:
-            return json.load(f)
-    return []
-
-def save_courses(courses):
-    with open(COURSE_FILE, "w") as f:
-        json.dump(courses, f, indent=2)
-
-courses = load_courses()
+courses = store.list_courses()
+st.session_state.pop("review_course", None)  # leaving course review mode
 
 # --- Streamlit Page Config ---
 st.set_page_config("Smart Revision Tracker", layout="wide")
@@ -119,6 +99,40 @@ if "OPENAI_API_KEY" not in st.session_state and os.path.exists(API_KEY_FILE):
     with open(API_KEY_FILE, "r") as f:
         st.session_state["OPENAI_API_KEY"] = f.read().strip()
 
+# --- Search across every course ---
+KIND_ICONS = {"note": "📝", "flashcards": "🧠", "quiz": "❓"}
+query = st.text_input("🔎 Search notes, flashcards and quizzes", key="search_query", placeholder="e.g. photosynth")
+if query.strip():
+    search_index = get_search_index()
+    if not search_ready:
+        st.caption("⏳ Still indexing your existing notes; results will be complete in a moment.")
+    results = search_index.search(query)
+    course_names = {course["id"]: course["name"] for course in courses}
+    if not results:
+        st.caption("No matches.")
+    for i, hit in enumerate(results):
+        course_name = course_names.get(hit["course_id"])
+        if course_name is None:
+            continue
+        col_hit, col_go = st.columns([0.85, 0.15])
+        with col_hit:
+            st.markdown(f"{KIND_ICONS.get(hit['kind'], '')} **{course_name} › {hit['content']} › {hit['topic']}**")
+            st.caption(hit["snippet"])
+        with col_go:
+            if st.button("Open", key=f"search_hit_{i}"):
+                st.session_state.selected_course_id = hit["course_id"]
+                st.session_state.selected_course_name = course_name
+                st.session_state.selected_content = hit["content"]
+                if hit["kind"] == "quiz":
+                    st.session_state.selected_content_for_quiz = hit["content"]
+                    st.switch_page("pages/quiz_page.py")
+                elif hit["kind"] == "flashcards":
+                    st.session_state.selected_topic_for_revision = hit["topic"]
+                    st.switch_page("pages/revise_flashcards.py")
+                else:
+                    st.session_state.selected_topic = hit["topic"]
+                    st.switch_page("pages/topic_editor.py")
+
 # --- Course UI ---
 col1, col2 = st.columns([0.8, 0.2])
 with col1:
@@ -142,9 +156,7 @@ if st.session_state.show_add_course:
                     "name": new_course_name,
                     "created_at": datetime.datetime.now().isoformat()
                 }
-                courses.append(new_course)
-                save_courses(courses)
-                os.makedirs(f"{REVISION_FOLDER}/{new_course['id']}", exist_ok=True)
+                store.add_course(new_course)
                 st.session_state.pop("course_name_input", None)
                 st.session_state.show_add_course = False
                 st.success(f"Course '{new_course_name}' added!")
@@ -166,9 +178,10 @@ st.markdown("""
 if not courses:
     st.info("No courses added yet. Use the ➕ Add Course section above.")
 else:
+    visible_courses = paginate(courses, key="courses", label="courses", text=lambda course: course["name"])
     container = st.container()
     col1, col2 = container.columns(2)
-    for idx, course in enumerate(courses):
+    for idx, course in enumerate(visible_courses):
         with (col1 if idx % 2 == 0 else col2):
             st.markdown('<div class="box">', unsafe_allow_html=True)
             st.markdown(f"#### {course['name']}")
@@ -182,10 +195,7 @@ else:
                 spacer, col_confirm, col_cancel = st.columns([0.1, 0.5, 0.5])
                 with col_confirm:
                     if st.button("✅ Yes, Delete", key=f"confirm_delete_{course['id']}"):
-                        courses = [c for c in courses if c["id"] != course['id']]
-                        save_courses(courses)
-                        import shutil
-                        shutil.rmtree(f"{REVISION_FOLDER}/{course['id']}", ignore_errors=True)
+                        store.delete_course(course['id'])
                         del st.session_state.confirm_delete_course_id
                         st.success(f"Deleted course: {course['name']}")
                         st.rerun()
@@ -206,3 +216,40 @@ else:
                         st.session_state.confirm_delete_course_id = course['id']
                         st.rerun()
             st.markdown('</div>', unsafe_allow_html=True)
+
+# --- Export / import courses as one archive (see core/archive.py) ---
+with st.expander("📦 Export / import courses"):
+    if st.session_state.get("import_summary"):
+        st.success(st.session_state.pop("import_summary"))
+    if courses:
+        course_names = {course["id"]: course["name"] for course in courses}
+        export_ids = st.multiselect("Courses to export", list(course_names), default=list(course_names), format_func=course_names.get)
+        if st.button("📦 Prepare export", disabled=not export_ids):
+            export_dir = os.path.join(SMARTSTUDY_DIR, "exports")
+            os.makedirs(export_dir, exist_ok=True)
+            # Drop this session's previous export and any stale ones
+            previous = st.session_state.get("export_path")
+            prune_exports(export_dir, also=[previous] if previous else [])
+            export_path = os.path.join(export_dir, f"smartstudy-{datetime.datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}.tar.gz")
+            with st.spinner("Packing courses..."), open(export_path, "wb") as f:
+                export_courses(store, f, export_ids)
+            st.session_state.export_path = export_path
+        export_path = st.session_state.get("export_path")
+        if export_path and os.path.exists(export_path):
+            # Read from disk only when clicked, not on every rerun
+            def read_export(path=export_path):
+                with open(path, "rb") as f:
+                    return f.read()
+            st.download_button("⬇️ Download archive", read_export, file_name=os.path.basename(export_path), mime="application/gzip")
+
+    uploaded = st.file_uploader("Import a SmartStudy archive", type=["gz", "tgz"])
+    if uploaded is not None and st.button("📥 Import"):
+        try:
+            with st.spinner("Verifying and importing..."):
+                imported, skipped = import_archive(store, uploaded)
+        except ArchiveError as exc:
+            st.error(f"❌ Import failed: {exc}")
+        else:
+            added = ", ".join(f"{imported[kind]} {kind}" for kind in imported if imported[kind]) or "nothing new"
+            st.session_state.import_summary = f"✅ Imported {added} ({sum(skipped.values())} unchanged item(s) skipped)."
+            st.rerun()
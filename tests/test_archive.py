@@ -0,0 +1,55 @@
+import io
+import os
+import time
+import json
+import pytest
+from core.archive import ArchiveError, _Writer, export_courses, import_archive, prune_exports
+from core.storage import FileStore
+
+
+def _store(path):
+    store = FileStore(str(path))
+    store.add_course({"id": "c1", "name": "Course", "created_at": "2024-01-01"})
+    store.add_content("c1", "A")
+    store.add_topic("c1", "A", "T")
+    store.write_note("c1", "A", "T", "# Note")
+    return store
+
+
+def test_round_trip(tmp_path):
+    buf = io.BytesIO()
+    export_courses(_store(tmp_path / "src"), buf)
+    buf.seek(0)
+    dest = FileStore(str(tmp_path / "dest"))
+    imported, skipped = import_archive(dest, buf)
+    assert imported["notes"] == 1 and not any(skipped.values())
+    assert dest.read_note("c1", "A", "T") == "# Note"
+
+
+# A member without the headers its kind needs is rejected before anything
+# is written
+@pytest.mark.parametrize("kind,data,meta", [
+    ("note", b"x", {"course": "c1", "content": "A"}),
+    ("topic", b"", {"content": "A", "topic": "T"}),
+    ("course", b'{"name": "n", "created_at": "d"}', {}),
+])
+def test_missing_headers(tmp_path, kind, data, meta):
+    buf = io.BytesIO()
+    writer = _Writer(buf)
+    writer.add("course", json.dumps({"name": "n", "created_at": "d"}).encode("utf-8"), course="c1")
+    writer.add(kind, data, **meta)
+    writer.close(["c1"])
+    buf.seek(0)
+    dest = FileStore(str(tmp_path / "dest"))
+    with pytest.raises(ArchiveError):
+        import_archive(dest, buf)
+    assert dest.list_courses() == []
+
+
+def test_prune_exports(tmp_path):
+    old, new, previous = (tmp_path / name for name in ("old.tar.gz", "new.tar.gz", "previous.tar.gz"))
+    for path in (old, new, previous):
+        path.write_bytes(b"x")
+    os.utime(old, (time.time() - 7200,) * 2)
+    prune_exports(str(tmp_path), also=[str(previous)])
+    assert sorted(os.listdir(tmp_path)) == ["new.tar.gz"]
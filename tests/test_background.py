@@ -0,0 +1,29 @@
+import pytest
+from core import background
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    monkeypatch.setenv("SMARTSTUDY_DIR", str(tmp_path))
+    monkeypatch.setattr(background, "ensure_worker", lambda: None)  # run jobs by hand
+    from core.paths import find_smartstudy_path
+    find_smartstudy_path.cache_clear()
+    background._local.conn = None
+    yield background
+    background._local.conn = None
+    find_smartstudy_path.cache_clear()
+
+
+# A job that gave up is reported as failed, not as still refreshing, and
+# enqueueing it again starts over
+def test_failed_jobs_are_not_queued(jobs):
+    jobs.enqueue("c1", "A", "T", "rev1")
+    for _ in range(jobs.MAX_ATTEMPTS):
+        job = ("c1", "A", "T", "rev1", jobs._conn().execute("SELECT attempts FROM jobs").fetchone()[0])
+        jobs._finish(job, RuntimeError("connection reset"))
+    assert jobs.queued_topics("c1", "A") == {}
+    assert jobs.failed_topics("c1", "A") == {"T": "connection reset"}
+
+    jobs.enqueue("c1", "A", "T", "rev1")
+    assert jobs.queued_topics("c1", "A") == {"T": "pending"}
+    assert jobs.failed_topics("c1", "A") == {}
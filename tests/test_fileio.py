@@ -0,0 +1,48 @@
+import json
+import threading
+import multiprocessing
+from core.fileio import update_json
+
+PROCESSES = 6
+THREADS = 4
+ADDS = 20
+
+
+def _add(path, item):
+    def mutate(items):
+        items.append(item)
+        return items
+    update_json(path, mutate, [])
+
+
+def _writer(path, writer):
+    threads = [
+        threading.Thread(target=lambda t=t: [_add(path, f"{writer}-{t}-{i}") for i in range(ADDS)])
+        for t in range(THREADS)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+# Many sessions adding to one list at once: every addition must survive
+def test_concurrent_writers_lose_nothing(tmp_path):
+    path = str(tmp_path / "content_list.json")
+    processes = [multiprocessing.Process(target=_writer, args=(path, p)) for p in range(PROCESSES)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    with open(path) as f:
+        items = json.load(f)
+    assert len(items) == PROCESSES * THREADS * ADDS
+    assert len(set(items)) == len(items)
+
+
+def test_unchanged_data_is_not_written(tmp_path):
+    path = str(tmp_path / "courses.json")
+    assert update_json(path, lambda data: None, []) is None
+    assert not (tmp_path / "courses.json").exists()
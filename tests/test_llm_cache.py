@@ -0,0 +1,12 @@
+from core.llm_cache import LLMCache
+
+
+def _key(text):
+    return LLMCache.key("flashcards", 1, "model", 0.3, text)
+
+
+# Line structure is part of the Markdown, blanks within a line are not
+def test_key_keeps_lines_and_indentation():
+    assert _key("# A\nb") != _key("# A b")
+    assert _key("- x\n  - y") != _key("- x\n- y")
+    assert _key("a  b \n\tc\td\n") == _key("a b\n\tc d")
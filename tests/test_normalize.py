@@ -0,0 +1,31 @@
+import pytest
+from core.normalize import note_markdown
+
+
+# Text that merely contains "<" and ">" is not HTML
+@pytest.mark.parametrize("text", [
+    "if a<b then c and x>y",
+    "# Title\n\nuse <b> for bold",
+    "vector<int> v;",
+])
+def test_plain_text_passes_through(text):
+    assert note_markdown(text) == text.strip()
+
+
+@pytest.mark.parametrize("html,expected", [
+    ("<p><strong>bold </strong>text</p>", "**bold** text"),
+    ("<p>a<em> word</em>b</p>", "a *word*b"),
+    ("<p>x<strong></strong>y</p>", "xy"),
+    ("<p>Use <code>x = 1</code> and <strong><em>both </em></strong>here</p>",
+     "Use `x = 1` and ***both*** here"),
+])
+def test_inline_markers_hug_the_text(html, expected):
+    assert note_markdown(html) == expected
+
+
+def test_editor_note():
+    html = (
+        "<h2>Cells</h2><p>The <strong>nucleus</strong> holds DNA.</p>"
+        "<ol><li>one</li><li data-list=\"bullet\">two</li></ol>"
+    )
+    assert note_markdown(html) == "## Cells\n\nThe **nucleus** holds DNA.\n\n1. one\n- two"
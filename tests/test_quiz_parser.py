@@ -0,0 +1,56 @@
+import os
+import json
+import pytest
+from core.quiz_parser import parse_questions
+from core.llm import _merge_cards, _merge_questions
+
+FIXTURES = os.path.join(os.path.dirname(__file__), "fixtures", "quiz_replies")
+with open(os.path.join(FIXTURES, "expected.json")) as f:
+    EXPECTED = json.load(f)
+
+
+def _reply(name):
+    with open(os.path.join(FIXTURES, name), encoding="utf-8") as f:
+        return f.read()
+
+
+# Every fixture is a reply shape seen from models: (valid questions kept,
+# whether coverage is complete or a follow-up request is needed)
+@pytest.mark.parametrize("name", sorted(EXPECTED))
+def test_fixture(name):
+    questions, complete = parse_questions(_reply(name))
+    assert (len(questions), complete) == (EXPECTED[name]["questions"], EXPECTED[name]["complete"])
+    for question in questions:
+        assert len(question["options"]) == 4
+        assert question["answer"] in question["options"]
+
+
+def test_every_fixture_has_an_expectation():
+    assert sorted(n for n in os.listdir(FIXTURES) if n.endswith(".txt")) == sorted(EXPECTED)
+
+
+def test_fences_inside_strings_are_kept():
+    questions, _ = parse_questions(_reply("fence_in_string.txt"))
+    assert questions[0]["question"] == "How do you mark inline code? Use ```code```?"
+
+
+def test_letter_and_index_answers_map_to_options():
+    questions, _ = parse_questions(_reply("letter_and_index_answers.txt"))
+    assert [q["answer"] for q in questions] == ["y", "x"]
+
+
+def test_questions_with_the_same_wording_but_different_options_are_kept():
+    wording = "Which of the following is true?"
+    quiz = [
+        {"question": wording, "options": [f"{n}a", f"{n}b", f"{n}c", f"{n}d"], "answer": f"{n}a"}
+        for n in range(3)
+    ]
+    assert len(_merge_questions([quiz])) == 3
+    assert len(_merge_questions([quiz, quiz])) == 3
+
+
+def test_reworded_repeats_are_merged():
+    card = "### Photosynthesis\n- Plants convert light energy into chemical energy stored in glucose"
+    reworded = "### Photosynthesis\n- Plants convert light energy into the chemical energy stored in glucose"
+    other = "### Respiration\n- Cells break glucose down to release energy as ATP"
+    assert list(_merge_cards([card, reworded + "\n" + other])) == [card, other]
@@ -0,0 +1,110 @@
+import json
+import time
+import threading
+import http.server
+import openai
+import pytest
+from core import scheduler
+from core.providers import _client
+from core.scheduler import TokenBucket, call_with_retry, default_workers, run_jobs
+
+
+# Nested pools (topics, then chunks of each topic) share one cap on
+# requests in flight
+def test_nested_jobs_respect_the_concurrency_limit(monkeypatch):
+    monkeypatch.setenv("SMARTSTUDY_LLM_RPS", "0")
+    scheduler.get_rate_limiter.cache_clear()
+    in_flight, peak, lock = 0, 0, threading.Lock()
+
+    def request():
+        nonlocal in_flight, peak
+        with lock:
+            in_flight += 1
+            peak = max(peak, in_flight)
+        time.sleep(0.02)
+        with lock:
+            in_flight -= 1
+
+    def topic():
+        return run_jobs([(chunk, lambda: call_with_retry(request)) for chunk in range(4)])
+
+    try:
+        results = run_jobs([(t, topic) for t in range(4)])
+    finally:
+        scheduler.get_rate_limiter.cache_clear()
+    assert not any(isinstance(r, Exception) for r in results.values())
+    assert peak <= default_workers()
+
+
+# --- Against a fake OpenAI-compatible server ---
+# Replies with the queued (status, headers) responses in turn, then 200
+class _FakeOpenAI(http.server.BaseHTTPRequestHandler):
+    responses = []
+    requests = []
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("content-length", 0)))
+        type(self).requests.append(time.monotonic())
+        status, headers = type(self).responses.pop(0) if type(self).responses else (200, {})
+        if status == 200:
+            body = {
+                "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "fake",
+                "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "ok"}}],
+            }
+        else:
+            body = {"error": {"message": f"status {status}", "type": "error"}}
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        for name, value in {"content-type": "application/json", **headers}.items():
+            self.send_header(name, value)
+        self.send_header("content-length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def fake_server():
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), _FakeOpenAI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    _FakeOpenAI.responses, _FakeOpenAI.requests = [], []
+    try:
+        yield _client("openai", "test-key", f"http://127.0.0.1:{server.server_port}/v1")
+    finally:
+        server.shutdown()
+        server.server_close()
+
+
+def _ask(client):
+    return client.chat.completions.create(model="fake", messages=[{"role": "user", "content": "hi"}])
+
+
+def test_retries_429_after_retry_after(fake_server):
+    assert fake_server.max_retries == 0  # retries are call_with_retry's, not the SDK's
+    _FakeOpenAI.responses = [(429, {"retry-after": "0.3"})]
+    reply = call_with_retry(lambda: _ask(fake_server), base_delay=0.01)
+    assert reply.choices[0].message.content == "ok"
+    first, second = _FakeOpenAI.requests
+    assert second - first >= 0.3
+
+
+def test_retries_server_errors_but_not_client_errors(fake_server):
+    _FakeOpenAI.responses = [(503, {}), (500, {})]
+    assert call_with_retry(lambda: _ask(fake_server), base_delay=0.01).choices[0].message.content == "ok"
+    assert len(_FakeOpenAI.requests) == 3
+
+    _FakeOpenAI.requests = []
+    _FakeOpenAI.responses = [(400, {})]
+    with pytest.raises(openai.BadRequestError):
+        call_with_retry(lambda: _ask(fake_server), base_delay=0.01)
+    assert len(_FakeOpenAI.requests) == 1
+
+
+def test_token_bucket_spaces_calls():
+    bucket = TokenBucket(rate=10, capacity=1)
+    start = time.monotonic()
+    for _ in range(4):
+        bucket.acquire()
+    assert time.monotonic() - start >= 0.25
@@ -0,0 +1,45 @@
+import threading
+from core.search import SearchIndex
+from core.storage import FileStore
+
+
+# A store that holds the build after its first note until released
+class _PausedStore:
+    def __init__(self, store):
+        self.store = store
+        self.reading = threading.Event()
+        self.release = threading.Event()
+
+    def __getattr__(self, name):
+        return getattr(self.store, name)
+
+    def read_note(self, *args):
+        self.reading.set()
+        self.release.wait(10)
+        return self.store.read_note(*args)
+
+
+# Updates made while the index is being built do not wait for it, and are
+# applied once it finishes
+def test_updates_during_build_are_queued(tmp_path):
+    store = FileStore(str(tmp_path / "store"))
+    store.add_course({"id": "c1", "name": "Course", "created_at": "2024-01-01"})
+    store.add_content("c1", "A")
+    for topic in ("T1", "T2"):
+        store.add_topic("c1", "A", topic)
+        store.write_note("c1", "A", topic, f"<p>alpha {topic}</p>")
+    index = SearchIndex(str(tmp_path / "search.db"))
+    paused = _PausedStore(store)
+    builder = threading.Thread(target=index.ensure_built, args=(paused,))
+    builder.start()
+    assert paused.reading.wait(10)
+
+    index.index_note("c1", "A", "T1", "<p>omega</p>")
+    index.remove("c1", "A", "T2")
+    assert not builder.is_alive() or index._queued
+    paused.release.set()
+    builder.join(10)
+
+    assert index.is_built()
+    assert [r["topic"] for r in index.search("omega")] == ["T1"]
+    assert index.search("alpha") == []
@@ -0,0 +1,93 @@
+import os
+import pytest
+from core.storage import FileStore, SqliteStore
+
+
+def _store(tmp_path):
+    store = FileStore(str(tmp_path))
+    store.add_course({"id": "c1", "name": "Course", "created_at": "2024-01-01"})
+    return store
+
+
+# "Math"/"Advanced_X" and "Math_Advanced"/"X" used to share every file
+def test_content_and_topic_names_do_not_collide(tmp_path):
+    store = _store(tmp_path)
+    for content, topic in (("Math", "Advanced_X"), ("Math_Advanced", "X")):
+        store.add_content("c1", content)
+        store.add_topic("c1", content, topic)
+        store.write_note("c1", content, topic, f"{content}/{topic}")
+        store.write_flashcards("c1", content, topic, f"### {content}/{topic}")
+        store.write_quiz("c1", content, topic, [{"question": content}], "h")
+
+    store.delete_content("c1", "Math")
+    assert store.read_note("c1", "Math_Advanced", "X") == "Math_Advanced/X"
+    assert store.read_flashcards("c1", "Math_Advanced", "X") == "### Math_Advanced/X"
+    assert store.read_quiz("c1", "Math_Advanced", "X") == [{"question": "Math_Advanced"}]
+
+
+# Files written under the old "<content>_<topic>" names are still found,
+# and a file two artifacts map to is kept until neither uses it
+def test_old_file_names(tmp_path):
+    store = _store(tmp_path)
+    for content, topic in (("Math", "Advanced_X"), ("Math_Advanced", "X")):
+        store.add_content("c1", content)
+        store.add_topic("c1", content, topic)
+    notes = os.path.join(store.course_path("c1"), "notes")
+    os.makedirs(notes)
+    with open(os.path.join(notes, "Math_Advanced_X.md"), "w") as f:
+        f.write("old")
+
+    assert store.read_note("c1", "Math", "Advanced_X") == "old"
+    store.write_note("c1", "Math_Advanced", "X", "new")
+    assert store.read_note("c1", "Math", "Advanced_X") == "old"
+    store.delete_content("c1", "Math")
+    assert os.listdir(notes) == ["Math%5FAdvanced_X.md"]
+    assert store.read_note("c1", "Math_Advanced", "X") == "new"
+
+
+# Review schedule, quiz scores and vectors live outside the course folder
+def test_delete_course_removes_learning_state(tmp_path, monkeypatch):
+    monkeypatch.setenv("SMARTSTUDY_DIR", str(tmp_path))
+    from core.paths import find_smartstudy_path
+    from core.srs import get_schedule
+    from core.quiz_history import get_quiz_history
+    from core.embeddings import dedupe
+    find_smartstudy_path.cache_clear()
+    try:
+        store = _store(tmp_path)
+        schedule = get_schedule("c1")
+        schedule.sync({"card": "### Title\n- point"})
+        schedule.review("card", 5, 0)
+        get_quiz_history("c1").sync({"q": {"question": "Q", "answer": "A"}})
+        get_quiz_history("c1").record("q", True)
+        dedupe("c1", {"a": "first text", "b": "second text"})
+        leftovers = ["srs", "quiz_history", "embeddings"]
+        assert all(os.listdir(tmp_path / folder) for folder in leftovers)
+
+        store.delete_course("c1")
+        assert not any(os.listdir(tmp_path / folder) for folder in leftovers)
+        assert get_quiz_history("c1").get("q") == (0, 0)
+        assert get_schedule("c1").counts(0)["total"] == 0
+    finally:
+        find_smartstudy_path.cache_clear()
+
+
+# Session decks compare stamp(): every write to the course must move it,
+# writes to other courses must not
+@pytest.mark.parametrize("backend", [FileStore, SqliteStore])
+def test_stamp_moves_with_every_write(tmp_path, backend):
+    store = backend(str(tmp_path))
+    for course_id in ("c1", "c2"):
+        store.add_course({"id": course_id, "name": course_id, "created_at": "2024-01-01"})
+        store.add_content(course_id, "K")
+        store.add_topic(course_id, "K", "T")
+    stamps = [store.stamp("c1")]
+    store.write_quiz("c1", "K", "T", [{"question": "Q"}], "h")
+    stamps.append(store.stamp("c1"))
+    store.write_quiz("c1", "K", "T", [{"question": "Q"}], "h")  # same quiz and source
+    stamps.append(store.stamp("c1"))
+    store.write_note("c2", "K", "T", "other course")
+    assert store.stamp("c1") == stamps[-1]
+    store.delete_topic("c1", "K", "T")
+    stamps.append(store.stamp("c1"))
+    assert len(set(stamps)) == len(stamps)